@@ -30,9 +30,10 @@ function showToast(msg, type = '') {
 
 async function apiReq(path, opts = {}) {
   const token = typeof authToken !== 'undefined' ? authToken : null;
-  const headers = { 'Content-Type': 'application/json', ...opts.headers };
+  const headers = { 'Content-Type': 'application/json', ...rywHeaders(), ...opts.headers };
   if (token) headers['Authorization'] = `Bearer ${token}`;
   const res = await fetch(`${API}${path}`, { ...opts, headers });
+  noteWrite(res);
   if (!res.ok) {
     const err = await res.json().catch(() => ({}));
     throw new Error(err.detail || `HTTP ${res.status}`);
@@ -218,6 +218,22 @@ if (_savedUser && !_savedUser.id && _savedToken) {
 }
 let currentUser = _savedUser;
 
+// ── Read-your-writes ──────────────────────────────────────────────────────────
+// Write responses carry X-Read-Primary-Until (unix seconds). Sending it back
+// until then makes the API read from its primary database, so a new post or
+// comment shows up right away even while the read replica lags.
+const RYW_HEADER = 'X-Read-Primary-Until';
+
+function noteWrite(res) {
+    const until = res.headers.get(RYW_HEADER);
+    if (until) sessionStorage.setItem('baerhub-ryw', until);
+}
+
+function rywHeaders() {
+    const until = Number(sessionStorage.getItem('baerhub-ryw') || 0);
+    return until > Date.now() / 1000 ? { [RYW_HEADER]: String(until) } : {};
+}
+
 // ── Theme ─────────────────────────────────────────────────────────────────────
 function initTheme() {
     const btn = document.getElementById('theme-toggle');
@@ -86,7 +86,7 @@ function renderPostCard(post) {
           <span class="read-time"><i class="fa-regular fa-clock"></i> ${post.read_time} min</span>
         </div>
         <h2 class="post-card__title">${escapeHtml(post.title)}</h2>
-        ${post.subtitle ? `<p class="post-card__subtitle">${escapeHtml(post.subtitle)}</p>` : ''}
+        ${(post.subtitle || post.excerpt) ? `<p class="post-card__subtitle">${escapeHtml(post.subtitle || post.excerpt)}</p>` : ''}
         <div class="post-card__footer">
           <a class="author-chip" href="profile.html?user=${encodeURIComponent(post.author?.username||'')}"
              onclick="event.stopPropagation()">
@@ -118,7 +118,7 @@ async function fetchFeed(replace = false) {
   }
 
   const params = new URLSearchParams({ limit: '15' });
-  if (_nextCursor)  params.set('before_id', _nextCursor);
+  if (_nextCursor)  params.set('cursor', _nextCursor);
   if (_activeSlug)  params.set('category', _activeSlug);
 
   try {
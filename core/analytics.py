@@ -0,0 +1,254 @@
+"""
+analytics.py — Incremental daily rollups of the blog_post_view log.
+
+Every ANALYTICS_ROLLUP_INTERVAL seconds new blog_post_view rows are folded
+into blog_post_daily_stats (views, anon views, unique viewers per post and
+day) and blog_post_daily_viewer (the exact viewer set per post and day) with
+two INSERT … SELECT … GROUP BY … ON CONFLICT DO UPDATE statements. Progress
+is tracked by id in analytics_checkpoint, locked FOR UPDATE so several
+workers running the job never fold the same range twice.
+
+The rollups trail the raw log by one to two intervals; blog_post.view_count
+stays the live total.
+
+blog_post_view itself is range-partitioned by month. maintain() (when the
+loop starts, then hourly) creates VIEW_PARTITIONS_AHEAD months of partitions in advance and
+retires monthly partitions older than VIEW_RETENTION_MONTHS once every row in
+them has been rolled up, by dropping them or, with
+VIEW_RETENTION_ACTION=detach, detaching them as standalone archive tables.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+import sqlalchemy
+
+from core.database import engine
+
+log = logging.getLogger(__name__)
+
+ANALYTICS_ROLLUP_INTERVAL = float(os.getenv("ANALYTICS_ROLLUP_INTERVAL", "60"))   # seconds
+VIEW_PARTITIONS_AHEAD     = int(os.getenv("VIEW_PARTITIONS_AHEAD", "2"))            # months
+VIEW_RETENTION_MONTHS     = int(os.getenv("VIEW_RETENTION_MONTHS", "6"))            # 0 = keep forever
+VIEW_RETENTION_ACTION     = os.getenv("VIEW_RETENTION_ACTION", "drop")              # drop | detach
+_MAINTAIN_EVERY           = 3600.0
+
+_CHECKPOINT = "blog_post_view"
+
+_CLAIM_SQL = sqlalchemy.text("""
+    INSERT INTO analytics_checkpoint (name, last_id, pending_max)
+    VALUES (:name, 0, 0) ON CONFLICT (name) DO NOTHING
+""")
+
+_LOCK_SQL = sqlalchemy.text("""
+    SELECT last_id, pending_max FROM analytics_checkpoint
+    WHERE name = :name FOR UPDATE
+""")
+
+_FOLD_VIEWERS_SQL = sqlalchemy.text("""
+    INSERT INTO blog_post_daily_viewer AS d (post_id, day, viewer_id, views, last_viewed)
+    SELECT post_id, created_at::date, viewer_id, count(*), max(created_at)
+    FROM blog_post_view
+    WHERE id > :lo AND id <= :hi AND viewer_id IS NOT NULL
+    GROUP BY post_id, created_at::date, viewer_id
+    ON CONFLICT (post_id, day, viewer_id) DO UPDATE
+       SET views       = d.views + EXCLUDED.views,
+           last_viewed = GREATEST(d.last_viewed, EXCLUDED.last_viewed)
+""")
+
+# Runs after _FOLD_VIEWERS_SQL in the same transaction, so unique_viewers is
+# recounted from the already-updated viewer set (an index lookup per row).
+_FOLD_DAILY_SQL = sqlalchemy.text("""
+    INSERT INTO blog_post_daily_stats AS s (post_id, day, views, anon_views, unique_viewers)
+    SELECT b.post_id, b.day, b.views, b.anon_views,
+           (SELECT count(*) FROM blog_post_daily_viewer dv
+             WHERE dv.post_id = b.post_id AND dv.day = b.day)
+    FROM (
+        SELECT post_id, created_at::date AS day,
+               count(*)                                  AS views,
+               count(*) FILTER (WHERE viewer_id IS NULL) AS anon_views
+        FROM blog_post_view
+        WHERE id > :lo AND id <= :hi
+        GROUP BY post_id, created_at::date
+    ) b
+    ON CONFLICT (post_id, day) DO UPDATE
+       SET views          = s.views + EXCLUDED.views,
+           anon_views     = s.anon_views + EXCLUDED.anon_views,
+           unique_viewers = EXCLUDED.unique_viewers
+    RETURNING s.views
+""")
+
+_ADVANCE_SQL = sqlalchemy.text("""
+    UPDATE analytics_checkpoint
+       SET last_id     = :hi,
+           pending_max = (SELECT coalesce(max(id), :hi) FROM blog_post_view)
+     WHERE name = :name
+""")
+
+_PARTITIONS_SQL = sqlalchemy.text("""
+    SELECT c.relname FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'blog_post_view'::regclass
+""")
+
+_PARTITION_PREFIX = "blog_post_view_p"
+
+
+def _add_months(d: date, n: int) -> date:
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{_PARTITION_PREFIX}{month:%Y%m}"
+
+
+def _partition_month(name: str) -> Optional[date]:
+    suffix = name[len(_PARTITION_PREFIX):]
+    if not name.startswith(_PARTITION_PREFIX) or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+class ViewRollup:
+    def __init__(self, interval: float = ANALYTICS_ROLLUP_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.runs       = 0
+        self.failures   = 0
+        self.last_id    = 0
+        self.row_groups = 0
+        self.retired    = 0
+        self._maintained_at = 0.0
+
+    async def run(self) -> int:
+        """Fold the next id range. Returns the number of (post, day) rows touched."""
+        async with engine.begin() as conn:
+            await conn.execute(_CLAIM_SQL, {"name": _CHECKPOINT})
+            lo, hi = (await conn.execute(_LOCK_SQL, {"name": _CHECKPOINT})).one()
+            touched = 0
+            if hi > lo:
+                params = {"lo": lo, "hi": hi}
+                await conn.execute(_FOLD_VIEWERS_SQL, params)
+                touched = len((await conn.execute(_FOLD_DAILY_SQL, params)).all())
+            await conn.execute(_ADVANCE_SQL, {"name": _CHECKPOINT, "hi": max(lo, hi)})
+
+        self.runs       += 1
+        self.last_id     = max(lo, hi)
+        self.row_groups += touched
+        return touched
+
+    async def maintain(self, today: Optional[date] = None) -> List[str]:
+        """Create upcoming view partitions and retire expired ones. Returns retired names."""
+        # Partition bounds compare against created_at, which is stored in UTC.
+        today      = today or datetime.now(timezone.utc).date()
+        this_month = today.replace(day=1)
+        retired: List[str] = []
+        async with engine.begin() as conn:
+            # Serialise across workers; released at commit.
+            await conn.execute(sqlalchemy.text(
+                "SELECT pg_advisory_xact_lock(hashtext('blog_post_view_partitions'))"
+            ))
+            existing = set((await conn.execute(_PARTITIONS_SQL)).scalars().all())
+
+            if "blog_post_view_default" not in existing:
+                await conn.execute(sqlalchemy.text(
+                    "CREATE TABLE blog_post_view_default PARTITION OF blog_post_view DEFAULT"
+                ))
+            for n in range(VIEW_PARTITIONS_AHEAD + 1):
+                month = _add_months(this_month, n)
+                name  = _partition_name(month)
+                if name in existing:
+                    continue
+                lo, hi = month, _add_months(month, 1)
+                # Build the partition standalone, move in any rows that landed
+                # in the default partition for this month, then attach it —
+                # attaching over rows still in the default would fail.
+                await conn.execute(sqlalchemy.text(
+                    f'CREATE TABLE "{name}" '
+                    "(LIKE blog_post_view INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                ))
+                await conn.execute(sqlalchemy.text(
+                    "WITH moved AS ("
+                    "  DELETE FROM blog_post_view_default"
+                    f" WHERE created_at >= '{lo}' AND created_at < '{hi}' RETURNING *"
+                    f') INSERT INTO "{name}" SELECT * FROM moved'
+                ))
+                await conn.execute(sqlalchemy.text(
+                    f'ALTER TABLE blog_post_view ATTACH PARTITION "{name}" '
+                    f"FOR VALUES FROM ('{lo}') TO ('{hi}')"
+                ))
+
+            if VIEW_RETENTION_MONTHS > 0:
+                cutoff = _add_months(this_month, -VIEW_RETENTION_MONTHS)
+                folded = (await conn.execute(sqlalchemy.text(
+                    "SELECT last_id FROM analytics_checkpoint WHERE name = :name"
+                ), {"name": _CHECKPOINT})).scalar() or 0
+                for name in sorted(existing):
+                    month = _partition_month(name)
+                    if month is None or month >= cutoff:
+                        continue
+                    max_id = (await conn.execute(sqlalchemy.text(
+                        f'SELECT coalesce(max(id), 0) FROM "{name}"'
+                    ))).scalar()
+                    if max_id > folded:
+                        continue   # not rolled up yet
+                    if VIEW_RETENTION_ACTION == "detach":
+                        await conn.execute(sqlalchemy.text(
+                            f'ALTER TABLE blog_post_view DETACH PARTITION "{name}"'
+                        ))
+                    else:
+                        await conn.execute(sqlalchemy.text(f'DROP TABLE "{name}"'))
+                    retired.append(name)
+
+        self._maintained_at = time.monotonic()
+        self.retired       += len(retired)
+        if retired:
+            log.info(f"Retired view partitions ({VIEW_RETENTION_ACTION}): {', '.join(retired)}")
+        return retired
+
+    async def _run(self):
+        while True:
+            try:
+                if time.monotonic() - self._maintained_at > _MAINTAIN_EVERY:
+                    await self.maintain()
+            except Exception as e:
+                self.failures += 1
+                log.error(f"View partition maintenance failed: {e}")
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run()
+            except Exception as e:
+                self.failures += 1
+                log.error(f"Analytics rollup failed: {e}")
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "runs":       self.runs,
+            "failures":   self.failures,
+            "last_id":    self.last_id,
+            "row_groups": self.row_groups,
+            "retired":    self.retired,
+        }
+
+
+view_rollup = ViewRollup()
@@ -0,0 +1,458 @@
+"""
+bench.py — Latency benchmarks against a seeded scratch database.
+
+Each benchmark migrates BENCH_DATABASE_URL, TRUNCATES every blog table and
+seeds a deterministic corpus (random.Random(--seed)), so runs are
+comparable across machines and commits. Never point it at a database whose
+contents matter:
+
+    export BENCH_DATABASE_URL=postgresql+asyncpg://localhost/beelog_bench
+    python -m core.bench search --posts 10000 100000   # full-text vs ILIKE
+    python -m core.bench login --burst 50              # reads during a login burst
+    python -m core.bench --runs 10 purge               # delete a 1k-post, 100k-view user
+    python -m core.bench stats --posts 10000 100000    # admin dashboard counts
+
+Timings are wall-clock per call from this process, including the round trip
+to Postgres; p50 / p99 over --runs calls per query.
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import itertools
+import argparse
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+_CHUNK = 2000   # rows per multi-row INSERT while seeding
+
+
+def _use_bench_database() -> None:
+    # core.database builds its engines at import time.
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        sys.exit("BENCH_DATABASE_URL is not set (a scratch database; it is truncated).")
+    os.environ["DATABASE_URL"]      = url
+    os.environ["DATABASE_READ_URL"] = ""
+    os.environ.setdefault("SECRET_KEY", "bench-only-secret-key-not-for-production")
+
+
+def _pct(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+
+async def _timed(fn: Callable[[], Awaitable[object]], runs: int) -> List[float]:
+    await fn()   # warm the plan and statement caches
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _report(label: str, samples: List[float]) -> None:
+    print(f"  {label:<28} p50 {_pct(samples, .5):9.2f} ms   p99 {_pct(samples, .99):9.2f} ms")
+
+
+# ── Corpus ────────────────────────────────────────────────────────────────────
+
+class Corpus:
+    """Pseudo-words with a Zipf-like frequency, so some terms are common and some rare."""
+
+    def __init__(self, seed: int, vocabulary: int = 20_000):
+        self.rng     = random.Random(seed)
+        letters      = "abcdefghijklmnoprstuvyz"
+        words        = {
+            "".join(self.rng.choice(letters) for _ in range(self.rng.randint(4, 9)))
+            for _ in range(vocabulary)
+        }
+        self.words   = sorted(words)
+        self.rng.shuffle(self.words)
+        self.cum     = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(self.words))))
+
+    def text(self, n: int) -> str:
+        return " ".join(self.rng.choices(self.words, cum_weights=self.cum, k=n))
+
+    def term(self, rank: int) -> str:
+        """The word with the given frequency rank (0 = most common)."""
+        return self.words[rank]
+
+
+async def _reset() -> None:
+    import sqlalchemy
+    from sqlmodel import SQLModel
+    from core.database import engine
+    from core.migrations import migrate
+
+    await migrate()
+    tables = ", ".join(f'"{t.name}"' for t in SQLModel.metadata.sorted_tables)
+    async with engine.begin() as conn:
+        await conn.execute(sqlalchemy.text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+
+async def _insert(table, rows: List[dict]) -> None:
+    from core.database import engine
+    for start in range(0, len(rows), _CHUNK):
+        async with engine.begin() as conn:
+            await conn.execute(table.insert(), rows[start:start + _CHUNK])
+
+
+async def _seed_users(n: int, offset: int = 0) -> List[int]:
+    """Insert n users; returns their ids."""
+    import sqlalchemy
+    from core.database import engine
+    from models.models import User
+
+    await _insert(User.__table__, [
+        {"username": f"user{offset + i}", "password_hash": "x", "display_name": f"User {offset + i}"}
+        for i in range(n)
+    ])
+    async with engine.connect() as conn:
+        return list((await conn.execute(
+            sqlalchemy.select(User.id).order_by(User.id).offset(offset).limit(n)
+        )).scalars())
+
+
+async def _seed_posts(corpus: Corpus, n: int, author_ids: List[int], first: int = 0) -> None:
+    """Insert n posts (about 90 % published) with ~300-word bodies."""
+    from models.models import BlogPost, PostStatus
+
+    rng   = corpus.rng
+    start = datetime(2024, 1, 1)
+    rows  = []
+    for i in range(first, first + n):
+        body      = corpus.text(rng.randint(150, 450))
+        published = rng.random() < 0.9
+        at        = start + timedelta(minutes=i * 7)
+        rows.append({
+            "slug":             f"post-{i}",
+            "title":            corpus.text(rng.randint(3, 8))[:200],
+            "subtitle":         corpus.text(rng.randint(5, 12))[:300],
+            "meta_description": corpus.text(rng.randint(10, 20))[:300],
+            "body_html":        f"<p>{body}</p>",
+            "body_text":        body,
+            "excerpt":          body[:300],
+            "word_count":       body.count(" ") + 1,
+            "author_id":        rng.choice(author_ids),
+            "status":           PostStatus.PUBLISHED if published else PostStatus.DRAFT,
+            "published_at":     at if published else None,
+            "created_at":       at,
+            "updated_at":       at,
+        })
+    await _insert(BlogPost.__table__, rows)
+
+
+async def _analyze() -> None:
+    import sqlalchemy
+    from core.database import engine
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(sqlalchemy.text("VACUUM ANALYZE"))
+
+
+# ── search ────────────────────────────────────────────────────────────────────
+# Full-text search (crud.search_crud) against the substring ILIKE query it
+# replaced, which matched title/subtitle/meta_description only and ordered by
+# date. "ilike + body" is what ILIKE costs once it also covers the body, as
+# full-text search does.
+
+async def _ilike_search(session, q: str, limit: int = 20, with_body: bool = False):
+    from sqlalchemy import or_
+    from sqlmodel import select
+    from models.models import BlogPost, PostStatus
+
+    pattern = f"%{q}%"
+    columns = [BlogPost.title, BlogPost.subtitle, BlogPost.meta_description]
+    if with_body:
+        columns.append(BlogPost.body_text)
+    return (await session.exec(
+        select(BlogPost)
+        .where(BlogPost.status == PostStatus.PUBLISHED)
+        .where(or_(*(c.ilike(pattern) for c in columns)))
+        .order_by(BlogPost.published_at.desc())
+        .limit(limit)
+    )).all()
+
+
+async def bench_search(sizes: List[int], runs: int, seed: int) -> None:
+    from core.database import async_session, engine
+    from crud import search_crud
+
+    await _reset()
+    corpus  = Corpus(seed)
+    authors = await _seed_users(50)
+    queries = {
+        "common":   corpus.term(3),
+        "mid":      corpus.term(300),
+        "rare":     corpus.term(8_000),
+        "two-word": f"{corpus.term(40)} {corpus.term(900)}",
+    }
+
+    seeded = 0
+    for size in sorted(sizes):
+        t0 = time.perf_counter()
+        await _seed_posts(corpus, size - seeded, authors, first=seeded)
+        seeded = size
+        await _analyze()
+        print(f"{size} posts (seeded in {time.perf_counter() - t0:.1f} s)")
+
+        async with async_session() as session:
+            for name, q in queries.items():
+                paths: Dict[str, Callable[[], Awaitable[object]]] = {
+                    "full-text + snippets": lambda: search_crud.search_posts(session, q),
+                    "full-text":            lambda: search_crud.search_posts(session, q, highlight=False),
+                    "ilike":                lambda: _ilike_search(session, q),
+                    "ilike + body":         lambda: _ilike_search(session, q, with_body=True),
+                }
+                print(f" q={q!r} ({name})")
+                for label, fn in paths.items():
+                    _report(label, await _timed(fn, runs))
+    await engine.dispose()
+
+
+# ── login ─────────────────────────────────────────────────────────────────────
+# A burst of POST /token while one client keeps reading posts, in-process over
+# ASGI so both share the app's event loop as they do in a worker. Each read is
+# a different post so none is served from the response cache. --inline runs
+# bcrypt on the event loop, as login did before the bounded password pool.
+
+_BENCH_PASSWORD = "bench-password"
+
+
+async def bench_login(burst: int, runs: int, seed: int, inline: bool) -> None:
+    import httpx
+    import sqlalchemy
+    from core import security
+    from core.database import engine
+    from models.models import BlogPost, PostStatus, User
+    from main import app
+
+    await _reset()
+    authors = await _seed_users(burst)
+    await _seed_posts(Corpus(seed), 5_000, authors)
+    async with engine.begin() as conn:
+        await conn.execute(sqlalchemy.update(User).values(
+            password_hash=security.get_password_hash(_BENCH_PASSWORD)))
+        slugs = list((await conn.execute(
+            sqlalchemy.select(BlogPost.slug).where(BlogPost.status == PostStatus.PUBLISHED)
+        )).scalars())
+    await _analyze()
+
+    if inline:
+        async def run_inline(fn, *args):
+            return fn(*args)
+        security._run_password_job = run_inline
+
+    slug = itertools.cycle(slugs)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def read():
+            (await client.get(f"/posts/{next(slug)}")).raise_for_status()
+
+        async def login(username: str) -> float:
+            t0 = time.perf_counter()
+            (await client.post("/token", data={
+                "username": username, "password": _BENCH_PASSWORD,
+            })).raise_for_status()
+            return time.perf_counter() - t0
+
+        idle = await _timed(read, runs)
+
+        logins = asyncio.gather(*(login(f"user{i}") for i in range(burst)))
+        busy, peak = [], 0
+        await asyncio.sleep(0)   # let the burst reach the pool
+        while not logins.done():
+            peak = max(peak, security.password_pool_stats()["queue_depth"])
+            t0 = time.perf_counter()
+            await read()
+            busy.append(time.perf_counter() - t0)
+        login_times = await logins
+
+    mode = "on the event loop" if inline else f"{security.PASSWORD_HASH_CONCURRENCY} pool workers"
+    print(f"{burst} concurrent logins, bcrypt {mode}")
+    _report("read, idle", idle)
+    _report(f"read, during burst (n={len(busy)})", busy)
+    _report("login", login_times)
+    print(f"  peak queue_depth             {peak}")
+    await engine.dispose()
+
+
+# ── purge ─────────────────────────────────────────────────────────────────────
+# The admin hard deletes (crud.post_crud) against one user with --posts posts
+# and --views views on them, among 50 users with nine times as many posts and
+# views. Each run deletes inside a transaction and rolls back, so every run
+# sees the same data. The statement count must not grow with the data.
+
+async def bench_purge(posts: int, views: int, runs: int, seed: int) -> None:
+    import sqlalchemy
+    from core.analytics import view_rollup
+    from core.database import async_session, engine
+    from crud import post_crud
+    from models.models import BlogComment, BlogLike, BlogPost, BlogPostView
+
+    await _reset()
+    corpus = Corpus(seed)
+    rng    = corpus.rng
+    users  = await _seed_users(51)
+    victim, others = users[0], users[1:]
+    await _seed_posts(corpus, posts, [victim])
+    await _seed_posts(corpus, 9 * posts, others, first=posts)
+    async with engine.connect() as conn:
+        rows = (await conn.execute(sqlalchemy.select(BlogPost.id, BlogPost.author_id))).all()
+    theirs = [i for i, author in rows if author == victim]
+    ours   = [i for i, author in rows if author != victim]
+
+    now = datetime.utcnow()
+    def view(post_id: int) -> dict:
+        return {
+            "post_id":    post_id,
+            "viewer_id":  rng.choice(others) if rng.random() < 0.5 else None,
+            "created_at": now - timedelta(minutes=rng.randrange(28 * 24 * 60)),
+        }
+    await view_rollup.maintain()
+    await _insert(BlogPostView.__table__, [view(rng.choice(theirs)) for _ in range(views)])
+    await _insert(BlogPostView.__table__, [view(rng.choice(ours)) for _ in range(9 * views)])
+    await _insert(BlogLike.__table__, [
+        {"user_id": victim, "post_id": post_id} for post_id in rng.sample(ours, 1_000)
+    ])
+    await _insert(BlogComment.__table__, [
+        {"body": corpus.text(20), "post_id": rng.choice(ours), "author_id": victim}
+        for _ in range(1_000)
+    ] + [
+        {"body": corpus.text(20), "post_id": rng.choice(theirs), "author_id": rng.choice(others)}
+        for _ in range(5_000)
+    ])
+    await view_rollup.run()   # sets the pending_max watermark
+    await view_rollup.run()   # folds up to it
+    await _analyze()
+    print(f"user with {posts} posts and {views} views; {9 * posts} other posts, {9 * views} other views")
+
+    statements = 0
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    one_post = rng.choice(ours)
+    cases = {
+        "purge_user_content": lambda s: post_crud.purge_user_content(s, victim),
+        "purge_posts, one post": lambda s: post_crud.purge_posts(s, BlogPost.id == one_post),
+    }
+    for label, purge in cases.items():
+        samples = []
+        for _ in range(runs):
+            async with async_session() as session:
+                statements = 0
+                sqlalchemy.event.listen(engine.sync_engine, "before_cursor_execute", count)
+                t0 = time.perf_counter()
+                await purge(session)
+                samples.append(time.perf_counter() - t0)
+                sqlalchemy.event.remove(engine.sync_engine, "before_cursor_execute", count)
+                await session.rollback()
+        _report(f"{label} ({statements} stmts)", samples)
+    await engine.dispose()
+
+
+# ── stats ─────────────────────────────────────────────────────────────────────
+# GET /admin/stats (routers.admin.get_stats) as blog_post and blog_comment
+# grow, five comments per post. "recompute" is a snapshot miss, the single
+# FILTER-aggregate query; "six counts" is the per-table COUNT queries it
+# replaced; "snapshot" is a hit within ADMIN_STATS_TTL.
+
+async def _six_counts(session) -> List[int]:
+    from sqlmodel import func, select
+    from models.models import BlogCategory, BlogComment, BlogPost, PostStatus, User
+
+    queries = [
+        select(func.count(User.id)),
+        select(func.count(BlogPost.id)),
+        select(func.count(BlogPost.id)).where(BlogPost.status == PostStatus.PUBLISHED),
+        select(func.count(BlogPost.id)).where(BlogPost.status == PostStatus.DRAFT),
+        select(func.count(BlogCategory.id)),
+        select(func.count(BlogComment.id)).where(BlogComment.is_deleted == False),  # noqa: E712
+    ]
+    return [(await session.exec(q)).one() for q in queries]
+
+
+async def bench_stats(sizes: List[int], runs: int, seed: int) -> None:
+    from core.database import async_session, engine
+    from models.models import BlogComment
+    from routers import admin
+
+    await _reset()
+    corpus  = Corpus(seed)
+    rng     = corpus.rng
+    users   = await _seed_users(200)
+
+    seeded = 0
+    for size in sorted(sizes):
+        t0 = time.perf_counter()
+        await _seed_posts(corpus, size - seeded, users, first=seeded)
+        await _insert(BlogComment.__table__, [
+            {
+                "body":       corpus.text(20),
+                "post_id":    rng.randint(1, size),   # ids restart at 1 in _reset
+                "author_id":  rng.choice(users),
+                "is_deleted": rng.random() < 0.05,
+            }
+            for _ in range(5 * (size - seeded))
+        ])
+        seeded = size
+        await _analyze()
+        print(f"{size} posts, {5 * size} comments (seeded in {time.perf_counter() - t0:.1f} s)")
+
+        async with async_session() as session:
+            async def recompute():
+                admin._drop_stats_snapshot()
+                return await admin.get_stats(session=session, _=None)
+
+            _report("recompute", await _timed(recompute, runs))
+            _report("six counts", await _timed(lambda: _six_counts(session), runs))
+            await recompute()
+            _report("snapshot", await _timed(lambda: admin.get_stats(session=session, _=None), runs))
+    await engine.dispose()
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.bench")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=50, help="timed calls per query")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    search = sub.add_parser("search", help="full-text search vs ILIKE")
+    search.add_argument("--posts", type=int, nargs="+", default=[10_000, 100_000])
+
+    login = sub.add_parser("login", help="read latency during a login burst")
+    login.add_argument("--burst", type=int, default=50, help="concurrent logins")
+    login.add_argument("--inline", action="store_true",
+                       help="verify on the event loop instead of the password pool")
+
+    purge = sub.add_parser("purge", help="hard-delete a prolific user")
+    purge.add_argument("--posts", type=int, default=1_000, help="posts by the deleted user")
+    purge.add_argument("--views", type=int, default=100_000, help="views on those posts")
+
+    stats = sub.add_parser("stats", help="admin dashboard counts")
+    stats.add_argument("--posts", type=int, nargs="+", default=[10_000, 100_000])
+
+    args = parser.parse_args(argv)
+    _use_bench_database()
+    if args.bench == "search":
+        asyncio.run(bench_search(args.posts, args.runs, args.seed))
+    elif args.bench == "login":
+        asyncio.run(bench_login(args.burst, args.runs, args.seed, args.inline))
+    elif args.bench == "purge":
+        asyncio.run(bench_purge(args.posts, args.views, args.runs, args.seed))
+    elif args.bench == "stats":
+        asyncio.run(bench_stats(args.posts, args.runs, args.seed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
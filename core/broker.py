@@ -0,0 +1,340 @@
+"""
+broker.py — Cross-worker pub/sub for chat broadcasts and presence.
+
+ConnectionManager (core/fanout.py) always delivers to its own sockets
+directly; the broker carries the same messages to the other workers and
+keeps a view of who is online there. CHAT_BROKER selects the implementation:
+
+    memory     single process: nothing to relay, no remote presence
+    postgres   LISTEN/NOTIFY on CHAT_BROKER_CHANNEL — no extra service
+
+Postgres protocol (one JSON object per NOTIFY, tagged with the sender's
+worker id "o"; a worker ignores its own):
+
+    msg    {"r": room, "t": serialised payload}     → deliver to local sockets
+    join   {"r": room, "u": username}               → remote presence +1
+    leave  {"r": room, "u": username}               → remote presence -1
+    hello  {}                                       → everyone answers with snap
+    snap   {"rooms": {room: [username, …]}, "first": bool}
+    beat   {}                                       → sender is alive
+
+A worker's presence is forgotten when no beat arrives for three
+CHAT_PRESENCE_INTERVALs, so a crashed worker's users drop out of the list.
+NOTIFY payloads are capped at 8000 bytes by Postgres. Envelopes are encoded
+without ASCII escaping (Turkish text stays two bytes a character) and
+callers check fits() against the final envelope before accepting a message.
+The database modules load only when the postgres broker is selected.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+CHAT_BROKER             = os.getenv("CHAT_BROKER", "memory")            # memory | postgres
+CHAT_BROKER_CHANNEL     = os.getenv("CHAT_BROKER_CHANNEL", "beelog_chat")
+CHAT_PRESENCE_INTERVAL  = float(os.getenv("CHAT_PRESENCE_INTERVAL", "15"))   # seconds
+
+_NOTIFY_LIMIT = 7900   # Postgres rejects NOTIFY payloads of 8000 bytes or more
+
+Deliver = Callable[[str, str], None]   # (room_id, serialised payload)
+
+
+def encode(message: dict) -> str:
+    """Compact JSON, non-ASCII kept as UTF-8 rather than \\uXXXX escapes."""
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+
+class ChatBroker:
+    """Interface. The in-memory broker is also the no-op base."""
+    name = "memory"
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def bind(self, deliver: Deliver) -> None:
+        self._deliver = deliver
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def fits(self, room_id: str, text: str) -> bool:
+        """Whether publish(room_id, text) can relay the message."""
+        return True
+
+    async def publish(self, room_id: str, text: str) -> None:
+        """Relay an already locally-delivered message to the other workers."""
+
+    def joined(self, room_id: str, username: str) -> None:
+        pass
+
+    def left(self, room_id: str, username: str) -> None:
+        pass
+
+    def remote_users(self, room_id: str) -> List[str]:
+        return []
+
+    def stats(self) -> dict:
+        return {"broker": self.name}
+
+
+class MemoryBroker(ChatBroker):
+    pass
+
+
+class PostgresBroker(ChatBroker):
+    name = "postgres"
+
+    def __init__(
+        self,
+        local_rooms: Callable[[], Dict[str, List[str]]],
+        channel: str = CHAT_BROKER_CHANNEL,
+        interval: float = CHAT_PRESENCE_INTERVAL,
+    ):
+        super().__init__()
+        self.channel  = channel
+        self.interval = interval
+        self.worker   = uuid.uuid4().hex[:12]
+        self._local_rooms = local_rooms   # room -> local usernames, for snapshots
+
+        self._listener = None   # dedicated asyncpg connection: LISTEN and every NOTIFY
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        self._send_lock  = asyncio.Lock()   # one query at a time on the listener
+        self._pending: set = set()   # in-flight presence publishes
+
+        # room -> worker -> username -> connection count
+        self._remote: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._seen: Dict[str, float] = {}   # worker -> last message (monotonic)
+
+        # Counters
+        self.published  = 0
+        self.received   = 0
+        self.failures   = 0
+        self.reconnects = 0
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._task is None:
+                try:
+                    await self._listen()
+                except Exception as e:
+                    # Chat still works within this worker; _run keeps retrying.
+                    self.failures += 1
+                    log.error(f"Chat broker could not LISTEN: {e}")
+                self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._listener is not None:
+            await self._listener.close()
+            self._listener = None
+
+    async def _listen(self) -> None:
+        import asyncpg
+        import sqlalchemy
+        from core.database import DATABASE_URL
+
+        dsn = sqlalchemy.engine.make_url(DATABASE_URL).set(drivername="postgresql")
+        self._listener = await asyncpg.connect(dsn.render_as_string(hide_password=False))
+        await self._listener.add_listener(self.channel, self._on_notify)
+        # Anything relayed while we were not listening is lost; start over.
+        self._remote.clear()
+        self._seen.clear()
+        await self._send({"k": "hello"})
+        await self._snapshot()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if self._listener is None or self._listener.is_closed():
+                    self.reconnects += 1
+                    await self._listen()
+                else:
+                    await self._send({"k": "beat"})
+                self._expire()
+            except Exception as e:
+                self.failures += 1
+                log.error(f"Chat broker heartbeat failed: {e}")
+
+    # ── Outgoing ──────────────────────────────────────────────────────────────
+
+    def _envelope(self, message: dict) -> str:
+        payload = encode({**message, "o": self.worker})
+        size    = len(payload.encode())
+        if size > _NOTIFY_LIMIT:
+            raise ValueError(f"chat payload of {size} bytes exceeds NOTIFY limit")
+        return payload
+
+    def fits(self, room_id: str, text: str) -> bool:
+        try:
+            self._envelope({"k": "msg", "r": room_id, "t": text})
+        except ValueError:
+            return False
+        return True
+
+    async def _send(self, message: dict) -> None:
+        # NOTIFY goes out on the listener connection rather than a pooled one:
+        # no checkout or BEGIN/COMMIT per message, and chat bursts don't
+        # compete with requests for the pool. Each NOTIFY is its own statement
+        # (and transaction), so identical payloads are never merged.
+        payload = self._envelope(message)
+        async with self._send_lock:
+            if self._listener is None or self._listener.is_closed():
+                raise ConnectionError("chat broker is not connected")
+            await self._listener.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        self.published += 1
+
+    def _send_later(self, message: dict) -> None:
+        # joined/left are called from sync code (disconnect); publish in the background.
+        task = asyncio.create_task(self._send_safely(message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _send_safely(self, message: dict) -> None:
+        try:
+            await self._send(message)
+        except Exception as e:
+            self.failures += 1
+            log.error(f"Chat broker publish failed: {e}")
+
+    async def publish(self, room_id: str, text: str) -> None:
+        try:
+            await self._send({"k": "msg", "r": room_id, "t": text})
+        except Exception as e:
+            self.failures += 1
+            log.error(f"Chat broker publish failed: {e}")
+
+    def joined(self, room_id: str, username: str) -> None:
+        self._send_later({"k": "join", "r": room_id, "u": username})
+
+    def left(self, room_id: str, username: str) -> None:
+        self._send_later({"k": "leave", "r": room_id, "u": username})
+
+    async def _snapshot(self) -> None:
+        """
+        Send local presence, split across as many NOTIFYs as needed. A room
+        too big for one message is split by user; receivers add up the parts.
+        """
+        budget = _NOTIFY_LIMIT - 200   # room for the envelope around "rooms"
+        chunk: Dict[str, List[str]] = {}
+        size, first = 0, True
+
+        def cost(room_id: str, name: Optional[str]) -> int:
+            n = len(encode(name).encode()) + 1 if name is not None else 0
+            return n if room_id in chunk else n + len(encode(room_id).encode()) + 4
+
+        for room_id, users in self._local_rooms().items():
+            for name in users or [None]:
+                if chunk and size + cost(room_id, name) > budget:
+                    await self._send({"k": "snap", "rooms": chunk, "first": first})
+                    chunk, size, first = {}, 0, False
+                size += cost(room_id, name)
+                names = chunk.setdefault(room_id, [])
+                if name is not None:
+                    names.append(name)
+        await self._send({"k": "snap", "rooms": chunk, "first": first})
+
+    # ── Incoming ──────────────────────────────────────────────────────────────
+
+    def _on_notify(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        origin = message.get("o")
+        if not origin or origin == self.worker:
+            return
+        self.received += 1
+        self._seen[origin] = time.monotonic()
+        kind = message.get("k")
+
+        if kind == "msg":
+            if self._deliver is not None:
+                self._deliver(message["r"], message["t"])
+        elif kind == "join":
+            users = self._remote.setdefault(message["r"], {}).setdefault(origin, {})
+            users[message["u"]] = users.get(message["u"], 0) + 1
+        elif kind == "leave":
+            self._forget(message["r"], origin, message["u"])
+        elif kind == "snap":
+            if message.get("first"):
+                self._drop_worker(origin)
+            for room_id, names in message.get("rooms", {}).items():
+                users = self._remote.setdefault(room_id, {}).setdefault(origin, {})
+                for name in names:
+                    users[name] = users.get(name, 0) + 1
+        elif kind == "hello":
+            self._drop_worker(origin)
+            task = asyncio.create_task(self._snapshot())
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _forget(self, room_id: str, origin: str, username: str) -> None:
+        workers = self._remote.get(room_id)
+        users   = workers.get(origin) if workers else None
+        if not users or username not in users:
+            return
+        users[username] -= 1
+        if users[username] <= 0:
+            del users[username]
+        if not users:
+            del workers[origin]
+        if not workers:
+            del self._remote[room_id]
+
+    def _drop_worker(self, origin: str) -> None:
+        for room_id in list(self._remote):
+            self._remote[room_id].pop(origin, None)
+            if not self._remote[room_id]:
+                del self._remote[room_id]
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - 3 * self.interval
+        for origin in [w for w, seen in self._seen.items() if seen < cutoff]:
+            del self._seen[origin]
+            self._drop_worker(origin)
+
+    # ── Presence / metrics ────────────────────────────────────────────────────
+
+    def remote_users(self, room_id: str) -> List[str]:
+        return [
+            name
+            for users in self._remote.get(room_id, {}).values()
+            for name, n in users.items()
+            for _ in range(n)
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "broker":     self.name,
+            "worker":     self.worker,
+            "peers":      len(self._seen),
+            "published":  self.published,
+            "received":   self.received,
+            "failures":   self.failures,
+            "reconnects": self.reconnects,
+        }
+
+
+def make_broker(local_rooms: Callable[[], Dict[str, List[str]]]) -> ChatBroker:
+    if CHAT_BROKER == "postgres":
+        return PostgresBroker(local_rooms)
+    return MemoryBroker()
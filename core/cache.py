@@ -0,0 +1,174 @@
+"""
+cache.py — In-process TTL/LRU cache for anonymous public GET responses.
+
+Entries are keyed by route path plus normalised query parameters and stored
+as serialised JSON bytes, so a hit skips both the DB and serialisation.
+Requests carrying a bearer token are never cached (liked_by_me and draft
+visibility depend on the viewer).
+
+Every entry is tagged with the posts it contains ("post:<id>") and, for
+listings, "listing"; write paths call invalidate() with the tags they touch.
+The cache is per worker, so the TTL bounds staleness across processes.
+"""
+
+import os
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+RESPONSE_CACHE_TTL         = float(os.getenv("RESPONSE_CACHE_TTL", "30"))            # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_MAX_BYTES   = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+def post_tag(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+LISTING    = "listing"      # feeds, related/adjacent — anything whose membership can change
+CATEGORIES = "categories"
+
+
+class CachedResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, content: bytes, meta: Dict[str, Any], headers: Dict[str, str]):
+        super().__init__(content=content, headers={**headers, "X-Cache": "HIT"})
+        self.meta = meta
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+    ):
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self.max_bytes   = max_bytes
+
+        # key -> (expires_at, body, tags, meta, headers)
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Set[str], Dict[str, Any], Dict[str, str]]]" = OrderedDict()
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._bytes = 0
+
+        self.hits          = 0
+        self.misses        = 0
+        self.evictions     = 0
+        self.invalidations = 0
+
+    # ── Keys ──────────────────────────────────────────────────────────────────
+
+    def key_for(self, request: Request) -> Optional[str]:
+        """Cache key for an anonymous request, or None when it must bypass the cache."""
+        if self.ttl <= 0:
+            return None
+        auth = request.headers.get("authorization", "")
+        if auth.lower().startswith("bearer "):
+            return None
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{params}"
+
+    # ── Lookup / store ────────────────────────────────────────────────────────
+
+    def get(self, key: Optional[str]) -> Optional[CachedResponse]:
+        if key is None:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, body, _, meta, headers = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return CachedResponse(body, meta, headers)
+
+    def store(
+        self,
+        key: Optional[str],
+        payload: Any,
+        tags: Iterable[str] = (),
+        meta: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
+        """
+        Serialise and cache payload under key. Returns the Response to send,
+        or payload unchanged when key is None so FastAPI handles it as usual.
+        headers are replayed on every hit (ETag, Cache-Control, …).
+        """
+        if key is None:
+            return payload
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        if len(body) <= self.max_bytes:
+            self._remove(key)
+            tag_set = set(tags)
+            self._entries[key] = (time.monotonic() + self.ttl, body, tag_set, meta or {}, headers or {})
+            self._bytes += len(body)
+            for tag in tag_set:
+                self._by_tag.setdefault(tag, set()).add(key)
+            self._evict()
+        return Response(
+            content=body, media_type="application/json", headers={**(headers or {}), "X-Cache": "MISS"}
+        )
+
+    # ── Invalidation ──────────────────────────────────────────────────────────
+
+    def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            for key in list(self._by_tag.get(tag, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._by_tag.clear()
+        self._bytes = 0
+
+    # ── Internals ─────────────────────────────────────────────────────────────
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, body, tags, _, _ = entry
+        self._bytes -= len(body)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries":       len(self._entries),
+            "bytes":         self._bytes,
+            "hits":          self.hits,
+            "misses":        self.misses,
+            "hit_ratio":     round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions":     self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,69 @@
+"""
+conditional.py — ETag / Last-Modified validators for conditional GETs.
+
+Handlers compute validators from cheap columns (updated_at, counters) and
+call not_modified() before hydrating or serialising anything, so a client
+or the Cloudflare proxy revalidating an unchanged resource gets a bodiless
+304 instead of the full payload.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the given parts (order matters)."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+def http_date(dt: datetime) -> str:
+    """Naive datetimes are treated as UTC (all model timestamps are utcnow)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "public, max-age=0, must-revalidate",
+) -> Dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    RFC 9110 evaluation: If-None-Match wins when present; otherwise fall back
+    to If-Modified-Since (second precision).
+    """
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        if inm.strip() == "*":
+            return True
+        candidates = {t.strip().removeprefix("W/") for t in inm.split(",")}
+        return etag in candidates
+
+    ims = request.headers.get("if-modified-since")
+    if ims is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(ims)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    lm = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+    return lm.replace(microsecond=0) <= since
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,362 @@
+"""
+content.py — Single-pass, allowlist HTML sanitizer for post bodies.
+
+process_html() tokenizes the editor's HTML once (stdlib HTMLParser, so
+unquoted attributes, entity-encoded schemes and odd whitespace are parsed
+the way a browser would) and re-serialises only allowlisted tags and
+attributes with everything re-escaped. The same pass collects the plain
+text, word count, excerpt, heading outline and image URLs, so create/update
+walk the body once and store the results alongside it (see post_crud).
+
+Headings h1–h3 get stable ids ("h-0", "h-1", …) matching the outline, so the
+table of contents can link to them without re-parsing the body.
+
+Anything not on the allowlist is unwrapped (its text is kept); script-like
+containers (script, style, svg, math, …) are dropped with their content.
+
+    python -m core.content --bench           # process_html on a 1 MB body
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+from dataclasses import dataclass, field
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+WORDS_PER_MINUTE = 200
+EXCERPT_CHARS    = 300
+
+# tag -> allowed attributes ("class" and "style" are filtered separately)
+_ALLOWED_TAGS: Dict[str, frozenset] = {
+    tag: frozenset(attrs) for tag, attrs in {
+        "p": (), "br": (), "hr": (), "div": (), "span": (),
+        "h1": (), "h2": (), "h3": (), "h4": (), "h5": (), "h6": (),
+        "strong": (), "b": (), "em": (), "i": (), "u": (), "s": (), "strike": (),
+        "sub": (), "sup": (), "code": (), "pre": ("spellcheck",), "blockquote": (),
+        "ol": (), "ul": (), "li": ("data-list",),
+        "a": ("href", "title", "target", "rel"),
+        "img": ("src", "alt", "title", "width", "height"),
+        "iframe": ("src", "frameborder", "allowfullscreen"),
+        "figure": (), "figcaption": (),
+        "table": (), "thead": (), "tbody": (), "tr": (),
+        "th": ("colspan", "rowspan"), "td": ("colspan", "rowspan"),
+    }.items()
+}
+_VOID_TAGS  = frozenset({"br", "hr", "img"})
+_BLOCK_TAGS = frozenset({
+    "p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote",
+    "ol", "ul", "li", "figure", "figcaption", "table", "tr", "th", "td", "br", "hr",
+})
+
+# Dropped together with everything inside them.
+_DROP_TAGS = frozenset({
+    "script", "style", "svg", "math", "template", "noscript", "object",
+    "embed", "applet", "frame", "frameset", "noembed", "xml", "head", "title",
+})
+
+_LINK_SCHEMES  = frozenset({"http", "https", "mailto"})
+_IMAGE_SCHEMES = frozenset({"http", "https"})
+_DATA_IMAGE    = re.compile(r"^data:image/(png|jpe?g|gif|webp);base64,[a-z0-9+/=\s]*$", re.I)
+_EMBED_HOSTS   = frozenset({
+    "www.youtube.com", "youtube.com", "www.youtube-nocookie.com", "player.vimeo.com",
+})
+
+_OUTLINE_TAGS = frozenset({"h1", "h2", "h3"})
+
+_STYLE_PROPS = frozenset({"color", "background-color", "text-align"})
+_STYLE_VALUE = re.compile(r"^[#\w\s(),.%-]+$")
+_STYLE_FUNC  = re.compile(r"([\w-]*)\s*\(")
+_COLOR_FUNCS = frozenset({"rgb", "rgba", "hsl", "hsla"})   # no url(), expression(), …
+_CONTROL     = re.compile(r"[\x00-\x20\x7f]+")
+
+
+@dataclass
+class ParsedHTML:
+    html:       str
+    text:       str
+    word_count: int
+    excerpt:    str
+    outline:    List[Dict[str, object]] = field(default_factory=list)   # {level, text, id}
+    images:     List[str]               = field(default_factory=list)
+
+    @property
+    def read_time(self) -> int:
+        return max(1, round(self.word_count / WORDS_PER_MINUTE))
+
+    @property
+    def first_image(self) -> Optional[str]:
+        return self.images[0] if self.images else None
+
+
+def _safe_url(value: str, schemes: frozenset) -> Optional[str]:
+    # Browsers ignore embedded whitespace/control characters in the scheme,
+    # so "java\tscript:" must be judged as "javascript:".
+    compact = _CONTROL.sub("", value)
+    if not compact:
+        return None
+    head = re.split(r"[/?#]", compact, maxsplit=1)[0]
+    if ":" in head:
+        scheme = head.split(":", 1)[0].lower()
+        if scheme not in schemes:
+            return None
+    return value.strip()
+
+
+def _safe_style(value: str) -> Optional[str]:
+    kept = []
+    for decl in value.split(";"):
+        prop, sep, val = decl.partition(":")
+        prop, val = prop.strip().lower(), val.strip()
+        if (
+            sep and prop in _STYLE_PROPS and _STYLE_VALUE.match(val)
+            and all(f.lower() in _COLOR_FUNCS for f in _STYLE_FUNC.findall(val))
+        ):
+            kept.append(f"{prop}: {val}")
+    return "; ".join(kept) or None
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self, excerpt_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str]    = []
+        self.text: List[str]   = []
+        self.images: List[str] = []
+        self.outline: List[Dict[str, object]] = []
+
+        self._stack: List[str] = []        # open allowlisted tags
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._heading: Optional[List[str]] = None   # text of the open h1–h3
+        self._excerpt_chars = excerpt_chars
+
+    # ── Attributes ────────────────────────────────────────────────────────────
+
+    def _clean_attrs(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> Optional[str]:
+        """Serialised attribute string, or None if the element must be dropped."""
+        allowed = _ALLOWED_TAGS[tag]
+        kept: Dict[str, Optional[str]] = {}
+        for name, value in attrs:
+            name = name.lower()
+            if name == "class" and value:
+                classes = [c for c in value.split() if c.startswith("ql-")]
+                if classes:
+                    kept["class"] = " ".join(classes)
+            elif name == "style" and value:
+                style = _safe_style(value)
+                if style:
+                    kept["style"] = style
+            elif name in allowed:
+                if name in ("href", "src"):
+                    if value is None:
+                        continue
+                    if tag == "img" and _DATA_IMAGE.match(value.strip()):
+                        value = value.strip()
+                    else:
+                        value = _safe_url(
+                            value, _LINK_SCHEMES if tag == "a" else _IMAGE_SCHEMES
+                        )
+                    if value is None:
+                        continue
+                elif name == "target":
+                    if (value or "").lower() != "_blank":
+                        continue
+                    kept["rel"] = "noopener noreferrer"
+                elif name == "rel":
+                    continue   # only ever set alongside target
+                kept[name] = value
+
+        if tag == "img":
+            if "src" not in kept:
+                return None
+            self.images.append(kept["src"])
+        elif tag == "iframe":
+            src = kept.get("src") or ""
+            if urlsplit(src).scheme != "https" or urlsplit(src).hostname not in _EMBED_HOSTS:
+                return None
+
+        return "".join(
+            f" {name}" if value is None else f' {name}="{escape(value, quote=True)}"'
+            for name, value in kept.items()
+        )
+
+    # ── Tokens ────────────────────────────────────────────────────────────────
+
+    def _open(self, tag: str, attrs, self_closing: bool) -> None:
+        if self._skip_tag is not None:
+            if tag == self._skip_tag and not self_closing:
+                self._skip_depth += 1
+            return
+        if tag in _DROP_TAGS:
+            if not self_closing:
+                self._skip_tag, self._skip_depth = tag, 1
+            return
+        if tag not in _ALLOWED_TAGS:
+            return   # unwrap: the element goes, its text stays
+        rendered = self._clean_attrs(tag, attrs)
+        if rendered is None:
+            if tag not in _VOID_TAGS and not self_closing:
+                self._skip_tag, self._skip_depth = tag, 1
+            return
+        if tag in _OUTLINE_TAGS and not self_closing and self._heading is None:
+            rendered += f' id="h-{len(self.outline)}"'
+            self.outline.append({"level": int(tag[1]), "text": "", "id": f"h-{len(self.outline)}"})
+            self._heading = []
+        self.out.append(f"<{tag}{rendered}>")
+        if tag in _BLOCK_TAGS:
+            self.text.append(" ")
+        if tag not in _VOID_TAGS:
+            if self_closing:
+                self.out.append(f"</{tag}>")
+            else:
+                self._stack.append(tag)
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag not in self._stack:
+            return
+        while self._stack:
+            open_tag = self._stack.pop()
+            self.out.append(f"</{open_tag}>")
+            if open_tag in _OUTLINE_TAGS and self._heading is not None:
+                self.outline[-1]["text"] = " ".join("".join(self._heading).split())
+                self._heading = None
+            if open_tag == tag:
+                break
+        if tag in _BLOCK_TAGS:
+            self.text.append(" ")
+
+    def handle_data(self, data):
+        if self._skip_tag is not None or not data:
+            return
+        self.out.append(escape(data, quote=False))
+        self.text.append(data)
+        if self._heading is not None:
+            self._heading.append(data)
+
+    # Comments, doctypes, processing instructions and CDATA are discarded.
+    def handle_comment(self, data):
+        pass
+
+    def handle_decl(self, decl):
+        pass
+
+    def handle_pi(self, data):
+        pass
+
+    def unknown_decl(self, data):
+        pass
+
+    # ── Output ────────────────────────────────────────────────────────────────
+
+    def finish(self) -> ParsedHTML:
+        self.close()
+        # A body can end inside a dropped element (an unclosed <style>); stop
+        # skipping, or the unwinding below would never pop the stack.
+        self._skip_tag = None
+        while self._stack:
+            self.handle_endtag(self._stack[-1])
+
+        words   = "".join(self.text).split()
+        text    = " ".join(words)
+        excerpt = text
+        if len(excerpt) > self._excerpt_chars:
+            cut = excerpt[:self._excerpt_chars].rsplit(" ", 1)[0]
+            excerpt = cut.rstrip(",.;:") + "…"
+        return ParsedHTML(
+            html="".join(self.out).strip(),
+            text=text,
+            word_count=len(words),
+            excerpt=excerpt,
+            outline=[h for h in self.outline if h["text"]],
+            images=self.images,
+        )
+
+
+def process_html(html: str, excerpt_chars: int = EXCERPT_CHARS) -> ParsedHTML:
+    """Sanitize html and extract its text, excerpt, outline and image URLs in one pass."""
+    parser = _Sanitizer(excerpt_chars)
+    if html:
+        parser.feed(html)
+    return parser.finish()
+
+
+# ── Benchmark ─────────────────────────────────────────────────────────────────
+
+_SAMPLE_WORDS = (
+    "the bee colony forages nectar pollen comb hive queen worker drone swarm "
+    "season garden meadow flower honey wax frame smoke keeper spring summer"
+).split()
+
+
+def _sample_body(size: int, seed: int = 1) -> str:
+    """Editor-like HTML of about size characters, with some markup to strip."""
+    rng = random.Random(seed)
+
+    def words(n: int) -> str:
+        return " ".join(rng.choice(_SAMPLE_WORDS) for _ in range(n))
+
+    blocks: List[str] = []
+    total = 0
+    while total < size:
+        kind = rng.randrange(10)
+        if kind == 0:
+            block = f"<h2>{words(5)}</h2>"
+        elif kind == 1:
+            block = "<ul>" + "".join(f"<li>{words(8)}</li>" for _ in range(4)) + "</ul>"
+        elif kind == 2:
+            block = (f'<figure><img src="https://cdn.example.com/{rng.randrange(10**6)}.jpg" '
+                     f'alt="{words(3)}" onerror="alert(1)"><figcaption>{words(6)}</figcaption></figure>')
+        elif kind == 3:
+            block = f"<blockquote>{words(30)}<script>track()</script></blockquote>"
+        else:
+            block = (f"<p>{words(25)} <strong>{words(3)}</strong> "
+                     f'<a href="https://example.com/{rng.randrange(1000)}" target="_blank">{words(2)}</a> '
+                     f'<span style="color: rgb(200, 30, 30); font-size: 40px">{words(4)}</span> '
+                     f"<em>{words(3)}</em> {words(20)}</p>")
+        blocks.append(block)
+        total += len(block)
+    return "".join(blocks)
+
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.content")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--size", type=int, default=1_000_000, help="body size in characters")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+
+    body = _sample_body(args.size)
+    samples = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        parsed = process_html(body)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    p50, p99 = samples[len(samples) // 2], samples[min(len(samples) - 1, int(len(samples) * .99))]
+    print(f"process_html on {len(body) / 1e6:.2f} MB ({parsed.word_count} words), {args.runs} runs")
+    print(f"  p50 {p50 * 1000:8.1f} ms   p99 {p99 * 1000:8.1f} ms   {len(body) / 1e6 / p50:.1f} MB/s")
+    print(f"  output {len(parsed.html) / 1e6:.2f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -1,22 +1,130 @@
 import sqlalchemy
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import SQLModel
 from sqlalchemy.orm import sessionmaker
+from starlette.requests import HTTPConnection
+from starlette.responses import Response
+from contextvars import ContextVar
+from typing import Dict, Optional
 import os
+import time
 from dotenv import load_dotenv
 
+from core.security import connection_user
+from schemas.schemas import UserSession
+
 load_dotenv()
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL      = os.getenv("DATABASE_URL")
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")   # optional streaming replica
+
+# ── Pool settings ─────────────────────────────────────────────────────────────
+# Pre-ping costs a round trip on every checkout; with DB_POOL_RECYCLE below
+# the server's idle timeout it can usually be turned off.
+DB_POOL_SIZE     = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW  = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT  = float(os.getenv("DB_POOL_TIMEOUT", "30"))     # seconds to wait for a connection
+DB_POOL_RECYCLE  = int(os.getenv("DB_POOL_RECYCLE", "-1"))       # seconds; -1 = never
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# asyncpg statement caches. Set both to 0 behind PgBouncer in transaction mode.
+DB_STATEMENT_CACHE_SIZE          = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "100"))
+
+
+# ── Pool metrics ──────────────────────────────────────────────────────────────
+# Checkout wait time, connections in use and overflow checkouts, attributed to
+# the route template that asked for the connection ("background" for work
+# outside a request). Per worker.
+
+_db_route: ContextVar[str] = ContextVar("db_route", default="background")
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.routes: Dict[str, Dict[str, float]] = {}
+        self.timeouts = 0
+
+    def record(self, wait: float, in_use: int, overflow: bool) -> None:
+        m = self.routes.get(_db_route.get())
+        if m is None:
+            m = self.routes[_db_route.get()] = {
+                "checkouts": 0, "wait_total": 0.0, "wait_max": 0.0,
+                "max_in_use": 0, "overflow": 0,
+            }
+        m["checkouts"]  += 1
+        m["wait_total"] += wait
+        m["wait_max"]    = max(m["wait_max"], wait)
+        m["max_in_use"]  = max(m["max_in_use"], in_use)
+        m["overflow"]   += overflow
+
+    def stats(self, pool) -> dict:
+        return {
+            "size":        pool.size(),
+            "in_use":      pool.checkedout(),
+            "idle":        pool.checkedin(),
+            "overflow":    max(0, pool.overflow()),
+            "timeouts":    self.timeouts,
+            "routes": {
+                route: {
+                    **m,
+                    "wait_avg_ms": round(m["wait_total"] / m["checkouts"] * 1000, 3),
+                    "wait_max_ms": round(m["wait_max"] * 1000, 3),
+                }
+                for route, m in sorted(self.routes.items())
+            },
+        }
+
+
+pool_metrics    = PoolMetrics()
+replica_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that times every checkout (including waits for a free slot)."""
+    metrics = pool_metrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except sqlalchemy.exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        in_use = self.checkedout()
+        self.metrics.record(time.perf_counter() - started, in_use, in_use > self.size())
+        return conn
+
+
+class ReplicaPool(InstrumentedPool):
+    metrics = replica_metrics
+
+
+def _make_engine(url: str, poolclass):
+    connect_args = {}
+    if "+asyncpg" in url:
+        connect_args = {
+            "statement_cache_size":          DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE,
+        }
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=poolclass,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        connect_args=connect_args,
+    )
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-)
+
+engine = _make_engine(DATABASE_URL, InstrumentedPool)
+
+# Without DATABASE_READ_URL the read engine is simply the primary.
+read_engine = _make_engine(DATABASE_READ_URL, ReplicaPool) if DATABASE_READ_URL else engine
 
 async_session = sessionmaker(
     engine,
@@ -24,47 +132,88 @@ async_session = sessionmaker(
     expire_on_commit=False,
 )
 
+async_read_session = sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
 
-async def init_db():
-    """
-    Creates all new blog tables and applies additive column migrations.
-    Old chat/tweet tables are left untouched.
-    """
-    # Import all models so SQLModel.metadata knows about them
-    from models.models import (  # noqa: F401
-        User, BlogCategory, BlogPost, BlogTag, BlogPostTag,
-        BlogLike, BlogComment, BlogMedia, BlogPostView,
-    )
 
-    # Step 1: create new tables in its own transaction
+def pool_stats() -> dict:
+    stats = {"primary": pool_metrics.stats(engine.pool)}
+    if read_engine is not engine:
+        stats["replica"] = replica_metrics.stats(read_engine.pool)
+    return stats
+
+
+# ── Session dependencies ──────────────────────────────────────────────────────
+# get_session is the primary (write) session; read-only routes use
+# get_read_session, which goes to the replica when one is configured.
+# Read-your-writes: after a write, reads go to the primary for
+# READ_YOUR_WRITES_WINDOW seconds, comfortably above normal replica lag. Write
+# responses carry the deadline in READ_YOUR_WRITES_HEADER (unix seconds) and
+# the frontend sends it back on its requests (auth.js), so the pin holds on
+# whichever worker serves the read. Each worker also remembers its own
+# signed-in writers for clients that don't echo the header; that fallback
+# only covers reads landing on the worker that took the write.
+
+READ_YOUR_WRITES_WINDOW = float(os.getenv("READ_YOUR_WRITES_WINDOW", "15"))   # seconds
+READ_YOUR_WRITES_HEADER = "X-Read-Primary-Until"
+
+_recent_writers: Dict[int, float] = {}
+
+
+def _mark_writer(user: Optional[UserSession]) -> None:
+    if user is None or read_engine is engine:
+        return
+    now = time.monotonic()
+    if len(_recent_writers) > 4096:
+        for uid in [u for u, until in _recent_writers.items() if until <= now]:
+            del _recent_writers[uid]
+    _recent_writers[user.id] = now + READ_YOUR_WRITES_WINDOW
+
+
+def _reads_from_primary(conn: HTTPConnection) -> bool:
     try:
-        async with engine.begin() as conn:
-            await conn.run_sync(SQLModel.metadata.create_all)
-    except Exception as e:
-        print(f"create_all note: {e}")
-
-    # Step 2: additive column migrations — each gets its own transaction so a
-    # failure in one doesn't abort the others (asyncpg aborts the whole
-    # connection on error if they share a transaction).
-    migrations = [
-        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS website_url VARCHAR(300)',
-        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS twitter_handle VARCHAR(50)',
-        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS post_count INTEGER NOT NULL DEFAULT 0',
-        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS is_verified BOOLEAN NOT NULL DEFAULT FALSE',
-        # Ensure 'author' exists in the enum before we update rows to use it.
-        "ALTER TYPE userrole ADD VALUE IF NOT EXISTS 'author'",
-        # Cast to text so we don't hit enum-type errors if 'intern' was never
-        # a valid value in this DB's userrole enum.
-        "UPDATE \"user\" SET role = 'author' WHERE role::text = 'intern'",
-    ]
-    for sql in migrations:
-        try:
-            async with engine.begin() as conn:
-                await conn.execute(sqlalchemy.text(sql))
-        except Exception as e:
-            print(f"Migration note ({sql[:50]}…): {e}")
+        if float(conn.headers.get(READ_YOUR_WRITES_HEADER, "0")) > time.time():
+            return True
+    except ValueError:
+        pass
+    user = connection_user(conn)
+    if user is None:
+        return False
+    until = _recent_writers.get(user.id)
+    return until is not None and until > time.monotonic()
+
 
+def _tag_route(conn: HTTPConnection) -> None:
+    # Attribute this request's pool checkouts to its route template.
+    route = conn.scope.get("route")
+    _db_route.set(getattr(route, "path", conn.url.path))
 
-async def get_session():
+
+# Both dependencies take an HTTPConnection rather than a Request so they also
+# resolve on websocket routes. A websocket is long-lived, so it never counts
+# as a write for read-your-writes.
+
+async def get_session(conn: HTTPConnection, response: Response):
+    _tag_route(conn)
+    writes = conn.scope["type"] == "http" and conn.scope["method"] not in ("GET", "HEAD", "OPTIONS")
+    user   = connection_user(conn) if writes else None
+    if writes:
+        _mark_writer(user)
+        if read_engine is not engine:
+            until = time.time() + READ_YOUR_WRITES_WINDOW
+            response.headers[READ_YOUR_WRITES_HEADER] = f"{until:.0f}"
     async with async_session() as session:
         yield session
+    if writes:
+        _mark_writer(user)   # restart the window once the write has landed
+
+
+async def get_read_session(conn: HTTPConnection):
+    _tag_route(conn)
+    pinned  = read_engine is not engine and _reads_from_primary(conn)
+    factory = async_session if pinned else async_read_session
+    async with factory() as session:
+        yield session
@@ -0,0 +1,286 @@
+"""
+fanout.py — Per-room WebSocket fan-out with per-connection send queues.
+
+broadcast() serialises the payload once and drops it into every member's
+bounded queue without awaiting; each connection has its own writer task
+draining that queue onto the socket. A slow or stalled client therefore only
+fills its own queue instead of holding up the room.
+
+When a queue is full (CHAT_SEND_QUEUE messages behind) or a single send takes
+longer than CHAT_SEND_TIMEOUT, CHAT_SLOW_POLICY decides:
+
+    evict   close the socket with 1013 (try again later); the client reconnects
+    drop    discard the message for that client only and keep the connection
+
+Rooms map id(websocket) -> Connection, so join/leave are O(1). Sockets are
+per worker; the broker (core/broker.py, CHAT_BROKER) relays broadcasts and
+presence to the other workers.
+
+    python -m core.fanout --bench            # broadcast latency, 1000 fake sockets
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+from core.broker import ChatBroker, MemoryBroker, encode, make_broker
+
+log = logging.getLogger(__name__)
+
+CHAT_SEND_QUEUE   = int(os.getenv("CHAT_SEND_QUEUE", "256"))          # messages per connection
+CHAT_SEND_TIMEOUT = float(os.getenv("CHAT_SEND_TIMEOUT", "10"))       # seconds per send
+CHAT_SLOW_POLICY  = os.getenv("CHAT_SLOW_POLICY", "evict")            # evict | drop
+
+_CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class Connection:
+    __slots__ = ("ws", "room_id", "username", "user_id", "queue", "writer", "sent", "dropped")
+
+    def __init__(self, ws, room_id: str, username: str, user_id: int, max_queue: int):
+        self.ws       = ws
+        self.room_id  = room_id
+        self.username = username
+        self.user_id  = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.writer: Optional[asyncio.Task] = None
+        self.sent     = 0
+        self.dropped  = 0
+
+
+class ConnectionManager:
+    def __init__(
+        self,
+        max_queue: int = CHAT_SEND_QUEUE,
+        send_timeout: float = CHAT_SEND_TIMEOUT,
+        slow_policy: str = CHAT_SLOW_POLICY,
+        broker: Optional[ChatBroker] = None,
+    ):
+        self.max_queue    = max_queue
+        self.send_timeout = send_timeout
+        self.slow_policy  = slow_policy
+
+        # room_id -> {id(websocket): Connection}
+        self._rooms: Dict[str, Dict[int, Connection]] = {}
+        self._closing: set = set()   # keeps close tasks referenced until done
+
+        self.broker = broker or make_broker(self.local_presence)
+        self.broker.bind(self._deliver)
+
+        # Counters
+        self.broadcasts = 0
+        self.sent       = 0
+        self.dropped    = 0
+        self.evicted    = 0
+
+    # ── Membership ────────────────────────────────────────────────────────────
+
+    async def start(self):
+        await self.broker.start()
+
+    async def stop(self):
+        await self.broker.stop()
+
+    async def connect(self, websocket, room_id: str, username: str, user_id: int):
+        await self.broker.start()   # idempotent; the chat router has no lifespan hook
+        await websocket.accept()
+        self.attach(websocket, room_id, username, user_id)
+
+    def attach(self, websocket, room_id: str, username: str, user_id: int) -> Connection:
+        """Register an already-accepted socket and start its writer."""
+        conn = Connection(websocket, room_id, username, user_id, self.max_queue)
+        conn.writer = asyncio.create_task(self._writer(conn))
+        self._rooms.setdefault(room_id, {})[id(websocket)] = conn
+        self.broker.joined(room_id, username)
+        return conn
+
+    def disconnect(self, websocket, room_id: str):
+        room = self._rooms.get(room_id)
+        conn = room.pop(id(websocket), None) if room is not None else None
+        if room is not None and not room:
+            del self._rooms[room_id]
+        if conn is None:
+            return
+        self.broker.left(room_id, conn.username)
+        if conn.writer is not None and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+
+    # ── Sending ───────────────────────────────────────────────────────────────
+
+    def _enqueue(self, conn: Connection, text: str) -> None:
+        try:
+            conn.queue.put_nowait(text)
+        except asyncio.QueueFull:
+            if self.slow_policy == "drop":
+                conn.dropped += 1
+                self.dropped += 1
+            else:
+                self._evict(conn, "send queue full")
+
+    def _deliver(self, room_id: str, text: str, exclude=None) -> None:
+        room = self._rooms.get(room_id)
+        if not room:
+            return
+        # Copy: eviction removes entries while we iterate.
+        for conn in list(room.values()):
+            if conn.ws is not exclude:
+                self._enqueue(conn, text)
+
+    async def broadcast(self, room_id: str, payload: dict, exclude=None):
+        """Deliver to this worker's sockets now and relay to the others."""
+        text = encode(payload)
+        self.broadcasts += 1
+        self._deliver(room_id, text, exclude)
+        await self.broker.publish(room_id, text)
+
+    def fits(self, room_id: str, payload: dict) -> bool:
+        """Whether payload is small enough for broadcast() to relay to other workers."""
+        return self.broker.fits(room_id, encode(payload))
+
+    async def send(self, websocket, room_id: str, payload: dict):
+        """Queue a message for one socket, in order with its broadcasts."""
+        conn = self._rooms.get(room_id, {}).get(id(websocket))
+        if conn is not None:
+            self._enqueue(conn, encode(payload))
+
+    async def _writer(self, conn: Connection):
+        while True:
+            text = await conn.queue.get()
+            try:
+                await asyncio.wait_for(conn.ws.send_text(text), self.send_timeout)
+            except asyncio.TimeoutError:
+                if self.slow_policy == "drop":
+                    conn.dropped += 1
+                    self.dropped += 1
+                    continue
+                self._evict(conn, "send timed out")
+                return
+            except Exception:
+                # Socket already gone; the receive loop will see the disconnect.
+                self.disconnect(conn.ws, conn.room_id)
+                return
+            conn.sent += 1
+            self.sent += 1
+
+    def _evict(self, conn: Connection, reason: str) -> None:
+        self.evicted += 1
+        log.info(f"Evicting slow chat client {conn.username} from {conn.room_id}: {reason}")
+        self.disconnect(conn.ws, conn.room_id)
+        task = asyncio.create_task(self._close(conn.ws))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(websocket):
+        try:
+            await websocket.close(code=_CLOSE_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+
+    # ── Presence / metrics ────────────────────────────────────────────────────
+
+    def local_presence(self) -> Dict[str, List[str]]:
+        return {
+            room_id: [c.username for c in room.values()]
+            for room_id, room in self._rooms.items()
+        }
+
+    def online_count(self, room_id: str) -> int:
+        return len(self._rooms.get(room_id, {})) + len(self.broker.remote_users(room_id))
+
+    def online_users(self, room_id: str) -> List[str]:
+        local = [c.username for c in self._rooms.get(room_id, {}).values()]
+        return local + self.broker.remote_users(room_id)
+
+    def stats(self) -> dict:
+        conns = [c for room in self._rooms.values() for c in room.values()]
+        return {
+            "rooms":       len(self._rooms),
+            "connections": len(conns),
+            "queued":      sum(c.queue.qsize() for c in conns),
+            "max_queued":  max((c.queue.qsize() for c in conns), default=0),
+            "broadcasts":  self.broadcasts,
+            "sent":        self.sent,
+            "dropped":     self.dropped,
+            "evicted":     self.evicted,
+            "broker":      self.broker.stats(),
+        }
+
+
+# ── Load test ─────────────────────────────────────────────────────────────────
+# In-process: fake sockets that record when each message arrives, a share of
+# them stalled to show they no longer hold up the rest of the room.
+
+class _FakeSocket:
+    def __init__(self, delay: float):
+        self.delay    = delay
+        self.received: Dict[int, float] = {}
+        self.closed   = False
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received[json.loads(text)["seq"]] = time.perf_counter()
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def _pct(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+
+async def _bench(n: int, messages: int, slow: int, slow_delay: float) -> None:
+    manager = ConnectionManager(send_timeout=slow_delay / 2, broker=MemoryBroker())
+    sockets = [_FakeSocket(slow_delay if i < slow else 0.0) for i in range(n)]
+    for i, ws in enumerate(sockets):
+        await manager.connect(ws, "bench", f"u{i}", i)
+
+    enqueue: List[float] = []
+    sent_at: Dict[int, float] = {}
+    for seq in range(messages):
+        sent_at[seq] = t0 = time.perf_counter()
+        await manager.broadcast("bench", {"type": "chat", "seq": seq})
+        enqueue.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.5)
+
+    fast = [ws for ws in sockets if not ws.delay]
+    delivery = [ws.received[seq] - sent_at[seq] for ws in fast for seq in ws.received]
+    missing  = sum(messages - len(ws.received) for ws in fast)
+    print(f"{n} connections ({slow} stalled), {messages} broadcasts")
+    print(f"  broadcast call   p50 {_pct(enqueue, .5):8.3f} ms   p99 {_pct(enqueue, .99):8.3f} ms")
+    print(f"  delivery (fast)  p50 {_pct(delivery, .5):8.3f} ms   p99 {_pct(delivery, .99):8.3f} ms")
+    print(f"  undelivered to fast clients: {missing}")
+    print(f"  {manager.stats()}")
+
+    for ws in sockets:
+        manager.disconnect(ws, "bench")
+
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.fanout")
+    parser.add_argument("--bench", action="store_true")
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--slow", type=int, default=10, help="stalled clients")
+    parser.add_argument("--slow-delay", type=float, default=2.0, help="seconds per send")
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+    asyncio.run(_bench(args.connections, args.messages, args.slow, args.slow_delay))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
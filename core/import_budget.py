@@ -0,0 +1,87 @@
+"""
+import_budget.py — Import-time budget for the app's boot path.
+
+Imports main:app in a fresh interpreter under `python -X importtime` and
+fails (exit 1) when the cumulative import time of `main` exceeds the budget
+or when a heavy optional dependency is pulled in at import time instead of on
+first use:
+
+    python -m core.import_budget                   # budget from IMPORT_BUDGET_MS
+    python -m core.import_budget --budget 900 --top 15
+
+The child inherits the environment, so DATABASE_URL / SECRET_KEY must be set
+as they would be for the server. Timings are noisy; the run is repeated
+--runs times and the fastest one is judged.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+# Must only load when their feature is first used.
+LAZY_MODULES = ("requests", "httpx", "imagekitio", "PIL", "passlib")
+
+
+def measure(module: str = "main") -> Tuple[float, Dict[str, float]]:
+    """Import module in a child interpreter. Returns (total ms, {package: cumulative ms}).
+
+    Packages are keyed by top-level name ("sqlalchemy", not "sqlalchemy.orm")
+    with the cost of their first, outermost import.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue   # header row
+        ms, name = int(cum) / 1000, name.strip()
+        if name == module:
+            total = ms
+        root = name.split(".", 1)[0]
+        packages[root] = max(packages.get(root, 0.0), ms)
+    packages.pop(module, None)
+    return total, packages
+
+
+def _main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.import_budget")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="milliseconds")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    total, packages = min(
+        (measure(args.module) for _ in range(max(1, args.runs))), key=lambda r: r[0]
+    )
+
+    print(f"import {args.module}: {total:.1f} ms (budget {args.budget:.0f} ms)")
+    for name, ms in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {ms:9.1f} ms  {name}")
+
+    failed = False
+    eager = [m for m in LAZY_MODULES if m in packages]
+    if eager:
+        print(f"FAIL: imported at boot, should be lazy: {', '.join(eager)}")
+        failed = True
+    if total > args.budget:
+        print(f"FAIL: over budget by {total - args.budget:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,343 @@
+"""
+migrations.py — Versioned schema migrations.
+
+Render (our host) has no Procfile release phase, so the Procfile only
+declares the web process and boot applies pending migrations itself:
+check_schema() is one SELECT against schema_version, and only when the
+database is behind the code does it run the migrations. The runner holds a
+Postgres advisory lock, so workers that boot together apply each migration
+exactly once; the others wait on the lock and find nothing left to do. Set
+AUTO_MIGRATE=false on hosts that run the CLI as a release/pre-deploy step,
+and boot then refuses to start against an outdated schema instead:
+
+    python -m core.migrations            # apply pending migrations
+    python -m core.migrations --status   # print current / latest version
+
+Migrations are append-only: never edit a released one, add a new version.
+Each step (an SQL string or an async callable) runs in its own transaction,
+since asyncpg aborts the whole transaction on the first error and some DDL
+(ALTER TYPE … ADD VALUE) must commit before its result can be used.
+Old chat/tweet tables are left untouched.
+"""
+
+import os
+import sys
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence, Union
+
+import sqlalchemy
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.database import engine, async_session
+
+log = logging.getLogger(__name__)
+
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+_LOCK_KEY = 72_316_001   # pg_advisory_lock key for the runner
+
+Step = Union[str, Callable[[], Awaitable[None]]]
+
+
+@dataclass
+class Migration:
+    version:     int
+    description: str
+    steps:       Sequence[Step]
+    best_effort: bool = False   # log and continue when a step fails
+
+
+# ── Python steps ──────────────────────────────────────────────────────────────
+
+async def _create_tables() -> None:
+    # Import all models so SQLModel.metadata knows about them
+    from models.models import (  # noqa: F401
+        User, BlogCategory, BlogPost, BlogTag, BlogPostTag,
+        BlogLike, BlogComment, BlogMedia, BlogPostView,
+        BlogPostDailyStats, BlogPostDailyViewer, AnalyticsCheckpoint,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+
+async def _backfill_derived_fields() -> None:
+    from crud.post_crud import backfill_derived_fields
+    async with async_session() as session:
+        filled = await backfill_derived_fields(session)
+    if filled:
+        print(f"Derived body fields backfilled for {filled} post(s)")
+
+
+async def _create_view_partitions() -> None:
+    from core.analytics import view_rollup
+    await view_rollup.maintain()
+
+
+# ── Versions ──────────────────────────────────────────────────────────────────
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline tables", [_create_tables]),
+    Migration(2, "user profile columns, media variants", [
+        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS website_url VARCHAR(300)',
+        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS twitter_handle VARCHAR(50)',
+        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS post_count INTEGER NOT NULL DEFAULT 0',
+        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS is_verified BOOLEAN NOT NULL DEFAULT FALSE',
+        "ALTER TABLE blog_media ADD COLUMN IF NOT EXISTS variants TEXT",
+    ]),
+    Migration(3, "intern role becomes author", [
+        # 'author' must be committed to the enum before rows can use it.
+        "ALTER TYPE userrole ADD VALUE IF NOT EXISTS 'author'",
+        # Cast to text so we don't hit enum-type errors if 'intern' was never
+        # a valid value in this DB's userrole enum.
+        "UPDATE \"user\" SET role = 'author' WHERE role::text = 'intern'",
+    ], best_effort=True),
+    Migration(4, "keyset feed index", [
+        # Matches WHERE status = :s ORDER BY coalesce(published_at, created_at)
+        # DESC, id DESC. A full index rather than a partial one: with a bound
+        # status parameter (and generic plans for prepared statements) the
+        # planner cannot prove a partial-index predicate.
+        "DROP INDEX IF EXISTS ix_blog_post_feed_keyset",
+        "CREATE INDEX ix_blog_post_feed_keyset ON blog_post "
+        "(status, coalesce(published_at, created_at) DESC, id DESC)",
+    ]),
+    Migration(5, "derived body fields and full-text search", [
+        "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS body_text TEXT",
+        "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS excerpt VARCHAR(400)",
+        "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS word_count INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS outline TEXT",
+        "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS first_image_url VARCHAR(500)",
+        # An earlier search_vector indexed regex-stripped body_html; drop it
+        # so it is re-added below over body_text.
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_attrdef d
+                JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum
+                WHERE d.adrelid = 'blog_post'::regclass AND a.attname = 'search_vector'
+                  AND pg_get_expr(d.adbin, d.adrelid) NOT LIKE '%body_text%'
+            ) THEN
+                ALTER TABLE blog_post DROP COLUMN search_vector;
+            END IF;
+        END $$
+        """,
+        _backfill_derived_fields,
+        # A generated tsvector (computed by Postgres when the column is added,
+        # maintained on every write) plus a GIN index. 'simple' keeps it
+        # language-neutral — posts mix Turkish and English.
+        "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(subtitle, '') || ' ' || coalesce(meta_description, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(body_text, regexp_replace(coalesce(body_html, ''), '<[^>]+>', ' ', 'g'))), 'C')"
+        ") STORED",
+        "CREATE INDEX IF NOT EXISTS ix_blog_post_search_vector ON blog_post USING GIN (search_vector)",
+    ]),
+    # Needs CREATE privilege for the extension; user search still works
+    # (unindexed) without it.
+    Migration(6, "trigram indexes for user search", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        'CREATE INDEX IF NOT EXISTS ix_user_username_trgm ON "user" USING GIN (username gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS ix_user_display_name_trgm ON "user" USING GIN (display_name gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS ix_user_bio_trgm ON "user" USING GIN (bio gin_trgm_ops)',
+    ], best_effort=True),
+    Migration(7, "monthly partitions for blog_post_view", [
+        # Fresh databases get the partitioned table from the baseline; an
+        # existing plain table is swapped for a partitioned one and its rows
+        # copied across.
+        """
+        DO $$
+        DECLARE m date; stop date;
+        BEGIN
+            IF (SELECT relkind FROM pg_class WHERE oid = 'blog_post_view'::regclass) <> 'r' THEN
+                RETURN;
+            END IF;
+            ALTER TABLE blog_post_view RENAME TO blog_post_view_unpartitioned;
+            ALTER INDEX blog_post_view_pkey RENAME TO blog_post_view_unpartitioned_pkey;
+            CREATE TABLE blog_post_view (
+                id         INTEGER   NOT NULL DEFAULT nextval('blog_post_view_id_seq'),
+                post_id    INTEGER   NOT NULL REFERENCES blog_post (id),
+                viewer_id  INTEGER   REFERENCES "user" (id),
+                created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at);
+            ALTER SEQUENCE blog_post_view_id_seq OWNED BY blog_post_view.id;
+
+            m    := date_trunc('month', coalesce(
+                        (SELECT min(created_at) FROM blog_post_view_unpartitioned), now()))::date;
+            stop := (date_trunc('month', now()) + interval '2 months')::date;
+            WHILE m <= stop LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF blog_post_view FOR VALUES FROM (%L) TO (%L)',
+                    'blog_post_view_p' || to_char(m, 'YYYYMM'), m, (m + interval '1 month')::date
+                );
+                m := (m + interval '1 month')::date;
+            END LOOP;
+            CREATE TABLE blog_post_view_default PARTITION OF blog_post_view DEFAULT;
+
+            INSERT INTO blog_post_view (id, post_id, viewer_id, created_at)
+            SELECT id, post_id, viewer_id, created_at FROM blog_post_view_unpartitioned;
+            DROP TABLE blog_post_view_unpartitioned;
+        END $$
+        """,
+        # Matches the analytics/purge access pattern; replaces the unused
+        # single-column created_at and post_id indexes.
+        "CREATE INDEX IF NOT EXISTS ix_blog_post_view_post_created ON blog_post_view (post_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_blog_post_view_viewer_id ON blog_post_view (viewer_id)",
+        _create_view_partitions,
+    ]),
+    Migration(8, "comment thread index", [
+        # get_comment_thread walks replies with parent_id = … AND post_id = …
+        # at every depth; without this each level scans blog_comment.
+        "CREATE INDEX IF NOT EXISTS ix_blog_comment_post_parent ON blog_comment (post_id, parent_id)",
+    ]),
+    Migration(9, "comment parent index", [
+        # Deleting a comment checks the parent_id foreign key for replies,
+        # and purge_user_content re-parents replies by parent_id alone.
+        "CREATE INDEX IF NOT EXISTS ix_blog_comment_parent_id ON blog_comment (parent_id)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+_VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version     INTEGER PRIMARY KEY,
+        description VARCHAR(200) NOT NULL,
+        applied_at  TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+    )
+"""
+
+
+async def current_version() -> int:
+    """Highest applied version; 0 for a database that predates schema_version."""
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(
+                sqlalchemy.text("SELECT coalesce(max(version), 0) FROM schema_version")
+            )).scalar()
+    except sqlalchemy.exc.DBAPIError:   # schema_version does not exist yet
+        return 0
+
+
+async def _run_step(step: Step) -> None:
+    if callable(step):
+        await step()
+        return
+    async with engine.begin() as conn:
+        await conn.execute(sqlalchemy.text(step))
+
+
+async def migrate(target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to target (default: latest). Returns applied versions."""
+    target  = LATEST_VERSION if target is None else target
+    applied: List[int] = []
+
+    # A dedicated connection holds the session-level lock for the whole run;
+    # each step still commits on its own pooled connection.
+    async with engine.connect() as lock_conn:
+        await lock_conn.execute(sqlalchemy.text("SELECT pg_advisory_lock(:k)"), {"k": _LOCK_KEY})
+        await lock_conn.commit()
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(sqlalchemy.text(_VERSION_TABLE_SQL))
+            done = await current_version()
+
+            for m in MIGRATIONS:
+                if m.version <= done or m.version > target:
+                    continue
+                log.info(f"Applying migration {m.version}: {m.description}")
+                for step in m.steps:
+                    try:
+                        await _run_step(step)
+                    except Exception as e:
+                        if not m.best_effort:
+                            raise RuntimeError(f"Migration {m.version} failed: {e}") from e
+                        label = step.strip()[:50] if isinstance(step, str) else step.__name__
+                        print(f"Migration note ({label}…): {e}")
+                async with engine.begin() as conn:
+                    await conn.execute(
+                        sqlalchemy.text(
+                            "INSERT INTO schema_version (version, description) VALUES (:v, :d)"
+                        ),
+                        {"v": m.version, "d": m.description},
+                    )
+                applied.append(m.version)
+        finally:
+            await lock_conn.execute(sqlalchemy.text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+            await lock_conn.commit()
+    return applied
+
+
+async def check_schema() -> int:
+    """
+    Boot-time check: one query when the schema is current. When it is behind,
+    the migrations run here (under the advisory lock), or with
+    AUTO_MIGRATE=false boot fails. The root bootstrap runs on every boot, so
+    setting ROOT_PASSWORD later still creates the root user.
+    """
+    version = await current_version()
+    if version < LATEST_VERSION:
+        if not AUTO_MIGRATE:
+            raise RuntimeError(
+                f"Database schema is at version {version}, this build needs {LATEST_VERSION}. "
+                "Run `python -m core.migrations` (or remove AUTO_MIGRATE=false)."
+            )
+        await migrate()
+    await bootstrap_root()
+    return LATEST_VERSION
+
+
+# ── Root bootstrap ────────────────────────────────────────────────────────────
+
+async def bootstrap_root() -> None:
+    """Create the root user from ROOT_PASSWORD if none exists yet."""
+    from core.security import get_password_hash_async
+    from models.models import User, UserRole
+
+    async with AsyncSession(engine) as session:
+        result = await session.exec(select(User).where(User.role == UserRole.ROOT))
+        if result.first():
+            return
+
+        root_password = os.environ.get("ROOT_PASSWORD")
+        if not root_password:
+            print("WARNING: ROOT_PASSWORD env var not set — skipping root bootstrap")
+            return
+
+        root = User(
+            username="root",
+            password_hash=await get_password_hash_async(root_password),
+            role=UserRole.ROOT,
+            display_name="Root",
+        )
+        session.add(root)
+        await session.commit()
+        print("Root user created — username: root")
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+async def _main(argv: List[str]) -> int:
+    try:
+        if "--status" in argv:
+            version = await current_version()
+            print(f"schema_version: {version} (latest {LATEST_VERSION})")
+            return 0 if version >= LATEST_VERSION else 1
+        applied = await migrate()
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+        await bootstrap_root()
+        return 0
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,188 @@
+"""
+notify.py — Debounced outbound "content changed" notifications.
+
+Publishing or editing a published post only records its URL here. A
+background task waits NOTIFY_INTERVAL seconds after the first change, then
+sends everything collected in that window as one batch to each configured
+endpoint, so a burst of edits becomes one ping per endpoint per interval:
+
+    SITEMAP_PING_URL   GET, sitemap ping (empty disables)
+    INDEXNOW_KEY       POST {host, key, urlList} to INDEXNOW_ENDPOINT
+    WEBSUB_HUB         POST hub.mode=publish for WEBSUB_TOPIC (default: the sitemap)
+
+Every endpoint URL comes from the environment, so a local stub server can
+stand in for all of them. Requests go through one shared httpx.AsyncClient
+(pooled keep-alive connections, NOTIFY_TIMEOUT per request) on the event
+loop; httpx is imported with the first batch, not at boot.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set
+from urllib.parse import quote, urlsplit
+
+log = logging.getLogger(__name__)
+
+NOTIFY_INTERVAL     = float(os.getenv("NOTIFY_INTERVAL", "30"))       # seconds
+NOTIFY_TIMEOUT      = float(os.getenv("NOTIFY_TIMEOUT", "5"))         # seconds per request
+NOTIFY_MAX_PENDING  = int(os.getenv("NOTIFY_MAX_PENDING", "10000"))   # IndexNow's per-request cap
+
+SITEMAP_PING_URL = os.getenv(
+    "SITEMAP_PING_URL",
+    "https://www.google.com/ping?sitemap=https://batihanbabacan.com/sitemap.xml",
+)
+INDEXNOW_ENDPOINT     = os.getenv("INDEXNOW_ENDPOINT", "https://api.indexnow.org/indexnow")
+INDEXNOW_KEY          = os.getenv("INDEXNOW_KEY", "")
+INDEXNOW_KEY_LOCATION = os.getenv("INDEXNOW_KEY_LOCATION", "")   # default: {base}/{key}.txt
+WEBSUB_HUB            = os.getenv("WEBSUB_HUB", "")
+WEBSUB_TOPIC          = os.getenv("WEBSUB_TOPIC", "")
+
+
+class OutboundNotifier:
+    def __init__(self, interval: float = NOTIFY_INTERVAL, max_pending: int = NOTIFY_MAX_PENDING):
+        self.interval    = interval
+        self.max_pending = max_pending
+        self.base        = ""
+
+        self._pending: Set[str] = set()
+        self._wake    = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._http    = None
+
+        # Counters
+        self.queued    = 0
+        self.coalesced = 0
+        self.dropped   = 0
+        self.batches   = 0
+        self.endpoints: Dict[str, Dict[str, object]] = {}
+
+    def configure(self, base: str) -> None:
+        self.base = base.rstrip("/")
+
+    # ── Producers ─────────────────────────────────────────────────────────────
+
+    def notify(self, url: str) -> None:
+        """Queue url for the next batch. Repeats within a window are coalesced."""
+        if url in self._pending:
+            self.coalesced += 1
+        elif len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        else:
+            self._pending.add(url)
+            self.queued += 1
+        self._wake.set()
+
+    def notify_post(self, slug: str) -> None:
+        self.notify(f"{self.base}/post.html?slug={quote(slug, safe='')}")
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # ── Delivery ──────────────────────────────────────────────────────────────
+
+    def _client(self):
+        if self._http is None:
+            import httpx   # loaded on the first batch, not at boot
+            self._http = httpx.AsyncClient(
+                timeout=NOTIFY_TIMEOUT, headers={"User-Agent": "BeeLog-Notifier/1.0"}
+            )
+        return self._http
+
+    def _requests_for(self, urls: List[str]) -> Dict[str, dict]:
+        """endpoint name -> httpx.AsyncClient.request kwargs."""
+        reqs: Dict[str, dict] = {}
+        if SITEMAP_PING_URL:
+            reqs["sitemap"] = {"method": "GET", "url": SITEMAP_PING_URL}
+        if INDEXNOW_KEY:
+            payload = {
+                "host":    urlsplit(self.base).hostname,
+                "key":     INDEXNOW_KEY,
+                "urlList": urls,
+            }
+            if INDEXNOW_KEY_LOCATION:
+                payload["keyLocation"] = INDEXNOW_KEY_LOCATION
+            reqs["indexnow"] = {"method": "POST", "url": INDEXNOW_ENDPOINT, "json": payload}
+        if WEBSUB_HUB:
+            reqs["websub"] = {
+                "method": "POST",
+                "url":    WEBSUB_HUB,
+                "data":   {
+                    "hub.mode": "publish",
+                    "hub.url":  WEBSUB_TOPIC or f"{self.base}/sitemap-blog.xml",
+                },
+            }
+        return reqs
+
+    async def _send_one(self, name: str, kwargs: dict) -> None:
+        m = self.endpoints.setdefault(name, {"sent": 0, "failed": 0, "last_status": None})
+        try:
+            resp = await self._client().request(**kwargs)
+        except Exception as e:
+            m["failed"] += 1
+            m["last_status"] = type(e).__name__
+            log.warning(f"Notify {name} failed: {e}")
+            return
+        m["last_status"] = resp.status_code
+        if resp.status_code >= 400:
+            m["failed"] += 1
+            log.warning(f"Notify {name} returned {resp.status_code}")
+        else:
+            m["sent"] += 1
+
+    async def flush(self) -> int:
+        """Send everything pending now. Returns the number of URLs sent."""
+        urls, self._pending = sorted(self._pending), set()
+        if not urls:
+            return 0
+        reqs = self._requests_for(urls)
+        await asyncio.gather(*(self._send_one(name, kw) for name, kw in reqs.items()))
+        self.batches += 1
+        return len(urls)
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            # Debounce: let the rest of the burst arrive, then send once.
+            await asyncio.sleep(self.interval)
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"Notify loop error: {e}")
+
+    def start(self):
+        if self._task is None:
+            # A fresh Event for this loop; keep anything queued before start.
+            self._wake = asyncio.Event()
+            if self._pending:
+                self._wake.set()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the loop and send whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def stats(self) -> dict:
+        return {
+            "pending":   self.pending(),
+            "queued":    self.queued,
+            "coalesced": self.coalesced,
+            "dropped":   self.dropped,
+            "batches":   self.batches,
+            "endpoints": self.endpoints,
+        }
+
+
+notifier = OutboundNotifier()
@@ -1,11 +1,15 @@
 import os
 import jwt
-from typing import Optional
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
+from starlette.requests import HTTPConnection
 from dotenv import load_dotenv
 
 from models.models import UserRole
@@ -22,13 +26,62 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440
 
 # ── Password hashing ──────────────────────────────────────────────────────────
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib (and the bcrypt backend) load on the first hash/verify, not at boot.
+_pwd_context = None
+
+def _crypt():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _crypt().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _crypt().verify(plain_password, hashed_password)
+
+
+# bcrypt takes ~250 ms per call; async handlers must use the *_async variants,
+# which run on a small dedicated pool so a login burst queues up there
+# instead of blocking the event loop (bcrypt releases the GIL).
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", "2"))
+
+_pwd_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="bcrypt"
+)
+_pwd_stats = {"in_flight": 0, "max_in_flight": 0, "completed": 0}
+
+
+async def _run_password_job(fn, *args):
+    _pwd_stats["in_flight"] += 1
+    _pwd_stats["max_in_flight"] = max(_pwd_stats["max_in_flight"], _pwd_stats["in_flight"])
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_pwd_executor, fn, *args)
+    finally:
+        _pwd_stats["in_flight"] -= 1
+        _pwd_stats["completed"] += 1
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_job(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+def password_pool_stats() -> dict:
+    in_flight = _pwd_stats["in_flight"]
+    return {
+        "workers":       PASSWORD_HASH_CONCURRENCY,
+        "in_flight":     in_flight,
+        "queue_depth":   max(0, in_flight - PASSWORD_HASH_CONCURRENCY),
+        "max_in_flight": _pwd_stats["max_in_flight"],
+        "completed":     _pwd_stats["completed"],
+    }
 
 # ── JWT ───────────────────────────────────────────────────────────────────────
 
@@ -37,10 +90,11 @@ oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (
+    now    = datetime.now(timezone.utc)
+    expire = now + (
         expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": now})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -51,38 +105,129 @@ def _decode_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserSession:
-    payload = _decode_token(token)
-    if payload is None:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
+# ── Verified-token cache ──────────────────────────────────────────────────────
+# raw token -> (exp epoch seconds, UserSession). Entries are dropped at their
+# exp claim and when revoke_user_tokens() is called for the user; tokens
+# issued before a revocation are rejected on decode as well.
+#
+# Revocation is per worker: it lives in this process's memory, so other
+# workers keep accepting the old tokens until they expire, and a restart
+# forgets it. The iat claim has whole-second precision, so revocations are
+# recorded in whole seconds too: a token issued in the same second as the
+# revocation (e.g. the re-login that follows a role change) stays valid.
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+_token_cache: "OrderedDict[str, Tuple[float, UserSession]]" = OrderedDict()
+_revoked_at: Dict[int, int] = {}
+_token_stats = {"hits": 0, "misses": 0}
 
+
+def _session_from_payload(payload: dict) -> Optional[UserSession]:
     username: str = payload.get("sub")
     user_role: str = payload.get("role")
     user_id: int   = payload.get("id")
 
     if not username or not user_role or user_id is None:
-        raise HTTPException(status_code=401, detail="Invalid token payload")
+        return None
+    if payload.get("iat", 0) < _revoked_at.get(user_id, 0):
+        return None
 
     return UserSession(id=user_id, username=username, role=user_role)
 
 
-async def get_optional_user(
-    token: Optional[str] = Depends(oauth2_scheme_optional),
-) -> Optional[UserSession]:
+def _cached_session(token: str) -> Optional[UserSession]:
+    entry = _token_cache.get(token)
+    if entry is None:
+        _token_stats["misses"] += 1
+        return None
+    exp, user = entry
+    if exp <= time.time():
+        _token_cache.pop(token, None)
+        _token_stats["misses"] += 1
+        return None
+    _token_cache.move_to_end(token)
+    _token_stats["hits"] += 1
+    return user
+
+
+def _remember(token: str, payload: dict, user: UserSession) -> None:
+    if TOKEN_CACHE_SIZE <= 0 or "exp" not in payload:
+        return
+    _token_cache[token] = (float(payload["exp"]), user)
+    if len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+
+
+def revoke_user_tokens(user_id: int) -> None:
+    """
+    Forget cached sessions for user_id and reject tokens issued before the
+    current second, in this worker only.
+    """
+    now = int(time.time())
+    # Past one token lifetime every token a revocation covers has expired.
+    horizon = now - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    for uid in [u for u, at in _revoked_at.items() if at < horizon]:
+        del _revoked_at[uid]
+    _revoked_at[user_id] = now
+    for token in [t for t, (_, u) in _token_cache.items() if u.id == user_id]:
+        del _token_cache[token]
+
+
+def token_cache_stats() -> dict:
+    return {"entries": len(_token_cache), "revoked_users": len(_revoked_at), **_token_stats}
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserSession:
+    user = _cached_session(token)
+    if user is not None:
+        return user
+
+    payload = _decode_token(token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+
+    user = _session_from_payload(payload)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+
+    _remember(token, payload, user)
+    return user
+
+
+def _resolve_token(token: Optional[str]) -> Optional[UserSession]:
     if not token:
         return None
+    user = _cached_session(token)
+    if user is not None:
+        return user
+
     payload = _decode_token(token)
     if payload is None:
         return None
 
-    username: str = payload.get("sub")
-    user_role: str = payload.get("role")
-    user_id: int   = payload.get("id")
+    user = _session_from_payload(payload)
+    if user is not None:
+        _remember(token, payload, user)
+    return user
 
-    if not username or not user_role or user_id is None:
-        return None
 
-    return UserSession(id=user_id, username=username, role=user_role)
+async def get_optional_user(
+    token: Optional[str] = Depends(oauth2_scheme_optional),
+) -> Optional[UserSession]:
+    return _resolve_token(token)
+
+
+def connection_user(conn: HTTPConnection) -> Optional[UserSession]:
+    """
+    Optional user for any connection, websockets included (OAuth2PasswordBearer
+    only works on HTTP requests): the Bearer header, else the ?token= query
+    parameter browsers use for websockets.
+    """
+    scheme, _, token = conn.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = conn.query_params.get("token")
+    return _resolve_token(token)
 
 
 # ── Role-based access control ─────────────────────────────────────────────────
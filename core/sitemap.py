@@ -0,0 +1,187 @@
+"""
+sitemap.py — Precomputed, incrementally refreshed blog sitemap.
+
+The serialised XML (and a gzip copy) is kept in memory and rebuilt only
+after a publish, unpublish or delete marks it dirty, or once it is older
+than SITEMAP_MAX_AGE (other workers' events are not seen locally). Rows are
+streamed from the DB, so there is no cap on the number of posts: past
+SITEMAP_SHARD_SIZE URLs, /sitemap-blog.xml becomes a sitemap index pointing
+at /sitemaps/blog-<n>.xml shards, per the sitemaps.org 50k-URL limit.
+Each document carries the newest updated_at of the posts in it as its
+Last-Modified, so crawlers can revalidate with If-Modified-Since as well.
+"""
+
+import os
+import gzip
+import time
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from sqlmodel import select
+
+from core.database import async_read_session
+from models.models import BlogPost, PostStatus
+
+log = logging.getLogger(__name__)
+
+SITEMAP_SHARD_SIZE = int(os.getenv("SITEMAP_SHARD_SIZE", "50000"))
+SITEMAP_MAX_AGE    = float(os.getenv("SITEMAP_MAX_AGE", "600"))   # seconds
+
+INDEX_NAME = "sitemap-blog.xml"
+
+_XML_HEAD    = '<?xml version="1.0" encoding="UTF-8"?>\n'
+_URLSET_OPEN = '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_INDEX_OPEN  = '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+@dataclass
+class SitemapDoc:
+    body:          bytes
+    gzipped:       bytes
+    etag:          str
+    last_modified: Optional[datetime] = None
+
+    @classmethod
+    def build(cls, xml: str, last_modified: Optional[datetime] = None) -> "SitemapDoc":
+        body = xml.encode()
+        return cls(
+            body=body,
+            gzipped=gzip.compress(body, compresslevel=9, mtime=0),
+            etag='"' + hashlib.sha1(body).hexdigest() + '"',
+            last_modified=last_modified,
+        )
+
+
+def shard_name(n: int) -> str:
+    return f"sitemaps/blog-{n}.xml"
+
+
+class SitemapStore:
+    def __init__(self, shard_size: int = SITEMAP_SHARD_SIZE, max_age: float = SITEMAP_MAX_AGE):
+        self.base       = "https://beelog-poes.onrender.com"
+        self.shard_size = shard_size
+        self.max_age    = max_age
+
+        self._docs: Dict[str, SitemapDoc] = {}
+        self._dirty    = True
+        self._built_at = 0.0
+        self._lock     = asyncio.Lock()
+        self.builds    = 0
+
+    def configure(self, base: str) -> None:
+        if base != self.base:
+            self.base = base
+            self.mark_dirty()
+
+    def mark_dirty(self) -> None:
+        """Call after any publish, unpublish or delete of a post."""
+        self._dirty = True
+
+    def _stale(self) -> bool:
+        return self._dirty or time.monotonic() - self._built_at > self.max_age
+
+    async def get(self, name: str) -> Optional[SitemapDoc]:
+        if self._stale():
+            async with self._lock:
+                if self._stale():
+                    try:
+                        await self._rebuild()
+                    except Exception:
+                        self._dirty = True
+                        raise
+        return self._docs.get(name)
+
+    async def _rebuild(self) -> None:
+        # Clear the flag first so events arriving mid-build trigger another.
+        self._dirty = False
+        started     = time.monotonic()
+
+        shards: List[str] = []
+        newest: List[Optional[datetime]] = []
+        shard_newest: Optional[datetime] = None
+        blocks: List[str] = [
+            "  <url>\n"
+            f"    <loc>{escape(self.base)}/blog.html</loc>\n"
+            "    <changefreq>hourly</changefreq>\n"
+            "    <priority>1.0</priority>\n"
+            "  </url>\n"
+        ]
+
+        def close_shard():
+            nonlocal shard_newest
+            shards.append(_XML_HEAD + _URLSET_OPEN + "".join(blocks) + "</urlset>")
+            newest.append(shard_newest)
+            blocks.clear()
+            shard_newest = None
+
+        async with async_read_session() as session:
+            rows = await session.stream(
+                select(BlogPost.slug, BlogPost.published_at, BlogPost.updated_at)
+                .where(BlogPost.status == PostStatus.PUBLISHED)
+                .order_by(BlogPost.published_at.desc(), BlogPost.id.desc())
+                .execution_options(yield_per=1000)
+            )
+            async for slug, published_at, updated_at in rows:
+                lastmod = (published_at or updated_at).strftime("%Y-%m-%d")
+                if updated_at and (shard_newest is None or updated_at > shard_newest):
+                    shard_newest = updated_at
+                blocks.append(
+                    "  <url>\n"
+                    f"    <loc>{escape(self.base)}/post.html?slug={escape(slug)}</loc>\n"
+                    f"    <lastmod>{lastmod}</lastmod>\n"
+                    "    <changefreq>weekly</changefreq>\n"
+                    "    <priority>0.8</priority>\n"
+                    "  </url>\n"
+                )
+                if len(blocks) >= self.shard_size:
+                    close_shard()
+        if blocks or not shards:
+            close_shard()
+
+        docs: Dict[str, SitemapDoc] = {}
+        if len(shards) == 1:
+            docs[INDEX_NAME] = SitemapDoc.build(shards[0], newest[0])
+        else:
+            entries = []
+            for n, xml in enumerate(shards, start=1):
+                docs[shard_name(n)] = SitemapDoc.build(xml, newest[n - 1])
+                entries.append(
+                    f"  <sitemap><loc>{escape(self.base)}/{shard_name(n)}</loc></sitemap>\n"
+                )
+            docs[INDEX_NAME] = SitemapDoc.build(
+                _XML_HEAD + _INDEX_OPEN + "".join(entries) + "</sitemapindex>",
+                max((t for t in newest if t), default=None),
+            )
+
+        # Unpublishing or deleting the newest post changes the body but moves
+        # the newest updated_at backwards; never let Last-Modified regress.
+        built_at = datetime.utcnow()
+        for name, doc in docs.items():
+            prev = self._docs.get(name)
+            if prev is not None and prev.etag != doc.etag and prev.last_modified and (
+                doc.last_modified is None or doc.last_modified <= prev.last_modified
+            ):
+                doc.last_modified = built_at
+
+        self._docs     = docs
+        self._built_at = time.monotonic()
+        self.builds   += 1
+        log.info(
+            f"Sitemap rebuilt: {len(shards)} shard(s) in {self._built_at - started:.3f}s"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._docs),
+            "bytes":     sum(len(d.body) for d in self._docs.values()),
+            "builds":    self.builds,
+            "dirty":     self._dirty,
+        }
+
+
+sitemap_store = SitemapStore()
@@ -0,0 +1,246 @@
+"""
+storage.py — Pluggable media storage and the non-blocking upload pipeline.
+
+UploadLimitMiddleware caps the request body of the upload routes before the
+multipart parser buffers it: a declared Content-Length over the limit is
+refused with 413 straight away, and a chunked or understated body is cut
+off once it passes the limit. Uploads are then spooled to a temp file in
+chunks (the file itself capped at MEDIA_MAX_BYTES), resized WebP variants are rendered with Pillow on worker threads, and the
+original plus variants are handed to the storage backend concurrently.
+Nothing here runs blocking I/O or CPU work on the event loop.
+
+Backends (MEDIA_STORAGE):
+  imagekit — ImageKit SDK calls on a worker thread (default)
+  local    — copies into MEDIA_LOCAL_DIR, served by main.py under /media
+"""
+
+import os
+import json
+import uuid
+import shutil
+import asyncio
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+log = logging.getLogger(__name__)
+
+MEDIA_STORAGE        = os.getenv("MEDIA_STORAGE", "imagekit")
+MEDIA_MAX_BYTES      = int(os.getenv("MEDIA_MAX_BYTES", str(10 * 1024 * 1024)))
+MEDIA_LOCAL_DIR      = os.getenv("MEDIA_LOCAL_DIR", "media")
+MEDIA_LOCAL_URL      = os.getenv("MEDIA_LOCAL_URL", "/media")
+MEDIA_VARIANT_WIDTHS = [
+    int(w) for w in os.getenv("MEDIA_VARIANT_WIDTHS", "640,1280").split(",") if w.strip()
+]
+
+_CHUNK = 1024 * 1024
+_MULTIPART_OVERHEAD = 64 * 1024   # boundaries, part headers, other form fields
+
+
+def _too_large(max_bytes: int) -> str:
+    return f"File exceeds {max_bytes // (1024 * 1024)} MB limit"
+
+
+# ── Request body limit ────────────────────────────────────────────────────────
+
+class UploadLimitMiddleware:
+    """ASGI middleware capping the request body size on the given paths."""
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = MEDIA_MAX_BYTES):
+        self.app       = app
+        self.paths     = frozenset(paths)
+        self.max_bytes = max_bytes
+        self.max_body  = max_bytes + _MULTIPART_OVERHEAD
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_body:
+            response = JSONResponse({"detail": _too_large(self.max_bytes)}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    raise HTTPException(413, _too_large(self.max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class MediaStorage(ABC):
+    """Interface: store a local file under name and return its public URL."""
+
+    @abstractmethod
+    async def save(self, path: str, name: str, content_type: str) -> str:
+        ...
+
+
+class LocalStorage(MediaStorage):
+    def __init__(self, root: str = MEDIA_LOCAL_DIR, url_prefix: str = MEDIA_LOCAL_URL):
+        self.root       = root
+        self.url_prefix = url_prefix.rstrip("/")
+
+    async def save(self, path: str, name: str, content_type: str) -> str:
+        key = f"{uuid.uuid4().hex}-{os.path.basename(name)}"
+        os.makedirs(self.root, exist_ok=True)
+        await asyncio.to_thread(shutil.copyfile, path, os.path.join(self.root, key))
+        return f"{self.url_prefix}/{key}"
+
+
+class ImageKitStorage(MediaStorage):
+    def __init__(self):
+        self._client = None
+
+    def _ik(self):
+        if self._client is None:
+            from imagekitio import ImageKit
+            self._client = ImageKit(
+                private_key=os.getenv("IMAGEKIT_PRIVATE_KEY", ""),
+                public_key=os.getenv("IMAGEKIT_PUBLIC_KEY", ""),
+                url_endpoint=os.getenv("IMAGEKIT_URL_ENDPOINT", ""),
+            )
+        return self._client
+
+    def _upload(self, path: str, name: str) -> str:
+        with open(path, "rb") as fh:
+            result = self._ik().upload_file(
+                file=fh,
+                file_name=name,
+                options={"folder": "/blog/"},
+            )
+        return result.response_metadata.raw["url"]
+
+    async def save(self, path: str, name: str, content_type: str) -> str:
+        return await asyncio.to_thread(self._upload, path, name)
+
+
+_BACKENDS = {"local": LocalStorage, "imagekit": ImageKitStorage}
+_storage: Optional[MediaStorage] = None
+
+
+def get_storage() -> MediaStorage:
+    global _storage
+    if _storage is None:
+        if MEDIA_STORAGE not in _BACKENDS:
+            raise RuntimeError(f"Unknown MEDIA_STORAGE backend: {MEDIA_STORAGE}")
+        _storage = _BACKENDS[MEDIA_STORAGE]()
+    return _storage
+
+
+# ── Pipeline ──────────────────────────────────────────────────────────────────
+
+@dataclass
+class StoredUpload:
+    url:        str
+    filename:   str
+    mime_type:  str
+    size_bytes: int
+    variants:   Dict[str, str] = field(default_factory=dict)   # width -> url
+
+    def variants_json(self) -> Optional[str]:
+        return json.dumps(self.variants) if self.variants else None
+
+
+async def _spool(file: UploadFile, max_bytes: int) -> Tuple[str, int]:
+    """Copy the upload to a temp file in chunks, enforcing the size cap."""
+    fd, path = tempfile.mkstemp(prefix="upload-")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(413, _too_large(max_bytes))
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path, size
+
+
+def _render_variant(src: str, width: int) -> Optional[str]:
+    """Resize to width (never upscaling) and encode as WebP. Runs on a thread."""
+    from PIL import Image
+
+    with Image.open(src) as img:
+        if img.width <= width:
+            return None
+        height = round(img.height * width / img.width)
+        resized = img.convert("RGBA" if "A" in img.getbands() else "RGB").resize(
+            (width, height), Image.LANCZOS
+        )
+        fd, path = tempfile.mkstemp(prefix="variant-", suffix=".webp")
+        os.close(fd)
+        resized.save(path, "WEBP", quality=82, method=4)
+        return path
+
+
+async def _render_variants(src: str) -> Dict[int, str]:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return {}
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_render_variant, src, w) for w in MEDIA_VARIANT_WIDTHS),
+        return_exceptions=True,
+    )
+    variants = {}
+    for width, res in zip(MEDIA_VARIANT_WIDTHS, results):
+        if isinstance(res, Exception):
+            log.warning(f"Variant {width}w failed: {res}")
+        elif res:
+            variants[width] = res
+    return variants
+
+
+async def store_upload(file: UploadFile, max_bytes: int = MEDIA_MAX_BYTES) -> StoredUpload:
+    storage   = get_storage()
+    filename  = os.path.basename(file.filename or "upload")
+    mime_type = file.content_type or "application/octet-stream"
+
+    path, size = await _spool(file, max_bytes)
+    temp_files: List[str] = [path]
+    try:
+        variants = await _render_variants(path) if mime_type.startswith("image/") else {}
+        temp_files += variants.values()
+
+        stem = os.path.splitext(filename)[0]
+        uploads = [storage.save(path, filename, mime_type)] + [
+            storage.save(vpath, f"{stem}-{w}w.webp", "image/webp")
+            for w, vpath in variants.items()
+        ]
+        urls = await asyncio.gather(*uploads)
+
+        return StoredUpload(
+            url=urls[0],
+            filename=filename,
+            mime_type=mime_type,
+            size_bytes=size,
+            variants={str(w): u for w, u in zip(variants, urls[1:])},
+        )
+    finally:
+        for p in temp_files:
+            try:
+                os.unlink(p)
+            except OSError:
+                pass
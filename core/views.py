@@ -0,0 +1,140 @@
+"""
+views.py — Buffered, write-behind post view counter.
+
+GET /posts/{slug} only records the view in memory. A background task flushes
+the buffer periodically as one UPDATE … FROM (VALUES …) for the counters plus
+a multi-row INSERT into blog_post_view, so a traffic spike no longer turns
+into one commit per request against the same hot blog_post row.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+
+import sqlalchemy
+
+from core.database import engine
+
+log = logging.getLogger(__name__)
+
+VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", "5"))      # seconds
+VIEW_BUFFER_MAX     = int(os.getenv("VIEW_BUFFER_MAX", "10000"))        # events
+_INSERT_CHUNK       = 1000
+
+
+class ViewAggregator:
+    def __init__(self, flush_interval: float = VIEW_FLUSH_INTERVAL, max_events: int = VIEW_BUFFER_MAX):
+        self.flush_interval = flush_interval
+        self.max_events     = max_events
+
+        self._counts: Dict[int, int] = {}
+        self._events: List[Tuple[int, Optional[int], datetime]] = []
+        self._lock  = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.recorded = 0
+        self.flushed  = 0
+        self.dropped  = 0
+        self.skipped  = 0   # events for posts deleted before the flush
+        self.flushes  = 0
+        self.failures = 0
+
+    def record(self, post_id: int, viewer_id: Optional[int] = None) -> bool:
+        """Buffer one view. Returns False (and counts a drop) when the buffer is full."""
+        if len(self._events) >= self.max_events:
+            self.dropped += 1
+            return False
+        self._counts[post_id] = self._counts.get(post_id, 0) + 1
+        self._events.append((post_id, viewer_id, datetime.utcnow()))
+        self.recorded += 1
+        return True
+
+    def pending(self) -> int:
+        return len(self._events)
+
+    async def flush(self) -> int:
+        """Write everything buffered so far. Returns the number of events flushed."""
+        async with self._lock:
+            counts, self._counts = self._counts, {}
+            events, self._events = self._events, []
+            if not events:
+                return 0
+
+            # Sorted by id so concurrent flushes from several workers lock
+            # the blog_post rows in the same order instead of deadlocking.
+            params = {}
+            rows   = []
+            for i, (post_id, n) in enumerate(sorted(counts.items())):
+                rows.append(f"(CAST(:p{i} AS INTEGER), CAST(:n{i} AS INTEGER))")
+                params[f"p{i}"] = post_id
+                params[f"n{i}"] = n
+            update_sql = sqlalchemy.text(
+                "UPDATE blog_post AS bp SET view_count = bp.view_count + v.n "
+                f"FROM (VALUES {', '.join(rows)}) AS v(id, n) "
+                "WHERE bp.id = v.id RETURNING bp.id"
+            )
+
+            from models.models import BlogPostView
+            table = BlogPostView.__table__
+            try:
+                async with engine.begin() as conn:
+                    # Posts deleted since the view was recorded are skipped
+                    # so their events don't violate the FK on insert.
+                    live = set((await conn.execute(update_sql, params)).scalars().all())
+                    kept = [e for e in events if e[0] in live]
+                    for start in range(0, len(kept), _INSERT_CHUNK):
+                        chunk = kept[start:start + _INSERT_CHUNK]
+                        await conn.execute(table.insert().values([
+                            {"post_id": p, "viewer_id": v, "created_at": ts}
+                            for p, v, ts in chunk
+                        ]))
+            except Exception as e:
+                self.failures += 1
+                self.dropped  += len(events)
+                log.error(f"View flush failed, dropped {len(events)} events: {e}")
+                return 0
+
+            self.flushes += 1
+            self.flushed += len(kept)
+            self.skipped += len(events) - len(kept)
+            return len(kept)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"View flush loop error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the flush loop and write out whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending":  self.pending(),
+            "recorded": self.recorded,
+            "flushed":  self.flushed,
+            "dropped":  self.dropped,
+            "skipped":  self.skipped,
+            "flushes":  self.flushes,
+            "failures": self.failures,
+        }
+
+
+view_buffer = ViewAggregator()
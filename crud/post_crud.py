@@ -3,18 +3,26 @@ post_crud.py — Database operations for blog posts, categories, tags, comments.
 """
 
 import re
+import json
 import random
 import string
 import logging
-from typing import Optional, List, Tuple
+import time
+from typing import Optional, List, Tuple, Dict, Set
 from datetime import datetime
 
+from sqlalchemy import tuple_, literal, text, update, delete
+from sqlalchemy.orm import aliased
 from sqlmodel import select, func
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from core.cache import response_cache, post_tag, LISTING, CATEGORIES
+from core.content import process_html
+from core.sitemap import sitemap_store
 from models.models import (
     User, BlogPost, BlogCategory, BlogTag, BlogPostTag,
-    BlogLike, BlogComment, BlogMedia, PostStatus,
+    BlogLike, BlogComment, BlogMedia, BlogPostView, PostStatus,
+    BlogPostDailyStats, BlogPostDailyViewer,
 )
 
 
@@ -34,21 +42,24 @@ def make_slug(title: str) -> str:
     return f"{base}-{suffix}" if base else suffix
 
 
-def calculate_read_time(html: str) -> int:
-    text  = re.sub(r"<[^>]+>", " ", html)
-    words = len(text.split())
-    return max(1, round(words / 200))
-
-
-def sanitize_html(html: str) -> str:
-    """Strip script/style tags and dangerous attributes from HTML."""
-    if not html:
-        return html
-    html = re.sub(r"<script[^>]*?>.*?</script>", "", html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r"<style[^>]*?>.*?</style>",   "", html, flags=re.DOTALL | re.IGNORECASE)
-    html = re.sub(r"\s*on\w+\s*=\s*['\"][^'\"]*['\"]", "", html, flags=re.IGNORECASE)
-    html = re.sub(r"(href|src)\s*=\s*['\"]javascript:[^'\"]*['\"]", 'href="#"', html, flags=re.IGNORECASE)
-    return html.strip()
+def render_body(html: str) -> dict:
+    """
+    Sanitized body_html plus every field derived from it, computed in one
+    parse so readers never have to re-derive them from the HTML.
+    """
+    body  = process_html(html or "")
+    image = body.first_image
+    if image and (image.startswith("data:") or len(image) > 500):
+        image = None
+    return {
+        "body_html":       body.html,
+        "body_text":       body.text,
+        "excerpt":         body.excerpt,
+        "word_count":      body.word_count,
+        "read_time":       body.read_time,
+        "outline":         json.dumps(body.outline) if body.outline else None,
+        "first_image_url": image,
+    }
 
 
 # ── User helpers ──────────────────────────────────────────────────────────────
@@ -74,6 +85,46 @@ async def create_user(session: AsyncSession, user: User) -> Optional[User]:
         return None
 
 
+# ── Counters ──────────────────────────────────────────────────────────────────
+
+def _bump(model, row_id: int, **deltas: int):
+    """
+    Server-side counter update: UPDATE … SET col = GREATEST(col + delta, 0).
+    Concurrent writers can't lose increments, and no row is loaded first.
+    """
+    values = {
+        name: func.greatest(getattr(model, name) + delta, 0)
+        for name, delta in deltas.items()
+    }
+    return (
+        update(model)
+        .where(model.id == row_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _bump_grouped(model, column: str, key, *where):
+    """
+    Set-based decrement: subtract, per model row, the number of rows matching
+    where grouped by key (a column holding model ids). One statement however
+    many rows are affected.
+    """
+    counts = (
+        select(key.label("row_id"), func.count().label("n"))
+        .where(*where)
+        .group_by(key)
+        .subquery()
+    )
+    counter = getattr(model, column)
+    return (
+        update(model)
+        .where(model.id == counts.c.row_id)
+        .values({column: func.greatest(counter - counts.c.n, 0)})
+        .execution_options(synchronize_session=False)
+    )
+
+
 # ── Tag helpers ───────────────────────────────────────────────────────────────
 
 async def get_or_create_tag(session: AsyncSession, name: str) -> BlogTag:
@@ -113,6 +164,7 @@ async def create_category(
     cat  = BlogCategory(name=name, slug=slug, description=description, color=color, icon=icon)
     session.add(cat)
     await session.commit()
+    response_cache.invalidate(CATEGORIES)
     await session.refresh(cat)
     return cat
 
@@ -129,6 +181,7 @@ async def update_category(
         cat.slug = slugify(kwargs["name"])
     session.add(cat)
     await session.commit()
+    response_cache.invalidate(CATEGORIES)
     await session.refresh(cat)
     return cat
 
@@ -136,6 +189,7 @@ async def update_category(
 async def delete_category(session: AsyncSession, cat: BlogCategory) -> None:
     await session.delete(cat)
     await session.commit()
+    response_cache.invalidate(CATEGORIES)
 
 
 # ── Post CRUD ─────────────────────────────────────────────────────────────────
@@ -149,64 +203,143 @@ async def get_post_by_slug(session: AsyncSession, slug: str) -> Optional[BlogPos
     return result.scalars().first()
 
 
+# ── Feed ──────────────────────────────────────────────────────────────────────
+
+# First-page totals are cached per filter set for a short while; cursor pages
+# never pay for a COUNT(*) at all.
+FEED_COUNT_TTL = 60.0
+_feed_count_cache: Dict[tuple, Tuple[float, int]] = {}
+
+
+def encode_feed_cursor(post: BlogPost) -> str:
+    """Opaque keyset cursor matching the feed ORDER BY (sort timestamp, id)."""
+    return f"{(post.published_at or post.created_at).isoformat()}_{post.id}"
+
+
+def decode_feed_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    try:
+        ts, _, post_id = cursor.rpartition("_")
+        return datetime.fromisoformat(ts), int(post_id)
+    except ValueError:
+        return None
+
+
 async def get_post_feed(
     session: AsyncSession,
     limit: int = 20,
+    cursor: Optional[Tuple[datetime, int]] = None,
     before_id: Optional[int] = None,
     category_slug: Optional[str] = None,
     tag_slug: Optional[str] = None,
     author_username: Optional[str] = None,
     featured_only: bool = False,
     include_drafts: bool = False,
-) -> Tuple[List[BlogPost], int]:
-    """Returns (posts, total_count)."""
+    with_total: bool = True,
+) -> Tuple[List[BlogPost], Optional[int]]:
+    """
+    Returns (posts, total_count) using a single joined query per page.
+
+    Pagination is keyset-based on (coalesce(published_at, created_at), id) —
+    the same key encode_feed_cursor() writes — so pages never skip or repeat
+    posts, including published rows that predate published_at. ``before_id`` is the
+    legacy cursor and is translated into the composite key. The total is
+    only computed for the first page (cached for FEED_COUNT_TTL seconds);
+    cursor pages return None.
+    """
+    sort_col = func.coalesce(BlogPost.published_at, BlogPost.created_at)
     q = select(BlogPost)
 
     if not include_drafts:
         q = q.where(BlogPost.status == PostStatus.PUBLISHED)
 
-    if before_id is not None:
-        q = q.where(BlogPost.id < before_id)
-
     if category_slug:
-        cat = await get_category_by_slug(session, category_slug)
-        if cat:
-            q = q.where(BlogPost.category_id == cat.id)
+        q = q.join(BlogCategory, BlogCategory.id == BlogPost.category_id).where(
+            BlogCategory.slug == category_slug
+        )
 
     if tag_slug:
-        tag_result = await session.execute(select(BlogTag).where(BlogTag.slug == tag_slug))
-        tag = tag_result.scalars().first()
-        if tag:
-            pt_result = await session.execute(
-                select(BlogPostTag.post_id).where(BlogPostTag.tag_id == tag.id)
-            )
-            post_ids = pt_result.scalars().all()
-            q = q.where(BlogPost.id.in_(post_ids))
+        q = (
+            q.join(BlogPostTag, BlogPostTag.post_id == BlogPost.id)
+            .join(BlogTag, BlogTag.id == BlogPostTag.tag_id)
+            .where(BlogTag.slug == tag_slug)
+        )
 
     if author_username:
-        user = await get_user_by_username(session, author_username)
-        if user:
-            q = q.where(BlogPost.author_id == user.id)
+        q = q.join(User, User.id == BlogPost.author_id).where(User.username == author_username)
 
     if featured_only:
         q = q.where(BlogPost.featured == True)
 
-    count_q = select(func.count()).select_from(q.subquery())
-    total   = (await session.execute(count_q)).scalar() or 0
-
-    q = q.order_by(BlogPost.published_at.desc().nullslast(), BlogPost.created_at.desc()).limit(limit)
+    total = None
+    if cursor is None and before_id is not None:
+        anchor = await session.get(BlogPost, before_id)
+        if anchor:
+            cursor = (anchor.published_at or anchor.created_at, anchor.id)
+
+    if cursor is not None:
+        q = q.where(tuple_(sort_col, BlogPost.id) < tuple_(*cursor))
+    elif with_total:
+        key = (category_slug, tag_slug, author_username, featured_only, include_drafts)
+        cached = _feed_count_cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            total = cached[1]
+        else:
+            count_q = select(func.count()).select_from(q.subquery())
+            total   = (await session.execute(count_q)).scalar() or 0
+            if len(_feed_count_cache) >= 1024:
+                _feed_count_cache.clear()
+            _feed_count_cache[key] = (time.monotonic() + FEED_COUNT_TTL, total)
+
+    q = q.order_by(sort_col.desc(), BlogPost.id.desc()).limit(limit)
 
     result = await session.execute(q)
     return result.scalars().all(), total
 
 
-async def get_post_tags(session: AsyncSession, post_id: int) -> List[BlogTag]:
+# ── Bulk lookups (feed/search hydration) ──────────────────────────────────────
+
+async def get_users_by_ids(session: AsyncSession, user_ids: List[int]) -> Dict[int, User]:
+    if not user_ids:
+        return {}
+    result = await session.execute(select(User).where(User.id.in_(set(user_ids))))
+    return {u.id: u for u in result.scalars().all()}
+
+
+async def get_categories_by_ids(session: AsyncSession, category_ids: List[int]) -> Dict[int, BlogCategory]:
+    if not category_ids:
+        return {}
     result = await session.execute(
-        select(BlogTag)
-        .join(BlogPostTag, BlogPostTag.tag_id == BlogTag.id)
-        .where(BlogPostTag.post_id == post_id)
+        select(BlogCategory).where(BlogCategory.id.in_(set(category_ids)))
     )
-    return result.scalars().all()
+    return {c.id: c for c in result.scalars().all()}
+
+
+async def get_tags_for_posts(session: AsyncSession, post_ids: List[int]) -> Dict[int, List[BlogTag]]:
+    """Returns {post_id: [tags]} for every post in post_ids (one query)."""
+    tags: Dict[int, List[BlogTag]] = {pid: [] for pid in post_ids}
+    if not post_ids:
+        return tags
+    result = await session.execute(
+        select(BlogPostTag.post_id, BlogTag)
+        .join(BlogTag, BlogPostTag.tag_id == BlogTag.id)
+        .where(BlogPostTag.post_id.in_(post_ids))
+        .order_by(BlogPostTag.id)
+    )
+    for post_id, tag in result.all():
+        tags[post_id].append(tag)
+    return tags
+
+
+async def get_liked_post_ids(session: AsyncSession, user_id: int, post_ids: List[int]) -> Set[int]:
+    """Subset of post_ids the user has liked (one query)."""
+    if not post_ids:
+        return set()
+    result = await session.execute(
+        select(BlogLike.post_id).where(
+            BlogLike.user_id == user_id, BlogLike.post_id.in_(post_ids)
+        )
+    )
+    return set(result.scalars().all())
 
 
 async def create_post(
@@ -217,10 +350,8 @@ async def create_post(
     try:
         tag_names: List[str] = data.pop("tags", [])
 
-        body_html        = sanitize_html(data.get("body_html", ""))
-        data["body_html"] = body_html
-        data["read_time"] = calculate_read_time(body_html)
-        data["slug"]      = make_slug(data["title"])
+        data.update(render_body(data.get("body_html", "")))
+        data["slug"] = make_slug(data["title"])
 
         if data.get("status") == PostStatus.PUBLISHED and not data.get("published_at"):
             data["published_at"] = datetime.utcnow()
@@ -234,20 +365,14 @@ async def create_post(
                 tag = await get_or_create_tag(session, name.strip())
                 session.add(BlogPostTag(post_id=post.id, tag_id=tag.id))
 
-        # Bump author post_count
-        author = await session.get(User, author_id)
-        if author:
-            author.post_count += 1
-            session.add(author)
-
-        # Bump category post_count
+        await session.execute(_bump(User, author_id, post_count=1))
         if post.category_id:
-            cat = await session.get(BlogCategory, post.category_id)
-            if cat:
-                cat.post_count += 1
-                session.add(cat)
+            await session.execute(_bump(BlogCategory, post.category_id, post_count=1))
 
         await session.commit()
+        response_cache.invalidate(LISTING, CATEGORIES)
+        if post.status == PostStatus.PUBLISHED:
+            sitemap_store.mark_dirty()
         await session.refresh(post)
         return post
     except Exception as e:
@@ -266,9 +391,11 @@ async def update_post(
         old_category_id = post.category_id
         old_status      = post.status
 
-        if "body_html" in data and data["body_html"] is not None:
-            data["body_html"] = sanitize_html(data["body_html"])
-            data["read_time"] = calculate_read_time(data["body_html"])
+        body_html = data.pop("body_html", None)
+        if body_html is not None:
+            # Set directly: derived fields may legitimately become None.
+            for k, v in render_body(body_html).items():
+                setattr(post, k, v)
 
         # Auto-set published_at when first publishing
         if (
@@ -301,18 +428,26 @@ async def update_post(
         # Update category counters
         if "category_id" in data and data["category_id"] != old_category_id:
             if old_category_id:
-                old_cat = await session.get(BlogCategory, old_category_id)
-                if old_cat:
-                    old_cat.post_count = max(0, old_cat.post_count - 1)
-                    session.add(old_cat)
+                await session.execute(_bump(BlogCategory, old_category_id, post_count=-1))
             if data["category_id"]:
-                new_cat = await session.get(BlogCategory, data["category_id"])
-                if new_cat:
-                    new_cat.post_count += 1
-                    session.add(new_cat)
+                await session.execute(_bump(BlogCategory, data["category_id"], post_count=1))
+
+        # Edits that can move the post in or out of a listing drop every
+        # listing; plain content edits only drop entries containing this post.
+        stale = [post_tag(post.id)]
+        if (
+            post.status != old_status
+            or post.category_id != old_category_id
+            or "featured" in data
+            or tag_names is not None
+        ):
+            stale += [LISTING, CATEGORIES]
 
         session.add(post)
         await session.commit()
+        response_cache.invalidate(*stale)
+        if post.status != old_status:
+            sitemap_store.mark_dirty()
         await session.refresh(post)
         return post
     except Exception as e:
@@ -323,21 +458,16 @@ async def update_post(
 
 async def delete_post(session: AsyncSession, post: BlogPost) -> bool:
     try:
+        if post.status != PostStatus.ARCHIVED:
+            await session.execute(_bump(User, post.author_id, post_count=-1))
+            if post.category_id:
+                await session.execute(_bump(BlogCategory, post.category_id, post_count=-1))
+
         post.status = PostStatus.ARCHIVED
         session.add(post)
-
-        author = await session.get(User, post.author_id)
-        if author:
-            author.post_count = max(0, author.post_count - 1)
-            session.add(author)
-
-        if post.category_id:
-            cat = await session.get(BlogCategory, post.category_id)
-            if cat:
-                cat.post_count = max(0, cat.post_count - 1)
-                session.add(cat)
-
         await session.commit()
+        response_cache.invalidate(post_tag(post.id), LISTING, CATEGORIES)
+        sitemap_store.mark_dirty()
         return True
     except Exception as e:
         await session.rollback()
@@ -345,36 +475,111 @@ async def delete_post(session: AsyncSession, post: BlogPost) -> bool:
         return False
 
 
-# ── View count ────────────────────────────────────────────────────────────────
+async def backfill_derived_fields(session: AsyncSession, batch_size: int = 200) -> int:
+    """
+    Fill the derived body fields (see render_body) for posts saved before
+    they existed. Called at boot; a no-op once every post has body_text.
+    """
+    filled, last_id = 0, 0
+    while True:
+        result = await session.execute(
+            select(BlogPost)
+            .where(BlogPost.body_text.is_(None), BlogPost.id > last_id)
+            .order_by(BlogPost.id)
+            .limit(batch_size)
+        )
+        posts = result.scalars().all()
+        if not posts:
+            return filled
+        for post in posts:
+            for k, v in render_body(post.body_html).items():
+                setattr(post, k, v)
+            session.add(post)
+        await session.commit()
+        filled += len(posts)
+        last_id = posts[-1].id
+
+
+# ── Hard deletes (admin) ──────────────────────────────────────────────────────
+# Set-based: a fixed number of statements regardless of how many posts,
+# likes or comments are involved. The caller owns the transaction.
+
+async def purge_posts(session: AsyncSession, post_filter) -> int:
+    """
+    Permanently delete the posts matching post_filter with their tags, likes,
+    comments, views and analytics rollups. Author/category post_count drop by the number of
+    non-archived posts removed. Returns the number of posts deleted.
+    """
+    post_ids = select(BlogPost.id).where(post_filter)
+    counted  = (post_filter, BlogPost.status != PostStatus.ARCHIVED)
+
+    await session.execute(_bump_grouped(User, "post_count", BlogPost.author_id, *counted))
+    await session.execute(_bump_grouped(
+        BlogCategory, "post_count", BlogPost.category_id, *counted, BlogPost.category_id.is_not(None)
+    ))
+    for model in (
+        BlogPostTag, BlogLike, BlogPostView, BlogComment,
+        BlogPostDailyStats, BlogPostDailyViewer,
+    ):
+        await session.execute(delete(model).where(model.post_id.in_(post_ids)))
+    result = await session.execute(delete(BlogPost).where(post_filter))
+    return result.rowcount
+
+
+async def purge_user_content(session: AsyncSession, user_id: int) -> int:
+    """
+    Remove everything a user owns ahead of deleting the account: their posts
+    (via purge_posts), likes and comments on other posts (adjusting those
+    posts' counters in one grouped UPDATE each), media and view records.
+    Replies by other users to the user's comments become top-level.
+    """
+    deleted = await purge_posts(session, BlogPost.author_id == user_id)
+
+    await session.execute(_bump_grouped(
+        BlogPost, "like_count", BlogLike.post_id, BlogLike.user_id == user_id
+    ))
+    await session.execute(delete(BlogLike).where(BlogLike.user_id == user_id))
+
+    own_comments = select(BlogComment.id).where(BlogComment.author_id == user_id)
+    await session.execute(_bump_grouped(
+        BlogPost, "comment_count", BlogComment.post_id,
+        BlogComment.author_id == user_id, BlogComment.is_deleted == False,  # noqa: E712
+    ))
+    await session.execute(
+        update(BlogComment)
+        .where(BlogComment.parent_id.in_(own_comments), BlogComment.author_id != user_id)
+        .values(parent_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await session.execute(delete(BlogComment).where(BlogComment.author_id == user_id))
 
-async def increment_view(session: AsyncSession, post: BlogPost, viewer_id: Optional[int] = None) -> None:
-    from models.models import BlogPostView
-    post.view_count += 1
-    session.add(post)
-    session.add(BlogPostView(post_id=post.id, viewer_id=viewer_id))
-    await session.commit()
+    await session.execute(delete(BlogMedia).where(BlogMedia.author_id == user_id))
+    await session.execute(delete(BlogPostView).where(BlogPostView.viewer_id == user_id))
+    await session.execute(delete(BlogPostDailyViewer).where(BlogPostDailyViewer.viewer_id == user_id))
+    return deleted
 
 
 # ── Likes ─────────────────────────────────────────────────────────────────────
 
-async def is_liked_by(session: AsyncSession, user_id: int, post_id: int) -> bool:
-    result = await session.execute(
-        select(BlogLike).where(BlogLike.user_id == user_id, BlogLike.post_id == post_id)
-    )
-    return result.scalars().first() is not None
-
-
 async def like_post(session: AsyncSession, user_id: int, post_id: int) -> bool:
+    """Idempotent like in one round trip. Returns False if already liked."""
     try:
-        if await is_liked_by(session, user_id, post_id):
-            return False
-        session.add(BlogLike(user_id=user_id, post_id=post_id))
-        post = await session.get(BlogPost, post_id)
-        if post:
-            post.like_count += 1
-            session.add(post)
+        result = await session.execute(text("""
+            WITH ins AS (
+                INSERT INTO blog_like (user_id, post_id, created_at)
+                VALUES (:user_id, :post_id, (now() AT TIME ZONE 'utc'))
+                ON CONFLICT ON CONSTRAINT uq_blog_like DO NOTHING
+                RETURNING post_id
+            )
+            UPDATE blog_post SET like_count = like_count + 1
+            WHERE id IN (SELECT post_id FROM ins)
+            RETURNING id
+        """), {"user_id": user_id, "post_id": post_id})
+        liked = result.first() is not None
         await session.commit()
-        return True
+        if liked:
+            response_cache.invalidate(post_tag(post_id))
+        return liked
     except Exception as e:
         await session.rollback()
         logging.error(f"like_post error: {e}")
@@ -382,20 +587,23 @@ async def like_post(session: AsyncSession, user_id: int, post_id: int) -> bool:
 
 
 async def unlike_post(session: AsyncSession, user_id: int, post_id: int) -> bool:
+    """Idempotent unlike in one round trip. Returns False if not liked."""
     try:
-        result = await session.execute(
-            select(BlogLike).where(BlogLike.user_id == user_id, BlogLike.post_id == post_id)
-        )
-        like = result.scalars().first()
-        if not like:
-            return False
-        await session.delete(like)
-        post = await session.get(BlogPost, post_id)
-        if post:
-            post.like_count = max(0, post.like_count - 1)
-            session.add(post)
+        result = await session.execute(text("""
+            WITH del AS (
+                DELETE FROM blog_like
+                WHERE user_id = :user_id AND post_id = :post_id
+                RETURNING post_id
+            )
+            UPDATE blog_post SET like_count = GREATEST(like_count - 1, 0)
+            WHERE id IN (SELECT post_id FROM del)
+            RETURNING id
+        """), {"user_id": user_id, "post_id": post_id})
+        unliked = result.first() is not None
         await session.commit()
-        return True
+        if unliked:
+            response_cache.invalidate(post_tag(post_id))
+        return unliked
     except Exception as e:
         await session.rollback()
         logging.error(f"unlike_post error: {e}")
@@ -404,13 +612,72 @@ async def unlike_post(session: AsyncSession, user_id: int, post_id: int) -> bool
 
 # ── Comments ──────────────────────────────────────────────────────────────────
 
-async def get_comments_for_post(session: AsyncSession, post_id: int) -> List[BlogComment]:
+async def get_comment_thread(
+    session: AsyncSession,
+    post_id: int,
+    limit: int = 50,
+    after_id: Optional[int] = None,
+    max_depth: int = 5,
+    max_replies: int = 100,
+) -> Tuple[List[Tuple[BlogComment, User]], Optional[int]]:
+    """
+    One page of top-level comments plus their replies (up to max_depth levels,
+    at most max_replies per top-level comment, oldest first), each joined with
+    its author. Rows come grouped by top-level comment in page order, parents
+    before their replies. Deleted comments are included so callers can
+    re-attach their replies; it is up to them to hide them.
+
+    Returns (rows, next_after_id).
+    """
+    root_q = select(BlogComment.id).where(
+        BlogComment.post_id == post_id, BlogComment.parent_id == None
+    )
+    if after_id is not None:
+        root_q = root_q.where(BlogComment.id > after_id)
+    roots = (await session.execute(
+        root_q.order_by(BlogComment.id.asc()).limit(limit)
+    )).scalars().all()
+    if not roots:
+        return [], None
+    next_after = roots[-1] if len(roots) == limit else None
+
+    thread = (
+        select(BlogComment.id, BlogComment.id.label("root_id"), literal(0).label("depth"))
+        .where(BlogComment.id.in_(roots))
+        .cte("thread", recursive=True)
+    )
+    child  = aliased(BlogComment)
+    thread = thread.union_all(
+        select(child.id, thread.c.root_id, thread.c.depth + 1)
+        .where(
+            child.post_id == post_id,
+            child.parent_id == thread.c.id,
+            thread.c.depth < max_depth,
+        )
+    )
+    # The cap is taken per top-level comment, so a busy early thread cannot
+    # crowd later ones off the page. A reply is never older than its parent,
+    # so the oldest-first prefix of each thread keeps every kept reply's
+    # parent (the root itself is always rank 1).
+    ranked = (
+        select(
+            thread.c.id, thread.c.root_id,
+            func.row_number().over(
+                partition_by=thread.c.root_id,
+                order_by=(BlogComment.created_at.asc(), BlogComment.id.asc()),
+            ).label("rank"),
+        )
+        .join(BlogComment, BlogComment.id == thread.c.id)
+        .subquery()
+    )
     result = await session.execute(
-        select(BlogComment)
-        .where(BlogComment.post_id == post_id, BlogComment.is_deleted == False)
-        .order_by(BlogComment.created_at.asc())
+        select(BlogComment, User)
+        .join(ranked, ranked.c.id == BlogComment.id)
+        .join(User, User.id == BlogComment.author_id)
+        .where(ranked.c.rank <= max_replies + 1)
+        .order_by(ranked.c.root_id.asc(), ranked.c.rank.asc())
     )
-    return result.scalars().all()
+    return result.all(), next_after
 
 
 async def create_comment(
@@ -424,13 +691,9 @@ async def create_comment(
             parent_id=parent_id,
         )
         session.add(comment)
-
-        post = await session.get(BlogPost, post_id)
-        if post:
-            post.comment_count += 1
-            session.add(post)
-
+        await session.execute(_bump(BlogPost, post_id, comment_count=1))
         await session.commit()
+        response_cache.invalidate(post_tag(post_id))
         await session.refresh(comment)
         return comment
     except Exception as e:
@@ -441,21 +704,25 @@ async def create_comment(
 
 async def delete_comment(session: AsyncSession, comment_id: int, user_id: int, is_admin: bool) -> bool:
     try:
-        comment = await session.get(BlogComment, comment_id)
-        if not comment or comment.is_deleted:
-            return False
-        if comment.author_id != user_id and not is_admin:
+        # Soft-delete only if still visible and allowed; the WHERE clause makes
+        # concurrent deletes of the same comment decrement the counter once.
+        q = (
+            update(BlogComment)
+            .where(BlogComment.id == comment_id, BlogComment.is_deleted == False)
+            .values(is_deleted=True)
+            .returning(BlogComment.post_id)
+            .execution_options(synchronize_session=False)
+        )
+        if not is_admin:
+            q = q.where(BlogComment.author_id == user_id)
+        post_id = (await session.execute(q)).scalar()
+        if post_id is None:
+            await session.rollback()
             return False
 
-        comment.is_deleted = True
-        session.add(comment)
-
-        post = await session.get(BlogPost, comment.post_id)
-        if post:
-            post.comment_count = max(0, post.comment_count - 1)
-            session.add(post)
-
+        await session.execute(_bump(BlogPost, post_id, comment_count=-1))
         await session.commit()
+        response_cache.invalidate(post_tag(post_id))
         return True
     except Exception as e:
         await session.rollback()
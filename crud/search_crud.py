@@ -0,0 +1,81 @@
+"""
+search_crud.py — Full-text search over blog posts and trigram search over users.
+
+Posts are matched against blog_post.search_vector, a STORED generated tsvector
+over title (weight A), subtitle + meta_description (B) and body_text (C), the
+plain text stored at write time. The column and its GIN index are created by
+core/migrations.py, so the backfill happens once when the column is added and Postgres
+keeps it current on every write.
+"""
+
+from typing import Optional, List, Tuple
+
+from sqlalchemy import text, or_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.models import User, BlogPost
+
+SEARCH_TS_CONFIG = "simple"   # must match the config used in the search_vector migration
+
+_HEADLINE_OPTS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+async def search_posts(
+    session: AsyncSession,
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    highlight: bool = True,
+) -> List[Tuple[BlogPost, float, Optional[str]]]:
+    """
+    Returns [(post, rank, snippet)] for published posts matching q, best
+    match first. Snippets are only built for the rows on the requested page.
+    """
+    # Raw SQL compares status against the enum label, which SQLAlchemy takes
+    # from the member name ('PUBLISHED'), not its value.
+    page = (await session.execute(text(f"""
+        SELECT id, ts_rank(search_vector, query) AS rank
+        FROM blog_post, websearch_to_tsquery('{SEARCH_TS_CONFIG}', :q) AS query
+        WHERE status = 'PUBLISHED' AND search_vector @@ query
+        ORDER BY rank DESC, published_at DESC, id DESC
+        LIMIT :limit OFFSET :offset
+    """), {"q": q, "limit": limit, "offset": offset})).all()
+    if not page:
+        return []
+
+    ids   = [r.id for r in page]
+    ranks = {r.id: float(r.rank) for r in page}
+
+    snippets = {}
+    if highlight:
+        rows = (await session.execute(text(f"""
+            SELECT id, ts_headline(
+                '{SEARCH_TS_CONFIG}',
+                coalesce(body_text, regexp_replace(coalesce(body_html, ''), '<[^>]+>', ' ', 'g')),
+                websearch_to_tsquery('{SEARCH_TS_CONFIG}', :q),
+                :opts
+            ) AS snippet
+            FROM blog_post WHERE id = ANY(:ids)
+        """), {"q": q, "opts": _HEADLINE_OPTS, "ids": ids})).all()
+        snippets = {r.id: r.snippet for r in rows}
+
+    result = await session.execute(select(BlogPost).where(BlogPost.id.in_(ids)))
+    posts  = {p.id: p for p in result.scalars().all()}
+    return [(posts[i], ranks[i], snippets.get(i)) for i in ids if i in posts]
+
+
+async def search_users(session: AsyncSession, q: str, limit: int = 10) -> List[User]:
+    """Substring match on username, display_name and bio (all trigram-indexed)."""
+    pattern = f"%{q}%"
+    result  = await session.execute(
+        select(User)
+        .where(or_(
+            User.username.ilike(pattern),
+            User.display_name.ilike(pattern),
+            User.bio.ilike(pattern),
+        ))
+        .order_by(User.post_count.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
@@ -3,16 +3,30 @@ const BACKEND = 'https://beelog-poes.onrender.com';
 
 export async function onRequest(context) {
     try {
+        // Forward the client's validators so an unchanged sitemap costs a 304.
+        const conditional = {};
+        for (const h of ['If-None-Match', 'If-Modified-Since']) {
+            const v = context.request.headers.get(h);
+            if (v) conditional[h] = v;
+        }
         const res = await fetch(`${BACKEND}/sitemap-blog.xml`, {
+            headers: conditional,
             cf: { cacheTtl: 86400 },
         });
+        const headers = {
+            'Content-Type': 'application/xml; charset=utf-8',
+            'Cache-Control': 'public, max-age=86400',
+        };
+        for (const h of ['ETag', 'Last-Modified']) {
+            const v = res.headers.get(h);
+            if (v) headers[h] = v;
+        }
+        if (res.status === 304) {
+            return new Response(null, { status: 304, headers });
+        }
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
         const xml = await res.text();
-        return new Response(xml, {
-            headers: {
-                'Content-Type': 'application/xml; charset=utf-8',
-                'Cache-Control': 'public, max-age=86400',
-            },
-        });
+        return new Response(xml, { headers });
     } catch {
         const fallback = await context.env.ASSETS.fetch(
             new Request(new URL('/sitemap-blog.xml', context.request.url))
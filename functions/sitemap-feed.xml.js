@@ -4,16 +4,30 @@ const BACKEND = 'https://beelog-poes.onrender.com';
 
 export async function onRequest(context) {
     try {
+        // Forward the client's validators so an unchanged sitemap costs a 304.
+        const conditional = {};
+        for (const h of ['If-None-Match', 'If-Modified-Since']) {
+            const v = context.request.headers.get(h);
+            if (v) conditional[h] = v;
+        }
         const res = await fetch(`${BACKEND}/sitemap-feed.xml`, {
+            headers: conditional,
             cf: { cacheTtl: 3600 },
         });
+        const headers = {
+            'Content-Type': 'application/xml; charset=utf-8',
+            'Cache-Control': 'public, max-age=3600',
+        };
+        for (const h of ['ETag', 'Last-Modified']) {
+            const v = res.headers.get(h);
+            if (v) headers[h] = v;
+        }
+        if (res.status === 304) {
+            return new Response(null, { status: 304, headers });
+        }
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
         const xml = await res.text();
-        return new Response(xml, {
-            headers: {
-                'Content-Type': 'application/xml; charset=utf-8',
-                'Cache-Control': 'public, max-age=3600',
-            },
-        });
+        return new Response(xml, { headers });
     } catch {
         // Backend sleeping (Render free tier spin-up) — serve static fallback
         const fallback = await context.env.ASSETS.fetch(
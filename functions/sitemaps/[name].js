@@ -0,0 +1,35 @@
+// Cloudflare Pages Function: proxy sitemap shards (/sitemaps/blog-<n>.xml)
+// referenced by the sitemap index once the blog outgrows one file.
+const BACKEND = 'https://beelog-poes.onrender.com';
+
+export async function onRequest(context) {
+    const name = context.params.name;
+    if (!/^blog-\d+\.xml$/.test(name)) {
+        return new Response('Not found', { status: 404 });
+    }
+
+    const conditional = {};
+    for (const h of ['If-None-Match', 'If-Modified-Since']) {
+        const v = context.request.headers.get(h);
+        if (v) conditional[h] = v;
+    }
+    const res = await fetch(`${BACKEND}/sitemaps/${name}`, {
+        headers: conditional,
+        cf: { cacheTtl: 86400 },
+    });
+    const headers = {
+        'Content-Type': 'application/xml; charset=utf-8',
+        'Cache-Control': 'public, max-age=86400',
+    };
+    for (const h of ['ETag', 'Last-Modified']) {
+        const v = res.headers.get(h);
+        if (v) headers[h] = v;
+    }
+    if (res.status === 304) {
+        return new Response(null, { status: 304, headers });
+    }
+    return new Response(res.ok ? await res.text() : 'Not found', {
+        status: res.ok ? 200 : res.status,
+        headers,
+    });
+}
@@ -1,52 +1,39 @@
 import os
+from typing import Optional
 from contextlib import asynccontextmanager
-from fastapi import Depends, FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse, RedirectResponse, Response
-from sqlmodel import select
-from sqlmodel.ext.asyncio.session import AsyncSession
 
-from core.database import engine, get_session
-from core.security import get_password_hash
-from models.models import User, UserRole, BlogPost, PostStatus
+from core.analytics import view_rollup
+from core.conditional import validator_headers, not_modified, not_modified_response
+from core.database import READ_YOUR_WRITES_HEADER
+from core.migrations import check_schema
+from core.notify import notifier, INDEXNOW_KEY
+from core.sitemap import sitemap_store, SitemapDoc, shard_name, INDEX_NAME as SITEMAP_INDEX
+from core.storage import UploadLimitMiddleware
+from core.views import view_buffer
 
 from routers.auth  import router as auth_router
 from routers.posts import router as posts_router
 from routers.admin import router as admin_router
 
 
-# ── Root bootstrap ────────────────────────────────────────────────────────────
-
-async def _bootstrap_root(session: AsyncSession):
-    result = await session.exec(select(User).where(User.role == UserRole.ROOT))
-    if result.first():
-        return
-
-    root_password = os.environ.get("ROOT_PASSWORD")
-    if not root_password:
-        print("WARNING: ROOT_PASSWORD env var not set — skipping root bootstrap")
-        return
-
-    root = User(
-        username="root",
-        password_hash=get_password_hash(root_password),
-        role=UserRole.ROOT,
-        display_name="Root",
-    )
-    session.add(root)
-    await session.commit()
-    print("Root user created — username: root")
-
-
 # ── Lifespan ──────────────────────────────────────────────────────────────────
+# Boot checks the schema version in one query and applies pending migrations
+# only when the database is behind, then bootstraps the root user if there is
+# none yet; see core.migrations.
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    from core.database import init_db
-    await init_db()
-    async with AsyncSession(engine) as session:
-        await _bootstrap_root(session)
+    await check_schema()
+    view_buffer.start()
+    view_rollup.start()
+    notifier.start()
     yield
+    await notifier.stop()
+    await view_rollup.stop()
+    await view_buffer.stop()
 
 
 # ── App ───────────────────────────────────────────────────────────────────────
@@ -59,12 +46,18 @@ _raw_origins = os.environ.get(
 )
 ALLOWED_ORIGINS = [o.strip() for o in _raw_origins.split(",") if o.strip()]
 
+sitemap_store.configure(ALLOWED_ORIGINS[0] if ALLOWED_ORIGINS else "https://beelog-poes.onrender.com")
+notifier.configure(ALLOWED_ORIGINS[0] if ALLOWED_ORIGINS else "https://beelog-poes.onrender.com")
+
+# Inside CORS, so a 413 still carries the CORS headers the browser needs.
+app.add_middleware(UploadLimitMiddleware, paths=["/admin/media/upload"])
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", READ_YOUR_WRITES_HEADER],
 )
 
 
@@ -93,49 +86,42 @@ async def robots_txt():
     return PlainTextResponse(content)
 
 
+def _serve_sitemap(request: Request, doc: Optional[SitemapDoc]) -> Response:
+    if doc is None:
+        return Response(status_code=404)
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    etag     = doc.etag[:-1] + '-gz"' if use_gzip else doc.etag
+    headers  = validator_headers(etag, doc.last_modified, cache_control="public, max-age=3600")
+    headers["Vary"] = "Accept-Encoding"
+    if not_modified(request, etag, doc.last_modified):
+        return not_modified_response(headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=doc.gzipped, media_type="application/xml", headers=headers)
+    return Response(content=doc.body, media_type="application/xml", headers=headers)
+
+
 @app.get("/sitemap-blog.xml", include_in_schema=False)
-async def sitemap_blog(session: AsyncSession = Depends(get_session)):
-    base = ALLOWED_ORIGINS[0] if ALLOWED_ORIGINS else "https://beelog-poes.onrender.com"
+async def sitemap_blog(request: Request):
+    return _serve_sitemap(request, await sitemap_store.get(SITEMAP_INDEX))
 
-    result = await session.exec(
-        select(BlogPost)
-        .where(BlogPost.status == PostStatus.PUBLISHED)
-        .order_by(BlogPost.published_at.desc())
-        .limit(1000)
-    )
-    posts = result.all()
-
-    def _xe(s: str) -> str:
-        return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-
-    url_blocks = "\n".join(
-        f"  <url>\n"
-        f"    <loc>{base}/post.html?slug={_xe(p.slug)}</loc>\n"
-        f"    <lastmod>{(p.published_at or p.updated_at).strftime('%Y-%m-%d')}</lastmod>\n"
-        f"    <changefreq>weekly</changefreq>\n"
-        f"    <priority>0.8</priority>\n"
-        f"  </url>"
-        for p in posts
-    )
 
-    content = (
-        '<?xml version="1.0" encoding="UTF-8"?>\n'
-        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-        '  <url>\n'
-        f'    <loc>{base}/blog.html</loc>\n'
-        '    <changefreq>hourly</changefreq>\n'
-        '    <priority>1.0</priority>\n'
-        '  </url>\n'
-        f'{url_blocks}\n'
-        '</urlset>'
-    )
-    return Response(content=content, media_type="application/xml")
+@app.get("/sitemaps/blog-{n}.xml", include_in_schema=False)
+async def sitemap_blog_shard(request: Request, n: int):
+    return _serve_sitemap(request, await sitemap_store.get(shard_name(n)))
+
+
+# IndexNow ownership proof: the key must be served as /{key}.txt on the site host.
+if INDEXNOW_KEY:
+    @app.get(f"/{INDEXNOW_KEY}.txt", include_in_schema=False)
+    async def indexnow_key():
+        return PlainTextResponse(INDEXNOW_KEY)
 
 
 # Keep old sitemap-feed.xml alive so CF Pages function doesn't 404
 @app.get("/sitemap-feed.xml", include_in_schema=False)
-async def sitemap_feed(session: AsyncSession = Depends(get_session)):
-    return await sitemap_blog(session)
+async def sitemap_feed(request: Request):
+    return await sitemap_blog(request)
 
 
 # ── Routers ───────────────────────────────────────────────────────────────────
@@ -143,3 +129,10 @@ async def sitemap_feed(session: AsyncSession = Depends(get_session)):
 app.include_router(auth_router)
 app.include_router(posts_router)
 app.include_router(admin_router)
+
+# Local media backend (dev/tests): serve uploaded files directly.
+from core.storage import MEDIA_STORAGE, MEDIA_LOCAL_DIR, MEDIA_LOCAL_URL  # noqa: E402
+if MEDIA_STORAGE == "local":
+    from fastapi.staticfiles import StaticFiles
+    os.makedirs(MEDIA_LOCAL_DIR, exist_ok=True)
+    app.mount(MEDIA_LOCAL_URL, StaticFiles(directory=MEDIA_LOCAL_DIR), name="media")
@@ -3,12 +3,12 @@ models.py — Database models for the blog platform.
 
 Old chat/tweet tables (user, tweet, like, comment, room, roommember, message, roomkeybundle)
 are intentionally left in the DB untouched. All new blog tables use the 'blog_' prefix.
-The 'user' table is shared and extended with new columns via init_db migrations.
+The 'user' table is shared and extended with new columns via core/migrations.py.
 """
 
 from sqlmodel import SQLModel, Field, Relationship, Column
-from sqlalchemy import Text, UniqueConstraint
-from datetime import datetime
+from sqlalchemy import Index, Text, UniqueConstraint
+from datetime import date, datetime
 from typing import Optional, List
 from enum import Enum
 
@@ -33,7 +33,7 @@ class PostStatus(str, Enum):
 class User(SQLModel, table=True):
     """
     Shared user model.  The 'user' table already exists in Supabase;
-    new columns are added via ALTER TABLE … ADD COLUMN IF NOT EXISTS in init_db().
+    new columns are added via ALTER TABLE … ADD COLUMN IF NOT EXISTS in core/migrations.py.
     """
     __tablename__ = "user"
 
@@ -107,6 +107,13 @@ class BlogPost(SQLModel, table=True):
 
     meta_description: Optional[str] = Field(default=None, max_length=300)
 
+    # Derived from body_html on every save (core.content.process_html)
+    body_text:       Optional[str] = Field(default=None, sa_column=Column(Text))
+    excerpt:         Optional[str] = Field(default=None, max_length=400)
+    word_count:      int           = Field(default=0)
+    outline:         Optional[str] = Field(default=None, sa_column=Column(Text))  # JSON [{level, text, id}]
+    first_image_url: Optional[str] = Field(default=None, max_length=500)
+
     published_at: Optional[datetime] = Field(default=None, index=True)
     created_at:   datetime = Field(default_factory=datetime.utcnow, index=True)
     updated_at:   datetime = Field(default_factory=datetime.utcnow)
@@ -187,6 +194,7 @@ class BlogMedia(SQLModel, table=True):
     filename:   str           = Field(max_length=255)
     mime_type:  str           = Field(max_length=100)
     size_bytes: Optional[int] = None
+    variants:   Optional[str] = Field(default=None, sa_column=Column(Text))  # JSON {width: url}
     author_id:  int           = Field(foreign_key="user.id", index=True)
     created_at: datetime      = Field(default_factory=datetime.utcnow)
 
@@ -196,9 +204,58 @@ class BlogMedia(SQLModel, table=True):
 # ── BlogPostView ─────────────────────────────────────────────────────────────────
 
 class BlogPostView(SQLModel, table=True):
-    __tablename__ = "blog_post_view"
-
-    id:         Optional[int] = Field(default=None, primary_key=True)
-    post_id:    int           = Field(foreign_key="blog_post.id", index=True)
+    """
+    Raw view log, range-partitioned by month on created_at (the partition key
+    has to be part of the primary key). Partitions are created ahead of time
+    and retired after rollup by core.analytics.
+    """
+    __tablename__  = "blog_post_view"
+    __table_args__ = (
+        Index("ix_blog_post_view_post_created", "post_id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id:         Optional[int] = Field(
+        default=None, primary_key=True, sa_column_kwargs={"autoincrement": True}
+    )
+    post_id:    int           = Field(foreign_key="blog_post.id")
     viewer_id:  Optional[int] = Field(default=None, foreign_key="user.id", index=True)
-    created_at: datetime      = Field(default_factory=datetime.utcnow, index=True)
+    created_at: datetime      = Field(default_factory=datetime.utcnow, primary_key=True)
+
+
+# ── Analytics rollups ───────────────────────────────────────────────────────────
+# Folded from blog_post_view by core.analytics; the admin analytics endpoints
+# read these instead of the raw view log.
+
+class BlogPostDailyStats(SQLModel, table=True):
+    __tablename__ = "blog_post_daily_stats"
+
+    post_id:        int  = Field(foreign_key="blog_post.id", primary_key=True)
+    day:            date = Field(primary_key=True, index=True)
+    views:          int  = Field(default=0)
+    anon_views:     int  = Field(default=0)
+    unique_viewers: int  = Field(default=0)   # distinct signed-in viewers that day
+
+
+class BlogPostDailyViewer(SQLModel, table=True):
+    """Exact per-day viewer set: one row per signed-in viewer, post and day."""
+    __tablename__ = "blog_post_daily_viewer"
+
+    post_id:     int      = Field(foreign_key="blog_post.id", primary_key=True)
+    day:         date     = Field(primary_key=True)
+    viewer_id:   int      = Field(foreign_key="user.id", primary_key=True, index=True)
+    views:       int      = Field(default=0)
+    last_viewed: datetime
+
+
+class AnalyticsCheckpoint(SQLModel, table=True):
+    """
+    Rollup watermark. Rows with last_id < id <= pending_max are folded on the
+    next run; pending_max trails max(id) by one run so view inserts still in
+    flight when it was read have committed by then.
+    """
+    __tablename__ = "analytics_checkpoint"
+
+    name:        str = Field(primary_key=True, max_length=50)
+    last_id:     int = Field(default=0)
+    pending_max: int = Field(default=0)
@@ -46,22 +46,30 @@ function initReadingBar() {
 
 // ── Table of Contents ─────────────────────────────────────────────────────────
 
-function buildTOC() {
+function buildTOC(outline) {
   const body    = document.getElementById('art-body');
   const tocWrap = document.getElementById('toc-wrap');
   const toc     = document.getElementById('toc');
   if (!body || !toc) return;
 
-  const headings = body.querySelectorAll('h2, h3');
-  if (headings.length < 3) return;
+  // The server stores the heading outline (with matching ids) on save;
+  // fall back to scanning the DOM for posts rendered before that existed.
+  const entries = outline?.length
+    ? outline.filter(o => o.level >= 2)
+        .map(o => ({ el: document.getElementById(o.id), text: o.text, level: o.level }))
+        .filter(o => o.el)
+    : Array.from(body.querySelectorAll('h2, h3'))
+        .map(h => ({ el: h, text: h.textContent, level: h.tagName === 'H3' ? 3 : 2 }));
+  if (entries.length < 3) return;
+  const headings = entries.map(o => o.el);
 
   tocWrap.style.display = 'block';
-  headings.forEach((h, i) => {
+  entries.forEach(({ el: h, text, level }, i) => {
     if (!h.id) h.id = 'h-' + i;
     const a  = document.createElement('a');
     a.href = '#' + h.id;
-    a.textContent = h.textContent;
-    a.className   = h.tagName === 'H3' ? 'toc-h3' : '';
+    a.textContent = text;
+    a.className   = level === 3 ? 'toc-h3' : '';
     a.addEventListener('click', e => {
       e.preventDefault();
       h.scrollIntoView({ behavior: 'smooth', block: 'start' });
@@ -88,8 +96,8 @@ function renderPost(post) {
   document.title = post.title + ' — BeeLog';
   document.querySelector('[rel=canonical]').href = location.href;
   document.querySelector('[property="og:title"]').content = post.title;
-  document.querySelector('[property="og:description"]').content = post.meta_description || post.subtitle || '';
-  document.querySelector('[property="og:image"]').content = post.cover_image_url || '';
+  document.querySelector('[property="og:description"]').content = post.meta_description || post.subtitle || post.excerpt || '';
+  document.querySelector('[property="og:image"]').content = post.cover_image_url || post.first_image_url || '';
 
   // Draft banner
   if (post.status !== 'published') {
@@ -182,7 +190,7 @@ function renderPost(post) {
 
   // Post-render: highlight code blocks, build TOC
   if (window.hljs) document.querySelectorAll('pre code').forEach(el => hljs.highlightElement(el));
-  buildTOC();
+  buildTOC(post.outline);
 }
 
 // ── Likes ─────────────────────────────────────────────────────────────────────
@@ -207,6 +215,7 @@ async function toggleLike() {
       method,
       headers: { 'Authorization': `Bearer ${authToken}` },
     });
+    noteWrite(res);
     if (res.ok || res.status === 204) {
       _liked = !_liked;
       _likeCount += _liked ? 1 : -1;
@@ -217,17 +226,29 @@ async function toggleLike() {
 
 // ── Comments ──────────────────────────────────────────────────────────────────
 
-async function loadComments() {
+let _commentsCursor = null;
+
+async function loadComments(more = false) {
   try {
-    const res  = await fetch(`${API}/posts/${encodeURIComponent(_slug)}/comments`);
+    const params = new URLSearchParams({ limit: '50' });
+    if (more && _commentsCursor) params.set('after_id', _commentsCursor);
+    const res  = await fetch(`${API}/posts/${encodeURIComponent(_slug)}/comments?${params}`,
+                             { headers: rywHeaders() });
     const data = await res.json();
-
-    const badge = document.getElementById('comment-count-badge');
-    if (badge) badge.textContent = data.length;
+    _commentsCursor = res.headers.get('X-Next-Cursor');
 
     const list = document.getElementById('comments-list');
-    list.innerHTML = '';
+    if (!more) list.innerHTML = '';
+    document.getElementById('comments-more-btn')?.remove();
     data.forEach(c => renderComment(c, list));
+
+    const badge = document.getElementById('comment-count-badge');
+    if (badge) badge.textContent = list.querySelectorAll(':scope > .comment-item').length;
+
+    if (_commentsCursor) {
+      list.insertAdjacentHTML('afterend',
+        `<button class="btn btn-secondary btn-sm" id="comments-more-btn" onclick="loadComments(true)">Load more comments</button>`);
+    }
   } catch {}
 }
 
@@ -287,6 +308,7 @@ async function submitComment() {
       },
       body: JSON.stringify({ body, parent_id: _replyToId }),
     });
+    noteWrite(res);
     if (res.ok) {
       input.value = '';
       input.placeholder = 'Write a comment…';
@@ -391,7 +413,7 @@ document.addEventListener('DOMContentLoaded', async () => {
 
   // Fetch post
   try {
-    const headers = {};
+    const headers = rywHeaders();
     if (typeof authToken !== 'undefined' && authToken) {
       headers['Authorization'] = `Bearer ${authToken}`;
     }
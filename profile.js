@@ -188,7 +188,7 @@ async function loadProfilePosts(username, replace = true) {
     } else {
       // Other users: paginated
       const params = new URLSearchParams({ author: username, limit: '20' });
-      if (_profileNextCursor) params.set('before_id', _profileNextCursor);
+      if (_profileNextCursor) params.set('cursor', _profileNextCursor);
       const res  = await fetch(`${API}/posts?${params}`);
       const data = await res.json();
       posts = data.posts || [];
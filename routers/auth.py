@@ -8,10 +8,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from core.database import get_session
+from core.cache import response_cache
+from core.database import get_session, get_read_session
 from core.security import (
-    create_access_token, get_current_user, get_password_hash,
-    verify_password, require_root, ACCESS_TOKEN_EXPIRE_MINUTES, ROLE_HIERARCHY,
+    create_access_token, get_current_user, get_password_hash_async,
+    verify_password_async, require_root, ACCESS_TOKEN_EXPIRE_MINUTES, ROLE_HIERARCHY,
 )
 from models.models import User, UserRole
 from schemas.schemas import Token, UserCreate, UserResponse, UserUpdate, UserProfile, UserSession
@@ -28,7 +29,7 @@ async def login(
     session: AsyncSession = Depends(get_session),
 ):
     user = await crud.get_user_by_username(session, form_data.username)
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -60,7 +61,7 @@ async def register(
 
     user = User(
         username=body.username,
-        password_hash=get_password_hash(body.password),
+        password_hash=await get_password_hash_async(body.password),
         role=body.role,
         display_name=body.display_name,
     )
@@ -75,7 +76,7 @@ async def register(
 @router.get("/auth/me", response_model=UserProfile)
 async def get_me(
     current_user: UserSession = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     user = await crud.get_user_by_id(session, current_user.id)
     if not user:
@@ -99,6 +100,7 @@ async def update_me(
 
     session.add(user)
     await session.commit()
+    response_cache.clear()   # author name/avatar are embedded in cached cards
     await session.refresh(user)
     return user
 
@@ -108,7 +110,7 @@ async def update_me(
 @router.get("/users/{username}", response_model=UserProfile)
 async def get_user_profile(
     username: str,
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     user = await crud.get_user_by_username(session, username)
     if not user:
@@ -133,9 +135,9 @@ async def change_password(
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters")
 
     user = await crud.get_user_by_id(session, current_user.id)
-    if not user or not verify_password(old_password, user.password_hash):
+    if not user or not await verify_password_async(old_password, user.password_hash):
         raise HTTPException(status_code=401, detail="Current password is incorrect")
 
-    user.password_hash = get_password_hash(new_password)
+    user.password_hash = await get_password_hash_async(new_password)
     session.add(user)
     await session.commit()
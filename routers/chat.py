@@ -1,7 +1,7 @@
 import uuid
 import json
 import jwt
-from typing import List, Dict, Optional
+from typing import List, Optional
 from datetime import timedelta, datetime, timezone
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Query
@@ -10,6 +10,7 @@ from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy import select
 
 from core.database import get_session
+from core.fanout import ConnectionManager
 from core.security import (
     get_password_hash, verify_password, create_access_token,
     get_current_user, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES,
@@ -27,51 +28,14 @@ router = APIRouter(tags=["Live Chat & Auth"])
 
 
 # ── Per-room WebSocket connection manager ─────────────────────────────────────
-
-class ConnectionManager:
-    def __init__(self):
-        # room_id -> list of {"ws": WebSocket, "username": str, "user_id": int}
-        self._rooms: Dict[str, List[dict]] = {}
-
-    def _ensure_room(self, room_id: str):
-        if room_id not in self._rooms:
-            self._rooms[room_id] = []
-
-    async def connect(self, websocket: WebSocket, room_id: str, username: str, user_id: int):
-        await websocket.accept()
-        self._ensure_room(room_id)
-        self._rooms[room_id].append({"ws": websocket, "username": username, "user_id": user_id})
-
-    def disconnect(self, websocket: WebSocket, room_id: str):
-        if room_id in self._rooms:
-            self._rooms[room_id] = [
-                c for c in self._rooms[room_id] if c["ws"] is not websocket
-            ]
-
-    async def broadcast(self, room_id: str, payload: dict, exclude: WebSocket = None):
-        if room_id not in self._rooms:
-            return
-        text = json.dumps(payload)
-        dead = []
-        for conn in self._rooms[room_id]:
-            if conn["ws"] is exclude:
-                continue
-            try:
-                await conn["ws"].send_text(text)
-            except Exception:
-                dead.append(conn["ws"])
-        for ws in dead:
-            self._rooms[room_id] = [c for c in self._rooms[room_id] if c["ws"] is not ws]
-
-    def online_count(self, room_id: str) -> int:
-        return len(self._rooms.get(room_id, []))
-
-    def online_users(self, room_id: str) -> List[str]:
-        return [c["username"] for c in self._rooms.get(room_id, [])]
-
+# Fan-out with per-connection send queues (core/fanout.py), relayed to other
+# workers by the CHAT_BROKER broker (core/broker.py).
 
 manager = ConnectionManager()
 
+# Widest datetime.isoformat() output, so size checks never under-count.
+_TIMESTAMP_PLACEHOLDER = "0000-00-00T00:00:00.000000+00:00"
+
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
@@ -356,10 +320,26 @@ async def websocket_endpoint(
 
             # Locked room guard
             if room_record.locked and not is_room_admin:
-                await websocket.send_text(json.dumps({
+                await manager.send(websocket, room, {
                     "type": "error",
                     "text": "This room is locked — only admins can send messages",
-                }))
+                })
+                continue
+
+            chat = {
+                "type": "chat",
+                "username": username,
+                "text": data,
+                "timestamp": _TIMESTAMP_PLACEHOLDER,
+                "room": room,
+            }
+            # The relayed envelope must fit in one NOTIFY; checked before the
+            # message is stored so the sender learns it was not delivered.
+            if not manager.fits(room, chat):
+                await manager.send(websocket, room, {
+                    "type": "error",
+                    "text": "Message too long",
+                })
                 continue
 
             msg = Message(message=data, sender_id=user_id, room_id=room)
@@ -367,13 +347,8 @@ async def websocket_endpoint(
             await session.commit()
             await session.refresh(msg)
 
-            await manager.broadcast(room, {
-                "type": "chat",
-                "username": username,
-                "text": data,
-                "timestamp": msg.created_at.isoformat(),
-                "room": room,
-            })
+            chat["timestamp"] = msg.created_at.isoformat()
+            await manager.broadcast(room, chat)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket, room)
@@ -2,71 +2,99 @@
 routers/posts.py — Blog post CRUD, likes, comments, related posts.
 """
 
-import requests as _requests
-from typing import Optional, List
+import json
+from typing import Dict, Optional, List, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, BackgroundTasks, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from core.database import get_session
+from core.cache import response_cache, post_tag, LISTING, CATEGORIES
+from core.conditional import make_etag, validator_headers, not_modified, not_modified_response
+from core.database import get_session, get_read_session
+from core.notify import notifier
 from core.security import get_current_user, get_optional_user, require_author, ROLE_HIERARCHY
+from core.views import view_buffer
 from models.models import BlogPost, BlogComment, User, UserRole, PostStatus
 from schemas.schemas import (
-    PostCreate, PostUpdate, PostOut, PostCardOut, PostFeedOut,
+    PostCreate, PostUpdate, PostOut, PostCardOut, PostFeedOut, PostSearchHitOut,
     CommentCreate, CommentOut, TagOut, CategoryOut, UserPublic, UserSession,
 )
 import crud.post_crud as crud
+import crud.search_crud as search_crud
 
 router = APIRouter(prefix="/posts", tags=["Posts"])
 
-_SITEMAP_PING = "https://www.google.com/ping?sitemap=https://batihanbabacan.com/sitemap.xml"
+# ── Serialisation helpers ─────────────────────────────────────────────────────
+
+def _user_public(author: User) -> UserPublic:
+    return UserPublic(
+        id=author.id,
+        username=author.username,
+        display_name=author.display_name,
+        avatar_url=author.avatar_url,
+        is_verified=author.is_verified,
+        post_count=author.post_count,
+    )
 
 
-def _ping_google():
-    try:
-        _requests.get(_SITEMAP_PING, timeout=5)
-    except Exception:
-        pass
+async def _build_post_cards(
+    posts: List[BlogPost],
+    session: AsyncSession,
+    user_id: Optional[int] = None,
+) -> List[PostCardOut]:
+    """
+    Hydrate a page of posts in a fixed number of queries (authors, categories,
+    tags and — for a logged-in viewer — likes), regardless of page size.
+    """
+    if not posts:
+        return []
+    post_ids   = [p.id for p in posts]
+    authors    = await crud.get_users_by_ids(session, [p.author_id for p in posts])
+    categories = await crud.get_categories_by_ids(
+        session, [p.category_id for p in posts if p.category_id]
+    )
+    tags  = await crud.get_tags_for_posts(session, post_ids)
+    liked = await crud.get_liked_post_ids(session, user_id, post_ids) if user_id else None
 
+    cards = []
+    for post in posts:
+        author = authors.get(post.author_id)
+        if not author:
+            continue
+        category = categories.get(post.category_id) if post.category_id else None
+        cards.append(PostCardOut(
+            id=post.id,
+            slug=post.slug,
+            title=post.title,
+            subtitle=post.subtitle,
+            cover_image_url=post.cover_image_url,
+            author=_user_public(author),
+            category=CategoryOut.model_validate(category) if category else None,
+            tags=[TagOut(id=t.id, name=t.name, slug=t.slug) for t in tags.get(post.id, [])],
+            status=post.status,
+            view_count=post.view_count,
+            like_count=post.like_count,
+            comment_count=post.comment_count,
+            read_time=post.read_time,
+            excerpt=post.excerpt,
+            first_image_url=post.first_image_url,
+            featured=post.featured,
+            published_at=post.published_at,
+            created_at=post.created_at,
+            liked_by_me=(post.id in liked) if liked is not None else None,
+        ))
+    return cards
 
-# ── Serialisation helpers ─────────────────────────────────────────────────────
 
 async def _build_post_card(
     post: BlogPost,
     session: AsyncSession,
     user_id: Optional[int] = None,
 ) -> PostCardOut:
-    author      = await session.get(User, post.author_id)
-    category    = await session.get(__import__("models.models", fromlist=["BlogCategory"]).BlogCategory, post.category_id) if post.category_id else None
-    tags_orm    = await crud.get_post_tags(session, post.id)
-    liked_by_me = await crud.is_liked_by(session, user_id, post.id) if user_id else None
-
-    return PostCardOut(
-        id=post.id,
-        slug=post.slug,
-        title=post.title,
-        subtitle=post.subtitle,
-        cover_image_url=post.cover_image_url,
-        author=UserPublic(
-            id=author.id,
-            username=author.username,
-            display_name=author.display_name,
-            avatar_url=author.avatar_url,
-            is_verified=author.is_verified,
-            post_count=author.post_count,
-        ),
-        category=CategoryOut.model_validate(category) if category else None,
-        tags=[TagOut(id=t.id, name=t.name, slug=t.slug) for t in tags_orm],
-        status=post.status,
-        view_count=post.view_count,
-        like_count=post.like_count,
-        comment_count=post.comment_count,
-        read_time=post.read_time,
-        featured=post.featured,
-        published_at=post.published_at,
-        created_at=post.created_at,
-        liked_by_me=liked_by_me,
-    )
+    cards = await _build_post_cards([post], session, user_id)
+    if not cards:
+        raise HTTPException(status_code=404, detail="Post author not found")
+    return cards[0]
 
 
 async def _build_post_out(
@@ -80,43 +108,35 @@ async def _build_post_out(
         body_html=post.body_html,
         body_delta=post.body_delta,
         meta_description=post.meta_description,
+        word_count=post.word_count,
+        outline=json.loads(post.outline) if post.outline else [],
         updated_at=post.updated_at,
     )
 
 
-def _build_comment_tree(comments: List[BlogComment], users: dict) -> List[CommentOut]:
-    """Build a nested comment tree from a flat list."""
-    by_id    = {}
-    top_lvl  = []
+def _build_comment_tree(rows: List[Tuple[BlogComment, User]]) -> List[CommentOut]:
+    """
+    Build a nested comment tree in one pass over (comment, author) rows that
+    are ordered parents-first. Deleted comments are hidden; their replies are
+    attached to the nearest visible ancestor (or the top level).
+    """
+    anchor:  Dict[int, Optional[CommentOut]] = {}
+    top_lvl: List[CommentOut] = []
 
-    for c in comments:
-        author = users.get(c.author_id)
-        if not author:
+    for c, author in rows:
+        parent = anchor.get(c.parent_id) if c.parent_id else None
+        if c.is_deleted:
+            anchor[c.id] = parent
             continue
         co = CommentOut(
             id=c.id,
             body=c.body,
-            author=UserPublic(
-                id=author.id,
-                username=author.username,
-                display_name=author.display_name,
-                avatar_url=author.avatar_url,
-                is_verified=author.is_verified,
-                post_count=author.post_count,
-            ),
+            author=_user_public(author),
             parent_id=c.parent_id,
             created_at=c.created_at,
         )
-        by_id[c.id] = co
-
-    for c in comments:
-        co = by_id.get(c.id)
-        if not co:
-            continue
-        if c.parent_id and c.parent_id in by_id:
-            by_id[c.parent_id].replies.append(co)
-        else:
-            top_lvl.append(co)
+        (parent.replies if parent else top_lvl).append(co)
+        anchor[c.id] = co
 
     return top_lvl
 
@@ -124,29 +144,49 @@ def _build_comment_tree(comments: List[BlogComment], users: dict) -> List[Commen
 # ── Public categories list ────────────────────────────────────────────────────
 
 @router.get("/categories", response_model=List[CategoryOut])
-async def list_categories(session: AsyncSession = Depends(get_session)):
+async def list_categories(request: Request, session: AsyncSession = Depends(get_read_session)):
+    key = response_cache.key_for(request)
+    hit = response_cache.get(key)
+    if hit is not None:
+        return hit
+
     from models.models import BlogCategory
     from sqlmodel import select as _select
     result = await session.exec(_select(BlogCategory).order_by(BlogCategory.name))
-    return result.all()
+    out    = [CategoryOut.model_validate(c) for c in result.all()]
+    return response_cache.store(key, out, tags=[CATEGORIES])
 
 
 # ── Feed ──────────────────────────────────────────────────────────────────────
 
 @router.get("", response_model=PostFeedOut)
 async def get_feed(
+    request:  Request,
     limit:    int            = Query(20, ge=1, le=50),
-    before_id: Optional[int] = Query(None),
+    cursor:    Optional[str] = Query(None),
+    before_id: Optional[int] = Query(None),   # legacy cursor
     category:  Optional[str] = Query(None),
     tag:       Optional[str] = Query(None),
     author:    Optional[str] = Query(None),
     featured:  bool          = Query(False),
-    session:   AsyncSession  = Depends(get_session),
+    session:   AsyncSession  = Depends(get_read_session),
     current_user: Optional[UserSession] = Depends(get_optional_user),
 ):
+    after = None
+    if cursor:
+        after = crud.decode_feed_cursor(cursor)
+        if after is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    key = response_cache.key_for(request)
+    hit = response_cache.get(key)
+    if hit is not None:
+        return hit
+
     posts, total = await crud.get_post_feed(
         session,
         limit=limit,
+        cursor=after,
         before_id=before_id,
         category_slug=category,
         tag_slug=tag,
@@ -154,9 +194,12 @@ async def get_feed(
         featured_only=featured,
     )
     uid  = current_user.id if current_user else None
-    out  = [await _build_post_card(p, session, uid) for p in posts]
-    next_cursor = out[-1].id if len(out) == limit else None
-    return PostFeedOut(posts=out, next_cursor=next_cursor, total=total)
+    out  = await _build_post_cards(posts, session, uid)
+    next_cursor = crud.encode_feed_cursor(posts[-1]) if len(posts) == limit else None
+    feed = PostFeedOut(posts=out, next_cursor=next_cursor, total=total)
+    return response_cache.store(
+        key, feed, tags=[LISTING, CATEGORIES, *(post_tag(p.id) for p in posts)]
+    )
 
 
 # ── Search posts & users ─────────────────────────────────────────────────────
@@ -166,41 +209,28 @@ async def search(
     q:    str            = Query(..., min_length=1, max_length=200),
     type: str            = Query("all"),
     limit: int           = Query(20, ge=1, le=50),
-    session: AsyncSession = Depends(get_session),
+    offset: int          = Query(0, ge=0, le=1000),
+    highlight: bool      = Query(True),
+    session: AsyncSession = Depends(get_read_session),
     current_user: Optional[UserSession] = Depends(get_optional_user),
 ):
-    from sqlmodel import select as _sel, or_
     q_clean  = q.strip()
-    pattern  = f"%{q_clean}%"
-    results  = {"query": q_clean, "posts": [], "users": []}
+    results  = {"query": q_clean, "posts": [], "users": [], "next_offset": None}
 
     if type in ("all", "posts"):
-        post_q = (
-            _sel(BlogPost)
-            .where(BlogPost.status == PostStatus.PUBLISHED)
-            .where(or_(
-                BlogPost.title.ilike(pattern),
-                BlogPost.subtitle.ilike(pattern),
-                BlogPost.meta_description.ilike(pattern),
-            ))
-            .order_by(BlogPost.published_at.desc())
-            .limit(limit)
-        )
-        posts_orm = (await session.exec(post_q)).all()
-        uid = current_user.id if current_user else None
-        results["posts"] = [await _build_post_card(p, session, uid) for p in posts_orm]
-
-    if type in ("all", "users"):
-        user_q = (
-            _sel(User)
-            .where(or_(
-                User.username.ilike(pattern),
-                User.display_name.ilike(pattern),
-                User.bio.ilike(pattern),
-            ))
-            .limit(10)
-        )
-        users_orm = (await session.exec(user_q)).all()
+        hits  = await search_crud.search_posts(session, q_clean, limit, offset, highlight)
+        uid   = current_user.id if current_user else None
+        cards = await _build_post_cards([p for p, _, _ in hits], session, uid)
+        extra = {p.id: (rank, snippet) for p, rank, snippet in hits}
+        results["posts"] = [
+            PostSearchHitOut(**c.model_dump(), rank=extra[c.id][0], snippet=extra[c.id][1])
+            for c in cards
+        ]
+        if len(hits) == limit:
+            results["next_offset"] = offset + limit
+
+    if type in ("all", "users") and offset == 0:
+        users_orm = await search_crud.search_users(session, q_clean, limit=10)
         results["users"] = [
             {
                 "id":           u.id,
@@ -221,11 +251,20 @@ async def search(
 
 @router.get("/{slug}", response_model=PostOut)
 async def get_post(
+    request:  Request,
+    response: Response,
     slug:     str           = Path(),
-    session:  AsyncSession  = Depends(get_session),
-    bg_tasks: BackgroundTasks = BackgroundTasks(),
+    session:  AsyncSession  = Depends(get_read_session),
     current_user: Optional[UserSession] = Depends(get_optional_user),
 ):
+    key = response_cache.key_for(request)
+    hit = response_cache.get(key)
+    if hit is not None:
+        view_buffer.record(hit.meta["post_id"])
+        if not_modified(request, hit.meta["etag"]):
+            return not_modified_response(hit.meta["headers"])
+        return hit
+
     post = await crud.get_post_by_slug(session, slug)
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -240,31 +279,74 @@ async def get_post(
             raise HTTPException(status_code=404, detail="Post not found")
 
     uid = current_user.id if current_user else None
-    bg_tasks.add_task(crud.increment_view, session, post, uid)
-    return await _build_post_out(post, session, uid)
+    view_buffer.record(post.id, uid)
+
+    # Validators come from columns already loaded, so a revalidation skips
+    # hydration and serialisation entirely. liked_by_me makes authenticated
+    # responses viewer-specific. view_count is left out: the view above has
+    # just bumped it, so it would change the ETag on every GET; a 304 may
+    # carry a slightly stale count. Likes and comments have no timestamp,
+    # so there is no Last-Modified that moves with the ETag — send none.
+    etag = make_etag(
+        post.id, post.updated_at.isoformat(), post.like_count, post.comment_count, uid,
+    )
+    headers = validator_headers(
+        etag, None,
+        "private, max-age=0, must-revalidate" if uid or post.status != PostStatus.PUBLISHED
+        else "public, max-age=60, must-revalidate",
+    )
+    if not_modified(request, etag):
+        return not_modified_response(headers)
+
+    out = await _build_post_out(post, session, uid)
+    response.headers.update(headers)
+    if post.status != PostStatus.PUBLISHED:
+        return out
+    return response_cache.store(
+        key, out,
+        tags=[post_tag(post.id), CATEGORIES],
+        meta={"post_id": post.id, "etag": etag, "headers": headers},
+        headers=headers,
+    )
 
 
 # ── Related posts ─────────────────────────────────────────────────────────────
 
 @router.get("/{slug}/related", response_model=List[PostCardOut])
 async def get_related(
+    request: Request,
     slug:    str          = Path(),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
+    key = response_cache.key_for(request)
+    hit = response_cache.get(key)
+    if hit is not None:
+        return hit
+
     post = await crud.get_post_by_slug(session, slug)
     if not post or post.status != PostStatus.PUBLISHED:
         return []
     related = await crud.get_related_posts(session, post)
-    return [await _build_post_card(p, session) for p in related]
+    out     = await _build_post_cards(related, session)
+    return response_cache.store(
+        key, out,
+        tags=[LISTING, CATEGORIES, post_tag(post.id), *(post_tag(p.id) for p in related)],
+    )
 
 
 # ── Adjacent posts (prev/next) ───────────────────────────────────────────────
 
 @router.get("/{slug}/adjacent")
 async def get_adjacent_posts(
+    request: Request,
     slug:    str          = Path(),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
+    key = response_cache.key_for(request)
+    hit = response_cache.get(key)
+    if hit is not None:
+        return hit
+
     from sqlmodel import select as _sel
     post = await crud.get_post_by_slug(session, slug)
     if not post or post.status != PostStatus.PUBLISHED:
@@ -286,7 +368,11 @@ async def get_adjacent_posts(
     def mini(p):
         return {"slug": p.slug, "title": p.title, "cover_image_url": p.cover_image_url} if p else None
 
-    return {"prev": mini(prev_post), "next": mini(next_post)}
+    return response_cache.store(
+        key,
+        {"prev": mini(prev_post), "next": mini(next_post)},
+        tags=[LISTING, post_tag(post.id), *(post_tag(p.id) for p in (prev_post, next_post) if p)],
+    )
 
 
 # ── Create post ───────────────────────────────────────────────────────────────
@@ -294,7 +380,6 @@ async def get_adjacent_posts(
 @router.post("", response_model=PostOut, status_code=status.HTTP_201_CREATED)
 async def create_post(
     body:         PostCreate,
-    bg_tasks:     BackgroundTasks,
     session:      AsyncSession  = Depends(get_session),
     current_user: UserSession   = Depends(require_author),
 ):
@@ -303,7 +388,7 @@ async def create_post(
     if not post:
         raise HTTPException(status_code=500, detail="Failed to create post")
     if post.status == PostStatus.PUBLISHED:
-        bg_tasks.add_task(_ping_google)
+        notifier.notify_post(post.slug)
     return await _build_post_out(post, session, current_user.id)
 
 
@@ -315,7 +400,6 @@ async def update_post(
     slug:         str          = Path(),
     session:      AsyncSession = Depends(get_session),
     current_user: UserSession  = Depends(require_author),
-    bg_tasks:     BackgroundTasks = BackgroundTasks(),
 ):
     post = await crud.get_post_by_slug(session, slug)
     if not post:
@@ -332,7 +416,7 @@ async def update_post(
         raise HTTPException(status_code=500, detail="Failed to update post")
 
     if updated.status == PostStatus.PUBLISHED:
-        bg_tasks.add_task(_ping_google)
+        notifier.notify_post(updated.slug)
     return await _build_post_out(updated, session, current_user.id)
 
 
@@ -343,7 +427,6 @@ async def publish_post(
     slug:         str          = Path(),
     session:      AsyncSession = Depends(get_session),
     current_user: UserSession  = Depends(require_author),
-    bg_tasks:     BackgroundTasks = BackgroundTasks(),
 ):
     post = await crud.get_post_by_slug(session, slug)
     if not post:
@@ -355,7 +438,7 @@ async def publish_post(
         raise HTTPException(status_code=403, detail="Not your post")
 
     updated = await crud.update_post(session, post, {"status": PostStatus.PUBLISHED})
-    bg_tasks.add_task(_ping_google)
+    notifier.notify_post(updated.slug)
     return await _build_post_out(updated, session, current_user.id)
 
 
@@ -375,6 +458,7 @@ async def unpublish_post(
         raise HTTPException(status_code=403, detail="Not your post")
 
     updated = await crud.update_post(session, post, {"status": PostStatus.DRAFT})
+    notifier.notify_post(updated.slug)   # IndexNow also takes removed URLs
     return await _build_post_out(updated, session, current_user.id)
 
 
@@ -428,24 +512,28 @@ async def unlike_post(
 
 @router.get("/{slug}/comments", response_model=List[CommentOut])
 async def get_comments(
-    slug:    str          = Path(),
-    session: AsyncSession = Depends(get_session),
+    response: Response,
+    slug:     str           = Path(),
+    limit:    int           = Query(50, ge=1, le=100),
+    after_id: Optional[int] = Query(None),
+    depth:    int           = Query(5, ge=0, le=10),
+    session:  AsyncSession  = Depends(get_read_session),
 ):
+    """
+    One page of top-level comments with replies nested up to `depth` levels.
+    When more top-level comments exist, X-Next-Cursor holds the `after_id`
+    for the next page.
+    """
     post = await crud.get_post_by_slug(session, slug)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
-    comments = await crud.get_comments_for_post(session, post.id)
-
-    # Pre-fetch all authors to avoid N+1
-    author_ids = list({c.author_id for c in comments})
-    users      = {}
-    for uid in author_ids:
-        u = await session.get(User, uid)
-        if u:
-            users[uid] = u
-
-    return _build_comment_tree(comments, users)
+    rows, next_after = await crud.get_comment_thread(
+        session, post.id, limit=limit, after_id=after_id, max_depth=depth
+    )
+    if next_after is not None:
+        response.headers["X-Next-Cursor"] = str(next_after)
+    return _build_comment_tree(rows)
 
 
 @router.post("/{slug}/comments", response_model=CommentOut, status_code=status.HTTP_201_CREATED)
@@ -469,14 +557,7 @@ async def post_comment(
     return CommentOut(
         id=comment.id,
         body=comment.body,
-        author=UserPublic(
-            id=author.id,
-            username=author.username,
-            display_name=author.display_name,
-            avatar_url=author.avatar_url,
-            is_verified=author.is_verified,
-            post_count=author.post_count,
-        ),
+        author=_user_public(author),
         parent_id=comment.parent_id,
         created_at=comment.created_at,
     )
@@ -498,7 +579,7 @@ async def delete_comment(
 
 @router.get("/me/posts", response_model=List[PostCardOut])
 async def my_posts(
-    session:      AsyncSession = Depends(get_session),
+    session:      AsyncSession = Depends(get_read_session),
     current_user: UserSession  = Depends(require_author),
 ):
     posts, _ = await crud.get_post_feed(
@@ -506,5 +587,6 @@ async def my_posts(
         limit=100,
         author_username=current_user.username,
         include_drafts=True,
+        with_total=False,
     )
-    return [await _build_post_card(p, session, current_user.id) for p in posts]
+    return await _build_post_cards(posts, session, current_user.id)
@@ -1,5 +1,4 @@
 from typing import Optional
-import requests as _requests
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, status, Path, Query
 from sqlmodel.ext.asyncio.session import AsyncSession
 
@@ -20,8 +19,9 @@ _SITEMAP_PING = (
 
 def _ping_google():
     """Fire-and-forget: tell Google the sitemap changed so it re-crawls quickly."""
+    import requests
     try:
-        _requests.get(_SITEMAP_PING, timeout=5)
+        requests.get(_SITEMAP_PING, timeout=5)
     except Exception:
         pass
 
@@ -171,6 +171,8 @@ class PostCardOut(SQLModel):
     like_count:      int
     comment_count:   int
     read_time:       int
+    excerpt:         Optional[str]   = None
+    first_image_url: Optional[str]   = None
     featured:        bool
     published_at:    Optional[datetime] = None
     created_at:      datetime
@@ -180,21 +182,35 @@ class PostCardOut(SQLModel):
         from_attributes = True
 
 
+class HeadingOut(SQLModel):
+    level: int
+    text:  str
+    id:    str
+
+
 class PostOut(PostCardOut):
     """Full post — includes body_html and body_delta for editor."""
     body_html:        str
     body_delta:       Optional[str]  = None
     meta_description: Optional[str]  = None
+    word_count:       int            = 0
+    outline:          List[HeadingOut] = []
     updated_at:       datetime
 
     class Config:
         from_attributes = True
 
 
+class PostSearchHitOut(PostCardOut):
+    """Feed card plus full-text rank and a highlighted body excerpt."""
+    rank:    float         = 0.0
+    snippet: Optional[str] = None   # plain text with <mark>…</mark> around matches
+
+
 class PostFeedOut(SQLModel):
     posts:       List[PostCardOut]
-    next_cursor: Optional[int]
-    total:       int
+    next_cursor: Optional[str]
+    total:       Optional[int] = None   # only on the first page
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -20,6 +20,14 @@ function avatarLetter(u) {
 
 // ── Render helpers ────────────────────────────────────────────────────────────
 
+// Snippets are plain text with <mark> around matches — escape everything
+// else so only the highlight tags survive.
+function renderSnippet(snippet) {
+  return escapeHtml(snippet)
+    .replace(/&lt;mark&gt;/g, '<mark>')
+    .replace(/&lt;\/mark&gt;/g, '</mark>');
+}
+
 function renderPostResult(post) {
   const cat = post.category ? `<span class="cat-badge">${escapeHtml(post.category.name)}</span>` : '';
   const imgHtml = post.cover_image_url
@@ -39,6 +47,7 @@ function renderPostResult(post) {
         </div>
         <h3 class="spc-title">${escapeHtml(post.title)}</h3>
         ${post.subtitle ? `<p class="spc-subtitle">${escapeHtml(post.subtitle)}</p>` : ''}
+        ${post.snippet ? `<p class="spc-snippet">${renderSnippet(post.snippet)}</p>` : ''}
         <div class="spc-footer">
           <span class="spc-author">
             <span class="a-avatar">${authorAvatar}</span>
@@ -0,0 +1,125 @@
+"""
+Shared fixtures.
+
+Database tests run against TEST_DATABASE_URL, a scratch Postgres database
+that is migrated once per session and truncated before every test. They
+are skipped when it is not set:
+
+    TEST_DATABASE_URL=postgresql+asyncpg://localhost/beelog_test python -m pytest -q
+
+Tests drive coroutines through the `run` fixture (one event loop per test)
+rather than a pytest plugin.
+"""
+
+import os
+import asyncio
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+# core.database builds its engines at import time, so this must come first.
+os.environ["DATABASE_URL"]      = TEST_DATABASE_URL or "postgresql+asyncpg://localhost/beelog_test"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MEDIA_STORAGE", "local")
+os.environ.setdefault("NOTIFY_INTERVAL", "0")
+os.environ.setdefault("SITEMAP_PING_URL", "")
+os.environ.setdefault("ANALYTICS_ROLLUP_INTERVAL", "0")
+
+
+def _drop_pools() -> None:
+    # Connections belong to the loop that opened them; forget them without
+    # closing so the next test's loop starts with an empty pool.
+    from core.database import engine, read_engine
+    engine.sync_engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.sync_engine.dispose(close=False)
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on this test's event loop."""
+    runner = asyncio.Runner()
+    yield runner.run
+    from core.database import engine
+    runner.run(engine.dispose())
+    runner.close()
+
+
+@pytest.fixture(scope="session")
+def _schema():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from core.migrations import migrate
+    asyncio.run(migrate())
+    _drop_pools()
+
+
+def _reset_process_state() -> None:
+    from core.cache import response_cache
+    from core.notify import notifier
+    from core.sitemap import sitemap_store
+    from core.views import view_buffer
+    import core.security as security
+    import crud.post_crud as post_crud
+    import routers.admin as admin
+
+    response_cache.clear()
+    sitemap_store.mark_dirty()
+    view_buffer._counts.clear()
+    view_buffer._events.clear()
+    security._token_cache.clear()
+    security._revoked_at.clear()
+    post_crud._feed_count_cache.clear()
+    admin._drop_stats_snapshot()
+    notifier._pending.clear()
+
+
+@pytest.fixture
+def db(_schema, run):
+    """An empty, migrated database."""
+    import sqlalchemy
+    from sqlmodel import SQLModel
+    from core.database import engine
+
+    tables = ", ".join(f'"{t.name}"' for t in SQLModel.metadata.sorted_tables)
+
+    async def truncate():
+        async with engine.begin() as conn:
+            await conn.execute(sqlalchemy.text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+
+    run(truncate())
+    _reset_process_state()
+    return run
+
+
+@pytest.fixture
+def make_client(db):
+    """
+    make_client(app) -> context manager yielding a TestClient. TestClient runs
+    the app on its own loop, so the pool is emptied on the way in and out.
+    """
+    from contextlib import contextmanager
+    from fastapi.testclient import TestClient
+    from core.database import engine
+
+    @contextmanager
+    def open_client(app):
+        db(engine.dispose())
+        try:
+            with TestClient(app) as c:
+                yield c
+        finally:
+            _drop_pools()
+
+    return open_client
+
+
+@pytest.fixture
+def client(make_client):
+    """TestClient for main:app with its lifespan running."""
+    from main import app
+
+    with make_client(app) as c:
+        yield c
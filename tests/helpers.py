@@ -0,0 +1,64 @@
+"""Small factories for database tests."""
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from core.database import async_session, engine
+from core.security import create_access_token
+from models.models import User, UserRole, BlogPost, PostStatus
+
+
+async def make_user(username: str = "ada", role: UserRole = UserRole.AUTHOR) -> User:
+    async with async_session() as session:
+        user = User(username=username, password_hash="x", role=role, display_name=username.title())
+        session.add(user)
+        await session.commit()
+        return user
+
+
+async def make_post(
+    author: User,
+    title: str = "Hello",
+    body_html: str = "<p>Hello world</p>",
+    status: PostStatus = PostStatus.PUBLISHED,
+    published_at: Optional[datetime] = None,
+    **fields,
+) -> BlogPost:
+    """Insert a post directly (no counters, no derived-field processing)."""
+    from crud.post_crud import make_slug, render_body
+
+    async with async_session() as session:
+        post = BlogPost(
+            slug=make_slug(title),
+            title=title,
+            author_id=author.id,
+            status=status,
+            published_at=published_at or (datetime.utcnow() if status == PostStatus.PUBLISHED else None),
+            **{**render_body(body_html), **fields},
+        )
+        session.add(post)
+        await session.commit()
+        return post
+
+
+def auth(user: User) -> dict:
+    token = create_access_token({"sub": user.username, "role": user.role.value, "id": user.id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements sent to the primary engine inside the block."""
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
@@ -0,0 +1,33 @@
+import routers.admin as admin
+from main import app
+from models.models import UserRole
+from tests.helpers import make_user, make_post, auth
+
+
+def test_stats_snapshot_is_reused_until_an_admin_write_drops_it(db, make_client):
+    root = db(make_user("root", role=UserRole.ADMIN))
+    db(make_post(root))
+
+    with make_client(app) as client:
+        stats = lambda: client.get("/admin/stats", headers=auth(root)).json()
+        first = stats()
+        assert (first["total_posts"], first["total_categories"]) == (1, 0)
+
+        # A write that skips the admin routes is not seen until the snapshot goes.
+        client.portal.call(make_post, root, "Second")
+        assert stats() == first
+
+        created = client.post("/admin/categories", json={"name": "Birds"}, headers=auth(root))
+        assert created.status_code == 201
+        fresh = stats()
+        assert (fresh["total_posts"], fresh["total_categories"]) == (2, 1)
+
+
+def test_stats_snapshot_expires_after_its_ttl(db, make_client, monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_STATS_TTL", 0)
+    root = db(make_user("root", role=UserRole.ADMIN))
+
+    with make_client(app) as client:
+        assert client.get("/admin/stats", headers=auth(root)).json()["total_posts"] == 0
+        client.portal.call(make_post, root)
+        assert client.get("/admin/stats", headers=auth(root)).json()["total_posts"] == 1
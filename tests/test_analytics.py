@@ -0,0 +1,192 @@
+from datetime import date, datetime
+
+import pytest
+import sqlalchemy
+
+import core.analytics as analytics
+from core.analytics import ViewRollup
+from core.database import engine
+from main import app
+from models.models import (
+    AnalyticsCheckpoint, BlogPostDailyStats, BlogPostDailyViewer, BlogPostView,
+    PostStatus, UserRole,
+)
+from tests.helpers import make_user, make_post, auth
+
+
+async def _views(*rows):
+    """Insert (post_id, viewer_id, created_at) rows into the raw view log."""
+    async with engine.begin() as conn:
+        await conn.execute(BlogPostView.__table__.insert(), [
+            {"post_id": p, "viewer_id": v, "created_at": at} for p, v, at in rows
+        ])
+
+
+async def _rollups():
+    async with engine.connect() as conn:
+        daily = (await conn.execute(sqlalchemy.select(
+            BlogPostDailyStats.post_id, BlogPostDailyStats.day, BlogPostDailyStats.views,
+            BlogPostDailyStats.anon_views, BlogPostDailyStats.unique_viewers,
+        ).order_by(BlogPostDailyStats.post_id, BlogPostDailyStats.day))).all()
+        viewers = (await conn.execute(sqlalchemy.select(
+            BlogPostDailyViewer.post_id, BlogPostDailyViewer.day, BlogPostDailyViewer.viewer_id,
+            BlogPostDailyViewer.views, BlogPostDailyViewer.last_viewed,
+        ).order_by(BlogPostDailyViewer.day, BlogPostDailyViewer.viewer_id))).all()
+        checkpoint = (await conn.execute(sqlalchemy.select(
+            AnalyticsCheckpoint.last_id, AnalyticsCheckpoint.pending_max,
+        ))).one()
+    return [tuple(r) for r in daily], [tuple(r) for r in viewers], tuple(checkpoint)
+
+
+def test_rollup_folds_views_up_to_the_previous_runs_watermark(db):
+    day1, day2 = date(2026, 3, 4), date(2026, 3, 5)
+    at = lambda d, h: datetime(d.year, d.month, d.day, h)   # noqa: E731
+
+    async def scenario():
+        ada, bob = await make_user("ada"), await make_user("bob")
+        post     = await make_post(ada)
+        rollup   = ViewRollup(interval=0)
+        await _views(
+            (post.id, ada.id, at(day1, 9)), (post.id, ada.id, at(day1, 11)),
+            (post.id, bob.id, at(day1, 10)), (post.id, None, at(day1, 12)),
+            (post.id, ada.id, at(day2, 8)),
+        )
+        # The first run only records max(id) as pending_max: rows up to it may
+        # belong to inserts that have not committed yet.
+        first = await rollup.run(), await _rollups()
+
+        await _views((post.id, bob.id, at(day2, 9)))
+        second = await rollup.run(), await _rollups()     # folds ids 1-5
+        third  = await rollup.run(), await _rollups()     # folds id 6
+        fourth = await rollup.run(), await _rollups()     # nothing new
+        return ada, bob, post, rollup, first, second, third, fourth
+
+    ada, bob, post, rollup, first, second, third, fourth = db(scenario())
+
+    assert first == (0, ([], [], (0, 5)))
+
+    touched, (daily, viewers, checkpoint) = second
+    assert touched == 2 and checkpoint == (5, 6)
+    assert daily == [(post.id, day1, 4, 1, 2), (post.id, day2, 1, 0, 1)]
+    assert viewers == [
+        (post.id, day1, ada.id, 2, datetime(2026, 3, 4, 11)),
+        (post.id, day1, bob.id, 1, datetime(2026, 3, 4, 10)),
+        (post.id, day2, ada.id, 1, datetime(2026, 3, 5, 8)),
+    ]
+
+    touched, (daily, viewers, checkpoint) = third
+    assert touched == 1 and checkpoint == (6, 6)
+    assert daily == [(post.id, day1, 4, 1, 2), (post.id, day2, 2, 0, 2)]
+    assert viewers[-1] == (post.id, day2, bob.id, 1, datetime(2026, 3, 5, 9))
+
+    assert fourth == (0, third[1])
+    assert rollup.stats() == {
+        "runs": 4, "failures": 0, "last_id": 6, "row_groups": 3, "retired": 0,
+    }
+
+
+# Partition tests pin maintain() to 2019-2020 so they never touch the
+# partitions the migration created around the real current month.
+_TEST_MONTHS = ["201909", "201910", "201911", "202005", "202006", "202007"]
+
+
+@pytest.fixture
+def partitions(db, monkeypatch):
+    monkeypatch.setattr(analytics, "VIEW_PARTITIONS_AHEAD", 2)
+    monkeypatch.setattr(analytics, "VIEW_RETENTION_MONTHS", 6)
+    monkeypatch.setattr(analytics, "VIEW_RETENTION_ACTION", "drop")
+
+    async def names():
+        async with engine.connect() as conn:
+            return set((await conn.execute(analytics._PARTITIONS_SQL)).scalars())
+
+    async def drop():
+        async with engine.begin() as conn:
+            for month in _TEST_MONTHS:
+                await conn.execute(sqlalchemy.text(f'DROP TABLE IF EXISTS "blog_post_view_p{month}"'))
+
+    yield names
+    db(drop())
+
+
+async def _rows_in(table: str):
+    async with engine.connect() as conn:
+        return (await conn.execute(sqlalchemy.text(
+            f'SELECT id, created_at FROM "{table}" ORDER BY id'
+        ))).all()
+
+
+def test_maintain_creates_partitions_ahead_and_moves_rows_out_of_default(db, partitions):
+    async def scenario():
+        post = await make_post(await make_user("ada"))
+        # No partition covers June 2020 yet, so these land in the default one.
+        await _views((post.id, None, datetime(2020, 6, 3)), (post.id, None, datetime(2020, 8, 1)))
+        before = await _rows_in("blog_post_view_default")
+        retired = await ViewRollup(interval=0).maintain(today=date(2020, 5, 20))
+        return before, retired, await partitions(), \
+            await _rows_in("blog_post_view_p202006"), await _rows_in("blog_post_view_default")
+
+    before, retired, names, june, default = db(scenario())
+    assert [r.id for r in before] == [1, 2]
+    assert retired == []
+    assert {"blog_post_view_p202005", "blog_post_view_p202006", "blog_post_view_p202007"} <= names
+    assert "blog_post_view_p202008" not in names
+    assert [r.id for r in june] == [1]
+    assert [r.created_at for r in default] == [datetime(2020, 8, 1)]   # no partition yet
+
+
+def test_retention_drops_partitions_at_or_below_the_rollup_watermark(db, partitions):
+    async def scenario():
+        post   = await make_post(await make_user("ada"))
+        rollup = ViewRollup(interval=0)
+        await rollup.maintain(today=date(2019, 9, 15))          # 2019-09 … 2019-11
+        await _views(
+            (post.id, None, datetime(2019, 9, 2)), (post.id, None, datetime(2019, 9, 30)),
+            (post.id, None, datetime(2019, 10, 5)),
+        )
+        async with engine.begin() as conn:
+            await conn.execute(AnalyticsCheckpoint.__table__.insert(),
+                               {"name": "blog_post_view", "last_id": 2, "pending_max": 3})
+        # Six months' retention from May 2020 keeps November 2019 onwards.
+        retired = await rollup.maintain(today=date(2020, 5, 20))
+        return retired, await partitions(), rollup.stats()["retired"]
+
+    retired, names, count = db(scenario())
+    assert retired == ["blog_post_view_p201909"]       # max(id) 2 == last_id
+    assert "blog_post_view_p201910" in names           # id 3 not rolled up yet
+    assert "blog_post_view_p201911" in names           # inside the retention window
+    assert "blog_post_view_p201909" not in names
+    assert count == 1
+
+
+async def _daily(*rows):
+    async with engine.begin() as conn:
+        await conn.execute(BlogPostDailyStats.__table__.insert(), [
+            {"post_id": p, "day": d, "views": v, "anon_views": a, "unique_viewers": 0}
+            for p, d, v, a in rows
+        ])
+
+
+def test_analytics_ranks_published_posts_by_views_in_the_range(db, make_client):
+    admin  = db(make_user("root", role=UserRole.ADMIN))
+    recent = db(make_post(admin, title="Recent", view_count=30))
+    old    = db(make_post(admin, title="Old", view_count=500))
+    draft  = db(make_post(admin, title="Draft", status=PostStatus.DRAFT, view_count=99))
+    db(_daily(
+        (recent.id, date(2026, 3, 2), 20, 5), (recent.id, date(2026, 3, 3), 10, 0),
+        (old.id, date(2025, 1, 1), 490, 0), (old.id, date(2026, 3, 2), 10, 10),
+        (draft.id, date(2026, 3, 2), 99, 0),
+    ))
+
+    with make_client(app) as client:
+        r_all   = client.get("/admin/analytics", headers=auth(admin))
+        r_march = client.get("/admin/analytics?since=2026-03-01&until=2026-03-31",
+                             headers=auth(admin))
+
+    assert r_all.status_code == r_march.status_code == 200
+    assert [(p["id"], p["views"]) for p in r_all.json()] == [(old.id, 500), (recent.id, 30)]
+    march = r_march.json()
+    assert [(p["id"], p["views"], p["anon_views"]) for p in march] == [
+        (recent.id, 30, 5), (old.id, 10, 10),
+    ]
+    assert march[1]["view_count"] == 500       # the live all-time total is still reported
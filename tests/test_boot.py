@@ -0,0 +1,58 @@
+import pytest
+import sqlalchemy
+
+import core.migrations as migrations
+from core.boot_time import measure
+from core.database import engine
+
+
+def test_boot_applies_pending_migrations(db, monkeypatch):
+    probe = migrations.Migration(migrations.LATEST_VERSION + 1, "boot probe", ["SELECT 1"])
+    monkeypatch.setattr(migrations, "MIGRATIONS", [*migrations.MIGRATIONS, probe])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", probe.version)
+
+    async def scenario():
+        try:
+            await migrations.check_schema()
+            return await migrations.current_version()
+        finally:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    sqlalchemy.text("DELETE FROM schema_version WHERE version = :v"),
+                    {"v": probe.version},
+                )
+
+    assert db(scenario()) == probe.version
+
+
+def test_boot_refuses_outdated_schema_when_auto_migrate_is_off(db, monkeypatch):
+    probe = migrations.Migration(migrations.LATEST_VERSION + 1, "boot probe", ["SELECT 1"])
+    monkeypatch.setattr(migrations, "MIGRATIONS", [*migrations.MIGRATIONS, probe])
+    monkeypatch.setattr(migrations, "LATEST_VERSION", probe.version)
+    monkeypatch.setattr(migrations, "AUTO_MIGRATE", False)
+
+    try:
+        db(migrations.check_schema())
+    except RuntimeError as e:
+        assert "AUTO_MIGRATE" in str(e)
+    else:
+        raise AssertionError("check_schema() accepted an outdated schema")
+
+
+def test_time_to_first_request(db):
+    pytest.importorskip("uvicorn")
+    assert measure() < 30_000
+
+
+def test_boot_bootstraps_root_on_an_up_to_date_schema(db, monkeypatch):
+    monkeypatch.setenv("ROOT_PASSWORD", "hunter22")
+
+    async def scenario():
+        version = await migrations.check_schema()
+        async with engine.connect() as conn:
+            roots = (await conn.execute(
+                sqlalchemy.text("""SELECT username FROM "user" WHERE role = 'ROOT'""")
+            )).scalars().all()
+        return version, roots
+
+    assert db(scenario()) == (migrations.LATEST_VERSION, ["root"])
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+import uuid
+
+from core.broker import PostgresBroker, _NOTIFY_LIMIT, encode
+from core.fanout import ConnectionManager
+
+
+def _chat(text: str) -> dict:
+    return {
+        "type": "chat", "username": "ayşe", "text": text,
+        "timestamp": "0000-00-00T00:00:00.000000+00:00", "room": "0" * 36,
+    }
+
+
+def _linked_workers():
+    """Two brokers whose NOTIFYs are handed straight to each other."""
+    a, b = PostgresBroker(lambda: {}), PostgresBroker(lambda: {})
+    for src, dst in ((a, b), (b, a)):
+        async def send(message, src=src, dst=dst):
+            dst._on_notify(None, 0, src.channel, src._envelope(message))
+        src._send = send
+    return a, b
+
+
+def test_multibyte_message_near_the_cap_reaches_other_workers():
+    text = "Çağrı ışığı söğüt " * 170          # ~3000 chars, ~5100 UTF-8 bytes
+    a, b = _linked_workers()
+    received = []
+    b.bind(lambda room, payload: received.append(json.loads(payload)))
+
+    async def scenario():
+        manager = ConnectionManager(broker=a)
+        assert manager.fits("0" * 36, _chat(text))
+        await manager.broadcast("0" * 36, _chat(text))
+
+    asyncio.run(scenario())
+    assert a.failures == 0
+    assert [m["text"] for m in received] == [text]
+
+
+def test_fits_matches_the_notify_limit():
+    broker  = PostgresBroker(lambda: {})
+    manager = ConnectionManager(broker=broker)
+
+    n = 1
+    while manager.fits("r", _chat("ş" * (n + 1))):
+        n += 1
+    longest = broker._envelope({"k": "msg", "r": "r", "t": encode(_chat("ş" * n))})
+
+    assert len(longest.encode()) <= _NOTIFY_LIMIT
+    assert n > 3800                     # two bytes per character, not a \uXXXX escape
+    assert not manager.fits("r", _chat("ş" * (n + 1)))
+
+
+async def _until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for NOTIFY")
+        await asyncio.sleep(0.02)
+
+
+def test_workers_relay_messages_and_presence_over_listen_notify(db):
+    # ~1500 users is about 15 KB of names: one room's snapshot needs several NOTIFYs.
+    crowd = [f"kullanıcı{i:04d}" for i in range(1500)]
+
+    async def scenario():
+        channel  = f"beelog_chat_test_{uuid.uuid4().hex[:8]}"
+        a = PostgresBroker(lambda: {"big": crowd, "empty": []}, channel=channel, interval=60)
+        b = PostgresBroker(lambda: {}, channel=channel, interval=60)
+        received = []
+        b.bind(lambda room, payload: received.append((room, json.loads(payload))))
+        await b.start()
+        await a.start()        # a's snapshot reaches b in several parts
+        try:
+            await _until(lambda: len(b.remote_users("big")) == len(crowd))
+            await a.publish("big", encode(_chat("merhaba dünya")))
+            a.joined("small", "ayşe")
+            a.joined("small", "ayşe")   # a second tab: identical NOTIFYs must both arrive
+            await _until(lambda: received and len(b.remote_users("small")) == 2)
+        finally:
+            await a.stop()
+            await b.stop()
+        return received, sorted(b.remote_users("big")), b.remote_users("small"), a.stats()
+
+    received, big, small, stats = db(scenario())
+    assert big == sorted(crowd)
+    assert small == ["ayşe", "ayşe"]
+    assert [(room, m["text"]) for room, m in received] == [("big", "merhaba dünya")]
+    assert stats["failures"] == 0 and stats["published"] >= 5   # hello, 2+ snaps, msg, joins
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import crud.post_crud as crud
+from core.database import async_session
+from models.models import BlogComment
+from tests.helpers import make_user, make_post
+
+
+async def _comment(post, author, at, parent=None):
+    async with async_session() as session:
+        c = BlogComment(body="hi", post_id=post.id, author_id=author.id,
+                        parent_id=parent.id if parent else None, created_at=at)
+        session.add(c)
+        await session.commit()
+        return c
+
+
+async def _page(post, after_id=None):
+    async with async_session() as session:
+        rows, nxt = await crud.get_comment_thread(
+            session, post.id, limit=2, after_id=after_id, max_replies=5
+        )
+    return [c for c, _ in rows], nxt
+
+
+def test_busy_early_thread_does_not_push_later_roots_off_the_page(db):
+    async def scenario():
+        author = await make_user()
+        post   = await make_post(author)
+        t      = datetime(2026, 3, 1)
+        first  = await _comment(post, author, t)
+        second = await _comment(post, author, t + timedelta(minutes=1))
+        third  = await _comment(post, author, t + timedelta(minutes=2))
+        reply  = await _comment(post, author, t + timedelta(minutes=3), parent=first)
+        for i in range(10):
+            await _comment(post, author, t + timedelta(minutes=4 + i), parent=reply)
+        late   = await _comment(post, author, t + timedelta(minutes=30), parent=second)
+
+        page1, nxt = await _page(post)
+        page2, end = await _page(post, nxt)
+        return (first, second, third, reply, late), page1, nxt, page2, end
+
+    (first, second, third, reply, late), page1, nxt, page2, end = db(scenario())
+    ids = [c.id for c in page1]
+
+    assert first.id in ids and second.id in ids
+    assert late.id in ids                                    # the later root keeps its reply
+    assert len([c for c in page1 if c.id not in (second.id, late.id)]) == 1 + 5
+    for c in page1:                                          # parents precede replies
+        assert c.parent_id is None or ids.index(c.parent_id) < ids.index(c.id)
+    assert nxt == second.id
+    assert [c.id for c in page2] == [third.id] and end is None
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from core.cache import response_cache
+from core.views import view_buffer
+from main import app
+from models.models import PostStatus
+from tests.helpers import make_user, make_post, auth
+
+
+def test_post_revalidates_after_its_view_is_counted(db, make_client):
+    post = db(make_post(db(make_user())))
+    with make_client(app) as client:
+        first = client.get(f"/posts/{post.slug}")
+        assert first.status_code == 200
+        assert "last-modified" not in first.headers
+        etag = first.headers["etag"]
+
+        # The GET above recorded a view; flush it so view_count really moved.
+        assert client.portal.call(view_buffer.flush) == 1
+        response_cache.clear()
+
+        again = client.get(f"/posts/{post.slug}", headers={"If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.headers["etag"] == etag
+        assert again.content == b""
+
+
+def test_post_etag_changes_when_it_is_liked(db, make_client):
+    reader = db(make_user("grace"))
+    post   = db(make_post(db(make_user())))
+    with make_client(app) as client:
+        etag = client.get(f"/posts/{post.slug}").headers["etag"]
+        assert client.post(f"/posts/{post.slug}/like", headers=auth(reader)).status_code == 204
+
+        fresh = client.get(f"/posts/{post.slug}", headers={"If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != etag
+        assert fresh.json()["like_count"] == 1
+
+
+def test_sitemap_honours_if_modified_since_from_the_newest_post(db, make_client):
+    ada = db(make_user())
+    db(make_post(ada, title="Old", updated_at=datetime(2026, 3, 1, 8, 0, 0)))
+    db(make_post(ada, title="New", updated_at=datetime(2026, 3, 4, 12, 0, 5, 250000)))
+    db(make_post(ada, title="Draft", status=PostStatus.DRAFT, updated_at=datetime(2026, 3, 9)))
+    with make_client(app) as client:
+        first = client.get("/sitemap-blog.xml")
+        assert first.status_code == 200
+        assert first.headers["last-modified"] == "Wed, 04 Mar 2026 12:00:05 GMT"
+
+        same = client.get("/sitemap-blog.xml", headers={"If-Modified-Since": first.headers["last-modified"]})
+        assert same.status_code == 304
+        assert same.content == b""
+
+        older = client.get("/sitemap-blog.xml", headers={"If-Modified-Since": "Wed, 04 Mar 2026 12:00:04 GMT"})
+        assert older.status_code == 200
@@ -0,0 +1,134 @@
+import time
+import random
+from html.parser import HTMLParser
+
+import pytest
+
+from core.content import process_html, _ALLOWED_TAGS, _sample_body
+
+CORPUS = [
+    '<script>alert(1)</script>',
+    '<SCRIPT SRC=//x.example/x.js></SCRIPT>',
+    '<img src=x onerror=alert(1)>',
+    '<img src="javascript:alert(1)">',
+    '<img src=" &#14;  javascript:alert(1)">',
+    '<a href="jav&#x09;ascript:alert(1)">x</a>',
+    '<a href="&#106;&#97;&#118;&#97;&#115;&#99;&#114;&#105;&#112;&#116;&#58;alert(1)">x</a>',
+    '<a href="JaVaScRiPt:alert(1)">x</a>',
+    '<a href=" vbscript:msgbox(1)">x</a>',
+    '<a href="data:text/html;base64,PHNjcmlwdD5hbGVydCgxKTwvc2NyaXB0Pg==">x</a>',
+    '<svg/onload=alert(1)>',
+    '<svg><script>alert(1)</script></svg>',
+    '<math><mtext><table><mglyph><style><img src=x onerror=alert(1)>',
+    '<iframe src="javascript:alert(1)"></iframe>',
+    '<iframe src="https://evil.example/"></iframe>',
+    '<iframe srcdoc="<script>alert(1)</script>"></iframe>',
+    '<body onload=alert(1)>',
+    '<div style="background:url(javascript:alert(1))">x</div>',
+    '<span style="color: expression(alert(1))">x</span>',
+    '<p style="color:red;behavior:url(x.htc)">x</p>',
+    '<object data="javascript:alert(1)"></object>',
+    '<embed src="javascript:alert(1)">',
+    '<form action="javascript:alert(1)"><button>x</button></form>',
+    '<input onfocus=alert(1) autofocus>',
+    '<details open ontoggle=alert(1)>',
+    '<a href="#" onclick="alert(1)">x</a>',
+    '<a href="https://ok.example/" onmouseover=alert(1)>x</a>',
+    '<img """><script>alert(1)</script>">',
+    '<scr<script>ipt>alert(1)</script>',
+    '<<script>alert(1)//<</script>',
+    '<noscript><p title="</noscript><img src=x onerror=alert(1)>">',
+    '<style>@import "javascript:alert(1)";</style>',
+    '<template><script>alert(1)</script></template>',
+    '<meta http-equiv="refresh" content="0;url=javascript:alert(1)">',
+    '<base href="javascript:alert(1)//">',
+    '<link rel=stylesheet href=javascript:alert(1)>',
+    '<!--<img src="--><img src=x onerror=alert(1)//">',
+    '<![CDATA[<script>alert(1)</script>]]>',
+    '<a href="java\0script:alert(1)">x</a>',
+    '<img src=data:image/svg+xml;base64,PHN2Zz48L3N2Zz4=>',
+    '<p title="&quot; onmouseover=&quot;alert(1)">x</p>',
+    '"><img src=x onerror=alert(1)>',
+    '</p><script>alert(1)</script><p>',
+]
+
+_DANGEROUS_SCHEMES = ("javascript:", "vbscript:", "data:text")
+
+
+class _Audit(HTMLParser):
+    """Collects every start tag with its (decoded) attributes."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags = []
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.append((tag, dict(attrs)))
+
+    handle_startendtag = handle_starttag
+
+
+def _assert_safe(html: str) -> None:
+    audit = _Audit()
+    audit.feed(html)
+    audit.close()
+    for tag, attrs in audit.tags:
+        assert tag in _ALLOWED_TAGS, (tag, html)
+        for name, value in attrs.items():
+            assert not name.startswith("on"), (tag, name, html)
+            assert name in _ALLOWED_TAGS[tag] or name in ("class", "style", "id"), (tag, name, html)
+            compact = "".join(ch for ch in (value or "") if ord(ch) > 0x20).lower()
+            assert not compact.startswith(_DANGEROUS_SCHEMES), (tag, name, value)
+            if name == "style":
+                assert "url" not in compact and "expression" not in compact, value
+        if tag == "iframe":
+            assert attrs.get("src", "").startswith(("https://www.youtube", "https://youtube",
+                                                    "https://player.vimeo")), attrs
+
+
+@pytest.mark.parametrize("payload", CORPUS)
+def test_corpus_payloads_are_neutralised(payload):
+    out = process_html(payload).html
+    _assert_safe(out)
+    assert process_html(out).html == out          # sanitising is idempotent
+
+
+def test_random_splices_of_the_corpus_stay_safe():
+    # Splices cut payloads mid-tag and mid-attribute, including bodies that end
+    # inside a dropped element.
+    rng = random.Random(20260301)
+    pieces = [p for payload in CORPUS for p in (payload[: len(payload) // 2], payload[len(payload) // 2:])]
+    pieces += ['<p>', '</p>', '<a href="', '">', '<img src=', ' ', '"', "'", '<', '>', '&#', ';']
+    for _ in range(500):
+        doc = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 12)))
+        _assert_safe(process_html(doc).html)
+
+
+def test_allowed_markup_survives():
+    html = ('<h2>Title</h2><p>Hi <a href="https://example.com/" title="t">link</a> '
+            '<img src="https://example.com/a.png" alt="a"></p>')
+    parsed = process_html(html)
+    assert 'href="https://example.com/"' in parsed.html
+    assert 'src="https://example.com/a.png"' in parsed.html
+    assert parsed.outline == [{"level": 2, "text": "Title", "id": "h-0"}]
+    assert parsed.images == ["https://example.com/a.png"]
+
+
+def _best_of(runs, fn):
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def test_a_1mb_body_stays_within_budget_and_scales_linearly():
+    # ~0.45 s locally; the budget leaves room for slow CI machines. The ratio
+    # catches a quadratic step that a loose absolute budget would hide.
+    small, large = _sample_body(250_000), _sample_body(1_000_000)
+    t_small = _best_of(3, lambda: process_html(small))
+    t_large = _best_of(3, lambda: process_html(large))
+    assert t_large < 3.0
+    assert t_large / t_small < 6           # 4x the input; linear is ~4
+    _assert_safe(process_html(large).html)
@@ -0,0 +1,65 @@
+import asyncio
+
+from core.broker import MemoryBroker
+from core.fanout import ConnectionManager, _FakeSocket
+
+
+async def _room(manager: ConnectionManager, stalled: int, fast: int):
+    sockets = [_FakeSocket(3600.0) for _ in range(stalled)] + [_FakeSocket(0.0) for _ in range(fast)]
+    for i, ws in enumerate(sockets):
+        await manager.connect(ws, "r", f"u{i}", i)
+    return sockets[:stalled], sockets[stalled:]
+
+
+async def _broadcast(manager: ConnectionManager, n: int) -> None:
+    for seq in range(n):
+        await manager.broadcast("r", {"type": "chat", "seq": seq})
+        await asyncio.sleep(0.001)   # each send takes a few loop turns
+    await asyncio.sleep(0.2)
+
+
+def test_a_send_timeout_evicts_the_stalled_socket_only():
+    async def scenario():
+        manager = ConnectionManager(send_timeout=0.05, slow_policy="evict", broker=MemoryBroker())
+        (stalled,), fast = await _room(manager, 1, 3)
+        await _broadcast(manager, 20)
+        return manager, stalled, fast
+
+    manager, stalled, fast = asyncio.run(scenario())
+    assert stalled.closed and manager.evicted == 1
+    assert all(sorted(ws.received) == list(range(20)) for ws in fast)
+    assert manager.online_count("r") == 3
+
+
+def test_a_full_queue_evicts_the_stalled_socket_only():
+    async def scenario():
+        manager = ConnectionManager(
+            max_queue=4, send_timeout=3600, slow_policy="evict", broker=MemoryBroker(),
+        )
+        (stalled,), fast = await _room(manager, 1, 3)
+        await _broadcast(manager, 20)
+        return manager, stalled, fast
+
+    manager, stalled, fast = asyncio.run(scenario())
+    assert stalled.closed and manager.evicted == 1
+    assert all(sorted(ws.received) == list(range(20)) for ws in fast)
+
+
+def test_the_drop_policy_keeps_the_stalled_socket_and_skips_its_messages():
+    async def scenario():
+        manager = ConnectionManager(
+            max_queue=4, send_timeout=3600, slow_policy="drop", broker=MemoryBroker(),
+        )
+        (stalled,), fast = await _room(manager, 1, 3)
+        await _broadcast(manager, 20)
+        stats = manager.stats()
+        for ws in (stalled, *fast):
+            manager.disconnect(ws, "r")
+        return manager, stats, stalled, fast
+
+    manager, stats, stalled, fast = asyncio.run(scenario())
+    assert not stalled.closed and manager.evicted == 0
+    assert stats["connections"] == 4
+    # One message is stuck in send_text, four wait in the queue; the rest are dropped.
+    assert manager.dropped == 20 - 1 - 4
+    assert all(sorted(ws.received) == list(range(20)) for ws in fast)
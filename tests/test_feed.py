@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+import sqlalchemy
+
+import crud.post_crud as crud
+from core.database import async_session
+from models.models import BlogPost
+from tests.helpers import make_user, make_post
+
+
+async def _walk_feed(page_size: int):
+    seen, cursor = [], None
+    async with async_session() as session:
+        while True:
+            posts, _ = await crud.get_post_feed(session, limit=page_size, cursor=cursor)
+            seen.extend(p.id for p in posts)
+            if len(posts) < page_size:
+                return seen
+            cursor = crud.decode_feed_cursor(crud.encode_feed_cursor(posts[-1]))
+
+
+def test_cursor_pages_cover_posts_without_published_at(db):
+    async def scenario():
+        author = await make_user()
+        base   = datetime(2026, 1, 1)
+        ids    = []
+        for i in range(7):
+            post = await make_post(author, title=f"Post {i}", published_at=base + timedelta(hours=i))
+            ids.append(post.id)
+        # Published rows written before published_at existed sort by created_at.
+        async with async_session() as session:
+            await session.execute(
+                sqlalchemy.update(BlogPost)
+                .where(BlogPost.id.in_(ids[::2]))
+                .values(published_at=None, created_at=base + timedelta(minutes=30))
+            )
+            await session.commit()
+        return ids, await _walk_feed(page_size=2)
+
+    ids, seen = db(scenario())
+    assert sorted(seen) == sorted(ids)
+    assert len(seen) == len(set(seen))
+
+
+def test_feed_order_matches_cursor_key(db):
+    async def scenario():
+        author = await make_user()
+        same   = datetime(2026, 2, 1)
+        for i in range(5):
+            await make_post(author, title=f"Tie {i}", published_at=same)
+        return await _walk_feed(page_size=2)
+
+    seen = db(scenario())
+    assert seen == sorted(seen, reverse=True)
@@ -0,0 +1,45 @@
+import asyncio
+
+import sqlalchemy
+
+import crud.post_crud as crud
+from core.database import async_session
+from models.models import BlogPost, BlogLike
+from tests.helpers import make_user, make_post
+
+
+async def _like(user_id: int, post_id: int) -> bool:
+    async with async_session() as session:
+        return await crud.like_post(session, user_id, post_id)
+
+
+async def _unlike(user_id: int, post_id: int) -> bool:
+    async with async_session() as session:
+        return await crud.unlike_post(session, user_id, post_id)
+
+
+async def _like_count(post_id: int) -> int:
+    async with async_session() as session:
+        return (await session.get(BlogPost, post_id)).like_count
+
+
+def test_parallel_likes_are_all_counted(db):
+    async def scenario():
+        post  = await make_post(await make_user())
+        users = [await make_user(f"reader{i}") for i in range(20)]
+        # Every reader likes twice at once; only the first of each pair counts.
+        results = await asyncio.gather(*(_like(u.id, post.id) for u in users for _ in range(2)))
+        count = await _like_count(post.id)
+        async with async_session() as session:
+            rows  = (await session.execute(
+                sqlalchemy.select(sqlalchemy.func.count()).select_from(BlogLike)
+                .where(BlogLike.post_id == post.id)
+            )).scalar()
+        undone = await asyncio.gather(*(_unlike(u.id, post.id) for u in users for _ in range(2)))
+        return results, count, rows, undone, await _like_count(post.id)
+
+    results, count, rows, undone, after = db(scenario())
+    assert sum(results) == 20
+    assert count == rows == 20
+    assert sum(undone) == 20
+    assert after == 0
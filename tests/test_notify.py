@@ -0,0 +1,71 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+import httpx
+
+import core.notify as notify
+from core.notify import OutboundNotifier
+
+
+def test_batch_reaches_every_endpoint_with_an_encoded_slug(monkeypatch):
+    monkeypatch.setattr(notify, "SITEMAP_PING_URL", "http://stub/ping")
+    monkeypatch.setattr(notify, "INDEXNOW_ENDPOINT", "http://stub/indexnow")
+    monkeypatch.setattr(notify, "INDEXNOW_KEY", "k")
+    monkeypatch.setattr(notify, "WEBSUB_HUB", "http://stub/hub")
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen[request.url.path] = request
+        return httpx.Response(500 if request.url.path == "/hub" else 200)
+
+    async def scenario():
+        notifier = OutboundNotifier(interval=0)
+        notifier.configure("https://blog.example/")
+        notifier._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        notifier.notify_post("çay & kahve?")
+        notifier.notify_post("çay & kahve?")
+        sent = await notifier.flush()
+        await notifier.stop()
+        return notifier, sent
+
+    notifier, sent = asyncio.run(scenario())
+    url = "https://blog.example/post.html?slug=%C3%A7ay%20%26%20kahve%3F"
+    assert sent == 1 and notifier.coalesced == 1
+    assert json.loads(seen["/indexnow"].content) == {
+        "host": "blog.example", "key": "k", "urlList": [url],
+    }
+    assert parse_qs(seen["/hub"].content.decode())["hub.mode"] == ["publish"]
+    assert seen["/ping"].method == "GET"
+    assert notifier.endpoints["sitemap"] == {"sent": 1, "failed": 0, "last_status": 200}
+    assert notifier.endpoints["websub"] == {"sent": 0, "failed": 1, "last_status": 500}
+
+
+def test_timed_out_endpoint_is_counted_as_failed(monkeypatch):
+    monkeypatch.setattr(notify, "SITEMAP_PING_URL", "http://stub/ping")
+    monkeypatch.setattr(notify, "INDEXNOW_KEY", "")
+    monkeypatch.setattr(notify, "WEBSUB_HUB", "")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async def scenario():
+        notifier = OutboundNotifier(interval=0)
+        notifier._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        notifier.notify("https://blog.example/a")
+        await notifier.flush()
+        await notifier.stop()
+        return notifier
+
+    notifier = asyncio.run(scenario())
+    assert notifier.endpoints["sitemap"] == {"sent": 0, "failed": 1, "last_status": "ReadTimeout"}
+
+
+def test_client_carries_the_configured_timeout():
+    async def scenario():
+        notifier = OutboundNotifier()
+        client   = notifier._client()
+        await notifier.stop()
+        return client
+
+    assert asyncio.run(scenario()).timeout == httpx.Timeout(notify.NOTIFY_TIMEOUT)
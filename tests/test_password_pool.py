@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+
+import core.security as security
+
+
+def test_password_jobs_are_bounded_and_keep_the_loop_free(monkeypatch):
+    monkeypatch.setattr(security, "_pwd_stats", {"in_flight": 0, "max_in_flight": 0, "completed": 0})
+    lock, running, peak, threads = threading.Lock(), [0], [0], set()
+
+    def slow_job():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            threads.add(threading.current_thread().name)
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    async def scenario():
+        ticks, depths = 0, []
+        jobs = asyncio.gather(*(security._run_password_job(slow_job) for _ in range(8)))
+        while not jobs.done():
+            ticks += 1
+            depths.append(security.password_pool_stats()["queue_depth"])
+            await asyncio.sleep(0.005)
+        await jobs
+        return ticks, max(depths)
+
+    ticks, max_depth = asyncio.run(scenario())
+    workers = security.PASSWORD_HASH_CONCURRENCY
+    assert peak[0] == workers
+    assert all(name.startswith("bcrypt") for name in threads)
+    assert max_depth == 8 - workers
+    assert ticks > 10                       # the loop kept running meanwhile
+    assert security.password_pool_stats()["completed"] == 8
+
+
+def test_async_hash_round_trip():
+    async def scenario():
+        hashed = await security.get_password_hash_async("correct horse")
+        return (
+            await security.verify_password_async("correct horse", hashed),
+            await security.verify_password_async("wrong horse", hashed),
+        )
+
+    assert asyncio.run(scenario()) == (True, False)
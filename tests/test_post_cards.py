@@ -0,0 +1,42 @@
+from core.database import async_session
+from models.models import BlogCategory, BlogTag, BlogPostTag, BlogLike
+from routers.posts import _build_post_cards
+from tests.helpers import make_user, make_post, count_queries
+
+
+async def _posts(n: int):
+    """n posts by n authors, each with a category, two tags and a like."""
+    async with async_session() as session:
+        category = BlogCategory(name=f"Cat {n}", slug=f"cat-{n}")
+        tags     = [BlogTag(name=f"t{n}-{i}", slug=f"t{n}-{i}") for i in range(2)]
+        session.add_all([category, *tags])
+        await session.commit()
+    reader = await make_user(f"reader{n}")
+    posts  = []
+    for i in range(n):
+        author = await make_user(f"author{n}-{i}")
+        posts.append(await make_post(author, title=f"Post {n}-{i}", category_id=category.id))
+    async with async_session() as session:
+        session.add_all([BlogPostTag(post_id=p.id, tag_id=t.id) for p in posts for t in tags])
+        session.add_all([BlogLike(user_id=reader.id, post_id=p.id) for p in posts])
+        await session.commit()
+    return posts, reader
+
+
+async def _hydrate(posts, reader):
+    async with async_session() as session:
+        with count_queries() as statements:
+            cards = await _build_post_cards(posts, session, reader.id)
+    return cards, len(statements)
+
+
+def test_post_cards_cost_the_same_queries_for_any_page_size(db):
+    async def scenario():
+        small = await _hydrate(*await _posts(2))
+        large = await _hydrate(*await _posts(12))
+        return small, large
+
+    (small_cards, small_queries), (large_cards, large_queries) = db(scenario())
+    assert len(small_cards) == 2 and len(large_cards) == 12
+    assert all(len(c.tags) == 2 and c.category and c.liked_by_me for c in large_cards)
+    assert small_queries == large_queries <= 4
@@ -0,0 +1,67 @@
+from core.database import async_session
+from main import app
+from models.models import BlogCategory, BlogComment, BlogLike, PostStatus, User, UserRole
+from tests.helpers import make_user, make_post, auth
+
+
+async def _seed():
+    root    = await make_user("root", role=UserRole.ROOT)
+    mallory = await make_user("mallory")
+    bob     = await make_user("bob")
+    async with async_session() as session:
+        category = BlogCategory(name="Birds", slug="birds", post_count=3)
+        session.add(category)
+        await session.commit()
+
+    gone     = await make_post(mallory, title="Gone", category_id=category.id,
+                               like_count=1, comment_count=1)
+    await make_post(mallory, title="Old", category_id=category.id, status=PostStatus.ARCHIVED)
+    kept     = await make_post(bob, title="Kept", category_id=category.id,
+                               like_count=1, comment_count=2)
+    async with async_session() as session:
+        theirs = BlogComment(body="first", post_id=kept.id, author_id=mallory.id)
+        session.add_all([
+            BlogLike(user_id=mallory.id, post_id=kept.id),
+            BlogLike(user_id=bob.id, post_id=gone.id),
+            BlogComment(body="on gone", post_id=gone.id, author_id=bob.id),
+            theirs,
+        ])
+        await session.commit()
+        session.add(BlogComment(body="reply", post_id=kept.id, author_id=bob.id, parent_id=theirs.id))
+        await session.commit()
+    return root, mallory, category, gone, kept
+
+
+async def _counts(category_id: int, user_id: int):
+    async with async_session() as session:
+        return (await session.get(BlogCategory, category_id)).post_count, await session.get(User, user_id)
+
+
+def test_deleting_a_user_fixes_counters_and_invalidates_cached_posts(db, make_client):
+    root, mallory, category, gone, kept = db(_seed())
+
+    with make_client(app) as client:
+        before = client.get(f"/posts/{kept.slug}").json()
+        assert (before["like_count"], before["comment_count"]) == (1, 2)
+
+        assert client.delete(f"/admin/users/{mallory.id}", headers=auth(root)).status_code == 204
+
+        after = client.get(f"/posts/{kept.slug}").json()
+        assert (after["like_count"], after["comment_count"]) == (0, 1)
+        comments = client.get(f"/posts/{kept.slug}/comments").json()
+        assert [(c["body"], c["parent_id"]) for c in comments] == [("reply", None)]
+        assert client.get(f"/posts/{gone.slug}").status_code == 404
+
+    category_count, user = db(_counts(category.id, mallory.id))
+    assert category_count == 2          # only the published post was counted
+    assert user is None
+
+
+def test_deleting_a_post_invalidates_the_feed(db, make_client):
+    admin = db(make_user("admin", role=UserRole.ADMIN))
+    post  = db(make_post(admin))
+
+    with make_client(app) as client:
+        assert [p["id"] for p in client.get("/posts").json()["posts"]] == [post.id]
+        assert client.delete(f"/admin/posts/{post.id}", headers=auth(admin)).status_code == 204
+        assert client.get("/posts").json()["posts"] == []
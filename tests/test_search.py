@@ -0,0 +1,24 @@
+import crud.search_crud as search_crud
+from core.database import async_session
+from models.models import PostStatus
+from tests.helpers import make_user, make_post
+
+
+def test_title_matches_outrank_subtitle_and_body_matches(db):
+    async def scenario():
+        author = await make_user()
+        body   = await make_post(author, title="Field notes",
+                                 body_html="<p>A kestrel hovered over the ridge.</p>")
+        title  = await make_post(author, title="The kestrel")
+        sub    = await make_post(author, title="Raptors", subtitle="Kestrel sightings")
+        await make_post(author, title="Kestrel draft", status=PostStatus.DRAFT)
+        await make_post(author, title="Unrelated")
+        async with async_session() as session:
+            hits = await search_crud.search_posts(session, "kestrel")
+        return [title.id, sub.id, body.id], hits
+
+    expected, hits = db(scenario())
+    assert [p.id for p, _, _ in hits] == expected
+    ranks = [rank for _, rank, _ in hits]
+    assert ranks == sorted(ranks, reverse=True) and ranks[0] > ranks[-1]
+    assert "<mark>kestrel</mark>" in hits[2][2]
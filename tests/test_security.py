@@ -0,0 +1,23 @@
+import core.security as security
+
+
+def _payload(iat: int) -> dict:
+    return {"sub": "ada", "role": "author", "id": 7, "iat": iat}
+
+
+def test_token_issued_in_the_revocation_second_is_accepted(monkeypatch):
+    monkeypatch.setattr(security, "_revoked_at", {})
+    monkeypatch.setattr(security.time, "time", lambda: 1_000.9)
+    security.revoke_user_tokens(7)
+
+    assert security._session_from_payload(_payload(iat=999)) is None
+    assert security._session_from_payload(_payload(iat=1_000)) is not None
+
+
+def test_revocations_older_than_a_token_lifetime_are_pruned(monkeypatch):
+    lifetime = security.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    monkeypatch.setattr(security, "_revoked_at", {1: 1_000, 2: 5_000})
+    monkeypatch.setattr(security.time, "time", lambda: 1_000 + lifetime + 1.0)
+    security.revoke_user_tokens(3)
+
+    assert security._revoked_at == {2: 5_000, 3: 1_000 + lifetime + 1}
@@ -0,0 +1,80 @@
+import time
+
+import sqlalchemy
+from fastapi import Depends, FastAPI, WebSocket
+from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import core.database as database
+from core.database import get_session, get_read_session, pool_metrics
+from tests.helpers import make_user, auth
+
+
+def _probe_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.websocket("/ws/probe")
+    async def probe(
+        websocket: WebSocket,
+        session: AsyncSession = Depends(get_session),
+        reader:  AsyncSession = Depends(get_read_session),
+    ):
+        await websocket.accept()
+        one = (await session.execute(sqlalchemy.text("SELECT 1"))).scalar()
+        two = (await reader.execute(sqlalchemy.text("SELECT 2"))).scalar()
+        await websocket.send_json({"session": one, "read_session": two})
+        await websocket.close()
+
+    @app.post("/probe")
+    async def write(session: AsyncSession = Depends(get_session)):
+        return {"ok": (await session.execute(sqlalchemy.text("SELECT 1"))).scalar()}
+
+    @app.get("/probe")
+    async def read(reader: AsyncSession = Depends(get_read_session)):
+        return {"primary": reader.bind is database.engine}
+
+    return app
+
+
+def test_session_dependencies_resolve_on_websockets(db, make_client):
+    user = db(make_user())
+    with make_client(_probe_app()) as client:
+        token = auth(user)["Authorization"].split()[1]
+        with client.websocket_connect(f"/ws/probe?token={token}") as ws:
+            assert ws.receive_json() == {"session": 1, "read_session": 2}
+        with client.websocket_connect("/ws/probe") as ws:
+            assert ws.receive_json() == {"session": 1, "read_session": 2}
+    assert pool_metrics.routes["/ws/probe"]["checkouts"] >= 2
+
+
+def _fake_replica(monkeypatch):
+    # Pretend a replica is configured (another engine on the same database).
+    replica = database._make_engine(database.DATABASE_URL, database.ReplicaPool)
+    monkeypatch.setattr(database, "read_engine", replica)
+    monkeypatch.setattr(database, "async_read_session", sessionmaker(
+        replica, class_=AsyncSession, expire_on_commit=False,
+    ))
+    monkeypatch.setattr(database, "_recent_writers", {})
+
+
+def test_http_write_marks_the_user_for_read_your_writes(db, make_client, monkeypatch):
+    user = db(make_user())
+    _fake_replica(monkeypatch)
+    with make_client(_probe_app()) as client:
+        r = client.post("/probe", headers=auth(user))
+        assert r.json() == {"ok": 1}
+        until = float(r.headers[database.READ_YOUR_WRITES_HEADER])
+        assert time.time() < until <= time.time() + database.READ_YOUR_WRITES_WINDOW + 1
+        assert client.get("/probe", headers=auth(user)).json() == {"primary": True}
+    assert user.id in database._recent_writers
+
+
+def test_echoed_marker_pins_reads_on_any_worker(db, make_client, monkeypatch):
+    _fake_replica(monkeypatch)
+    header = database.READ_YOUR_WRITES_HEADER
+    with make_client(_probe_app()) as client:
+        # Anonymous, and no writer known to this worker: only the header counts.
+        assert client.get("/probe").json() == {"primary": False}
+        assert client.get("/probe", headers={header: f"{time.time() + 10:.0f}"}).json() == {"primary": True}
+        assert client.get("/probe", headers={header: f"{time.time() - 1:.0f}"}).json() == {"primary": False}
+        assert client.get("/probe", headers={header: "soon"}).json() == {"primary": False}
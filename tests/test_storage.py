@@ -0,0 +1,61 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from core.storage import MediaStorage, UploadLimitMiddleware, MEDIA_MAX_BYTES, _MULTIPART_OVERHEAD
+
+
+_MB = 1024 * 1024
+
+
+def _upload_app(max_bytes: int) -> FastAPI:
+    app = FastAPI()
+    app.state.parsed = 0
+    app.add_middleware(UploadLimitMiddleware, paths=["/upload"], max_bytes=max_bytes)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.parsed += 1
+        return {"size": len(await file.read())}
+
+    return app
+
+
+def test_media_storage_is_abstract():
+    with pytest.raises(TypeError):
+        MediaStorage()
+
+
+def test_declared_oversized_body_is_refused_before_parsing():
+    app = _upload_app(max_bytes=_MB)
+    with TestClient(app) as client:
+        r = client.post("/upload", files={"file": ("a.bin", b"x" * (_MB + _MULTIPART_OVERHEAD + 1))})
+    assert r.status_code == 413
+    assert r.json() == {"detail": "File exceeds 1 MB limit"}
+    assert app.state.parsed == 0
+
+
+def test_streamed_body_is_cut_off_at_the_limit():
+    app = _upload_app(max_bytes=_MB)
+    chunks = (b"x" * 256 * 1024 for _ in range(8))      # chunked, no Content-Length
+    with TestClient(app) as client:
+        r = client.post("/upload", content=chunks,
+                        headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert r.status_code == 413
+    assert app.state.parsed == 0
+
+
+def test_upload_under_the_limit_passes():
+    app = _upload_app(max_bytes=_MB)
+    with TestClient(app) as client:
+        r = client.post("/upload", files={"file": ("a.bin", b"x" * 1000)})
+    assert r.status_code == 200 and r.json() == {"size": 1000}
+
+
+def test_media_upload_route_is_capped(db, make_client):
+    from main import app
+    body = b"x" * (MEDIA_MAX_BYTES + _MULTIPART_OVERHEAD + 1)
+    with make_client(app) as client:
+        # Refused on Content-Length alone, before auth or multipart parsing.
+        r = client.post("/admin/media/upload", files={"file": ("big.jpg", body, "image/jpeg")})
+    assert r.status_code == 413
@@ -0,0 +1,67 @@
+import sqlalchemy
+
+from core.database import async_session
+from core.views import ViewAggregator
+from models.models import BlogPost, BlogPostView
+from tests.helpers import make_user, make_post
+
+
+def test_flush_writes_counters_and_view_rows_in_one_batch(db):
+    async def scenario():
+        reader = await make_user("reader")
+        a, b   = await make_post(reader, title="A"), await make_post(reader, title="B")
+        buffer = ViewAggregator(max_events=6)
+        for viewer in (None, reader.id, reader.id):
+            buffer.record(a.id, viewer)
+        buffer.record(b.id)
+        buffer.record(10_000)                   # deleted since the view was recorded
+        buffer.record(b.id)
+        assert not buffer.record(b.id)          # buffer full
+
+        flushed = await buffer.flush()
+        async with async_session() as session:
+            counts = {p.id: p.view_count for p in (
+                await session.execute(sqlalchemy.select(BlogPost))
+            ).scalars()}
+            rows = (await session.execute(
+                sqlalchemy.select(BlogPostView.post_id, BlogPostView.viewer_id)
+            )).all()
+        return a, b, reader, buffer, flushed, counts, rows, await buffer.flush()
+
+    a, b, reader, buffer, flushed, counts, rows, again = db(scenario())
+    assert flushed == 5 and again == 0
+    assert counts == {a.id: 3, b.id: 2}
+    assert sorted(rows, key=str) == sorted(
+        [(a.id, None), (a.id, reader.id), (a.id, reader.id), (b.id, None), (b.id, None)], key=str
+    )
+    assert buffer.stats() == {
+        "pending": 0, "recorded": 6, "flushed": 5, "dropped": 1, "skipped": 1,
+        "flushes": 1, "failures": 0,
+    }
+
+
+def test_flush_updates_posts_in_id_order(db):
+    from sqlalchemy import event
+    from core.database import engine
+
+    async def scenario():
+        author = await make_user("author")
+        posts  = [await make_post(author, title=f"P{i}") for i in range(4)]
+        buffer = ViewAggregator()
+        for post in reversed(posts):
+            buffer.record(post.id)
+
+        seen = []
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE blog_post"):
+                seen.append(list(parameters))
+        event.listen(engine.sync_engine, "before_cursor_execute", record)
+        try:
+            await buffer.flush()
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", record)
+        return [p.id for p in posts], seen
+
+    ids, seen = db(scenario())
+    # asyncpg binds positionally: p0, n0, p1, n1, …
+    assert [params[0::2] for params in seen] == [ids]